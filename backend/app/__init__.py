@@ -7,7 +7,6 @@ from .db.database import init_db
 from dotenv import load_dotenv
 import os
 from .cli import register_cli
-from apscheduler.schedulers.background import BackgroundScheduler
 
 def _as_bool(v, default=False):
     if v is None:
@@ -55,6 +54,18 @@ def create_app():
     # Timeout HTTP para Resend
     app.config['MAIL_HTTP_TIMEOUT'] = int(os.getenv('MAIL_HTTP_TIMEOUT', '10'))
 
+    # Cola de envío (app/services/notify/mail_queue.py)
+    app.config['MAIL_WORKERS'] = int(os.getenv('MAIL_WORKERS', '4'))
+    app.config['MAIL_QUEUE_MAX'] = int(os.getenv('MAIL_QUEUE_MAX', '200'))
+    app.config['MAIL_QUEUE_PUT_TIMEOUT_SEC'] = float(os.getenv('MAIL_QUEUE_PUT_TIMEOUT_SEC', '0.5'))
+    app.config['MAIL_MAX_ATTEMPTS'] = int(os.getenv('MAIL_MAX_ATTEMPTS', '4'))
+    app.config['MAIL_RETRY_BASE_SEC'] = float(os.getenv('MAIL_RETRY_BASE_SEC', '1'))
+    # Outbox durable (sql/008_mail_outbox.sql): el correo sobrevive a reinicios del worker
+    app.config['MAIL_OUTBOX'] = _as_bool(os.getenv('MAIL_OUTBOX'), False)
+    app.config['MAIL_OUTBOX_DRAIN_MIN'] = int(os.getenv('MAIL_OUTBOX_DRAIN_MIN', '1'))
+    app.config['MAIL_OUTBOX_STALE_SEC'] = int(os.getenv('MAIL_OUTBOX_STALE_SEC', '300'))  # reclamado y sin cerrar → se reenvía
+    app.config['MAIL_OUTBOX_KEEP_DAYS'] = int(os.getenv('MAIL_OUTBOX_KEEP_DAYS', '7'))
+
     # Logs de configuración de mail
     if not app.config['RESEND_API_KEY']:
         app.logger.warning("⚠ Resend no configurado: falta RESEND_API_KEY.")
@@ -67,6 +78,50 @@ def create_app():
     app.config['DEFAULT_COUNTRY_CODE'] = os.getenv('DEFAULT_COUNTRY_CODE', '')
     app.config['RESET_CODE_TTL_MIN'] = int(os.getenv('RESET_CODE_TTL_MIN', '10'))
     app.config['RESET_TOKEN_TTL_MIN'] = int(os.getenv('RESET_TOKEN_TTL_MIN', '30'))
+    # Copia del código por SMS al teléfono del usuario (dispatcher asíncrono de sms_sender)
+    app.config['RESET_SMS'] = _as_bool(os.getenv('RESET_SMS'), False)
+
+    # =========================
+    # Notificaciones: retención por particiones mensuales
+    # =========================
+    app.config['NOTIFICATIONS_RETENTION_MONTHS'] = int(os.getenv('NOTIFICATIONS_RETENTION_MONTHS', '6'))
+    app.config['NOTIFICATIONS_RETENTION_MODE'] = os.getenv('NOTIFICATIONS_RETENTION_MODE', 'archive')  # archive | drop
+    app.config['NOTIFICATIONS_PARTITIONS_AHEAD'] = int(os.getenv('NOTIFICATIONS_PARTITIONS_AHEAD', '2'))
+
+    # =========================
+    # Exportaciones asíncronas (storage/exports)
+    # =========================
+    app.config['EXPORTS_DIR'] = os.getenv('EXPORTS_DIR', os.path.join('storage', 'exports'))
+    app.config['EXPORT_JOB_WORKERS'] = int(os.getenv('EXPORT_JOB_WORKERS', '2'))
+    app.config['EXPORT_JOB_STALE_SEC'] = int(os.getenv('EXPORT_JOB_STALE_SEC', '900'))  # job colgado → se re-encola
+
+    # =========================
+    # Scheduler (líder único por advisory lock)
+    # =========================
+    app.config['SCHEDULER_ENABLED'] = _as_bool(os.getenv('SCHEDULER_ENABLED'), True)
+    app.config['SCHEDULER_LEADER_POLL_SEC'] = float(os.getenv('SCHEDULER_LEADER_POLL_SEC', '15'))
+    # Espera antes de la primera elección: el worker atiende tráfico antes de tocar la BD
+    app.config['SCHEDULER_START_DELAY_SEC'] = float(os.getenv('SCHEDULER_START_DELAY_SEC', '10'))
+    app.config['SCHEDULER_EXPIRE_MIN'] = int(os.getenv('SCHEDULER_EXPIRE_MIN', '60'))
+    app.config['SCHEDULER_MATURE_MIN'] = int(os.getenv('SCHEDULER_MATURE_MIN', '15'))
+    app.config['SCHEDULER_RECONCILE_MIN'] = int(os.getenv('SCHEDULER_RECONCILE_MIN', '360'))
+    app.config['SCHEDULER_PRUNE_MIN'] = int(os.getenv('SCHEDULER_PRUNE_MIN', '1440'))
+
+    # =========================
+    # Profiler por muestreo (storage/profiles, opt-in)
+    # =========================
+    app.config['PROFILES_DIR'] = os.getenv('PROFILES_DIR', os.path.join('storage', 'profiles'))
+    app.config['PROFILE_MAX_SEC'] = float(os.getenv('PROFILE_MAX_SEC', '60'))
+    app.config['PROFILE_INTERVAL_MS'] = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+    app.config['PROFILE_SIGNAL'] = os.getenv('PROFILE_SIGNAL', '')          # p. ej. SIGUSR2 (solo a workers)
+    app.config['PROFILE_SIGNAL_SEC'] = float(os.getenv('PROFILE_SIGNAL_SEC', '30'))
+    app.config['PROFILE_REQUESTS'] = _as_bool(os.getenv('PROFILE_REQUESTS'), False)  # cabecera X-Profile: 1 (admins)
+
+    # =========================
+    # KPIs del dashboard admin (snapshot precalculado)
+    # =========================
+    app.config['KPI_REFRESH_MIN'] = int(os.getenv('KPI_REFRESH_MIN', '5'))
+    app.config['KPI_REFRESH_DEBOUNCE_SEC'] = float(os.getenv('KPI_REFRESH_DEBOUNCE_SEC', '5'))
 
     # =========================
     # Inicialización segura de dependencias
@@ -79,12 +134,16 @@ def create_app():
 
     jwt = JWTManager(app)
 
+    from app.security.revocation_cache import revocation_cache
+
     @jwt.token_in_blocklist_loader
     def _is_token_revoked(jwt_header, jwt_payload):
-        # Si el JTI está en la tabla, el token se considera revocado
-        from app.models.token_blocklist import TokenBlocklist
-        jti = jwt_payload.get("jti")
-        return TokenBlocklist.query.filter_by(jti=jti).first() is not None
+        # Bloom en memoria: "no revocado" sin DB; "quizá" se confirma en token_blocklist
+        return revocation_cache.is_revoked(jwt_payload.get("jti"))
+
+    # Invalidación entre workers (LISTEN token_revoked); no en el CLI
+    if not os.environ.get("FLASK_RUN_FROM_CLI"):
+        revocation_cache.start_listener(app)
 
     # Registra TODOS los blueprints desde routes/__init__.py
     register_routes(app)
@@ -110,15 +169,6 @@ def create_app():
             })
         return jsonify(routes=sorted(rules, key=lambda x: x["rule"])), 200
 
-    # Log: ¿desde qué archivo se cargaron los services?
-    try:
-        import app.services.referrals.referral_service as rs
-        import app.services.referrals.payouts_service as ps
-        app.logger.info("referral_service loaded from: %s", getattr(rs, "__file__", None))
-        app.logger.info("payouts_service  loaded from: %s", getattr(ps, "__file__", None))
-    except Exception as e:
-        app.logger.error("debug import failed: %s", e)
-
     app.register_blueprint(debug_bp)
     
     @app.get("/healthz")
@@ -126,39 +176,34 @@ def create_app():
         return {"ok": True}, 200
 
     from app.observability.metrics import metrics_http_response
+    from app.observability.http_metrics import init_http_metrics
 
     @app.get("/metrics")
     def metrics():
         return metrics_http_response()
 
+    # Latencia / estado / tamaño por endpoint (multiproceso vía PROMETHEUS_MULTIPROC_DIR)
+    init_http_metrics(app)
+
+    # Profiler por muestreo: señal PROFILE_SIGNAL y cabecera X-Profile (admins)
+    from app.observability.profiler import init_profiler
+    init_profiler(app)
+
+    # Timing por sentencia SQL, queries por request y log de queries lentas
+    try:
+        from app.observability.sql_metrics import init_sql_metrics
+        init_sql_metrics(app)
+    except Exception as e:
+        app.logger.error("init_sql_metrics falló (sin métricas SQL): %s", e)
+
     # Registrar comandos CLI (mature-commissions)
     register_cli(app)
 
-    # Limpiar suscripciones vencidas al arrancar
-    with app.app_context():
-        try:
-            from app.subscriptions.service import expire_all_stale
-            count = expire_all_stale()
-            app.logger.info("startup_expire_stale: %d suscripciones expiradas al arrancar", count)
-        except Exception as e:
-            app.logger.error("startup_expire_stale falló (no bloquea arranque): %s", e)
-
-    # APScheduler: solo en el servidor web (gunicorn), no en el CLI del cron de Railway
-    # El cron de Railway llama expire_all_stale() directamente en cli.py cada 5 min
-    if not os.environ.get("FLASK_RUN_FROM_CLI"):
-        def _cron_expire():
-            with app.app_context():
-                try:
-                    from app.subscriptions.service import expire_all_stale
-                    count = expire_all_stale()
-                    if count:
-                        app.logger.info("cron_expire_stale: %d suscripciones expiradas", count)
-                except Exception as e:
-                    app.logger.error("cron_expire_stale falló: %s", e)
-
-        scheduler = BackgroundScheduler(daemon=True)
-        scheduler.add_job(_cron_expire, "interval", hours=1)
-        scheduler.start()
-        app.logger.info("cron_expire_stale: scheduler iniciado (cada hora)")
+    # Jobs periódicos: un solo líder entre workers (advisory lock), ver app/scheduler.py.
+    # No en el CLI del cron de Railway. El arranque ya no escribe en la BD: el
+    # líder corre expire_all_stale() apenas es elegido.
+    if not os.environ.get("FLASK_RUN_FROM_CLI") and app.config['SCHEDULER_ENABLED']:
+        from app.scheduler import start_scheduler
+        start_scheduler(app)
 
     return app
@@ -23,3 +23,38 @@ def register_cli(app):
 
             updated = mature_commissions(minutes=minutes, days=days)
             click.echo(f"MATURE COMMISSIONS updated: {updated}")
+
+    @app.cli.command("notifications-retention")
+    @click.option("--keep-months", type=int, default=None,
+                  help="Meses a conservar (default NOTIFICATIONS_RETENTION_MONTHS).")
+    @click.option("--mode", type=click.Choice(["archive", "drop"]), default=None,
+                  help="archive: mueve la partición a notifications_archive; drop: la borra.")
+    def notifications_retention_cmd(keep_months, mode):
+        """Crea particiones futuras de notifications y separa las vencidas
+        (conserva las you_won sin leer)."""
+        from app.db import get_db
+        from app.services.notify.notifications_retention import run_retention
+
+        with app.app_context():
+            conn = get_db()
+            try:
+                out = run_retention(
+                    conn,
+                    keep_months=keep_months or app.config["NOTIFICATIONS_RETENTION_MONTHS"],
+                    mode=mode or app.config["NOTIFICATIONS_RETENTION_MODE"],
+                    months_ahead=app.config["NOTIFICATIONS_PARTITIONS_AHEAD"],
+                )
+            finally:
+                conn.close()
+            click.echo(f"NOTIFICATIONS RETENTION: {out}")
+
+    @app.cli.command("kpi-refresh")
+    @click.option("--full", is_flag=True, default=False,
+                  help="Recalcula todas las series mensuales (no solo el mes actual y el anterior).")
+    def kpi_refresh_cmd(full):
+        """Recalcula el snapshot de KPIs del dashboard admin."""
+        from app.services.admin.kpi_snapshot import refresh_dashboard_kpis
+
+        with app.app_context():
+            version = refresh_dashboard_kpis(full=full)
+            click.echo(f"KPI SNAPSHOT: version={version}")
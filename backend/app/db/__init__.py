@@ -5,7 +5,9 @@ def get_db():
     """
     Devuelve una conexión DB-API cruda (psycopg2) desde el engine de SQLAlchemy.
     Úsala cuando necesites .cursor(), .execute(), commit(), etc.
+    Sus cursores quedan medidos en /metrics (app/observability/sql_metrics.py).
     """
-    return db.engine.raw_connection()
+    from app.observability.sql_metrics import InstrumentedRawConnection
+    return InstrumentedRawConnection(db.engine.raw_connection())
 
 __all__ = ["db", "get_db"]
@@ -1,4 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
 db = SQLAlchemy()
 def init_db(app):
+    # Pool configurable por entorno (ver app/db/pool.py); lo explícito en config gana
+    from .pool import engine_options_from_env, pooler_mode
+    opts = engine_options_from_env(app.config.get("SQLALCHEMY_DATABASE_URI"))
+    opts.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = opts
+    if opts:
+        app.logger.info(
+            "DB pool: size=%s overflow=%s timeout=%ss recycle=%ss pre_ping=%s pooler=%s",
+            opts.get("pool_size"), opts.get("max_overflow"), opts.get("pool_timeout"),
+            opts.get("pool_recycle"), opts.get("pool_pre_ping"), pooler_mode(),
+        )
     db.init_app(app)
@@ -0,0 +1,124 @@
+# app/db/pool.py
+"""
+Pool de conexiones configurable + métricas.
+
+- Una sola configuración (DB_POOL_*, DB_STATEMENT_TIMEOUT_MS) para el engine de
+  Flask-SQLAlchemy. db.session y db.engine.raw_connection() salen del mismo
+  pool, así que ambos estilos comparten límites y timeouts.
+- InstrumentedQueuePool publica en /metrics: conexiones prestadas, overflow,
+  tiempo de espera del checkout y timeouts.
+
+Dimensionar: WEB_CONCURRENCY × (DB_POOL_SIZE + DB_MAX_OVERFLOW) ≤ max_connections
+de Postgres (menos las que usen cron / consola).
+
+Modo pooler (DB_POOLER_MODE=transaction, PgBouncer en transaction pooling):
+- sin parámetros de arranque `options` (PgBouncer los rechaza): el
+  statement_timeout se fija en el rol (ALTER ROLE ... SET statement_timeout).
+- sin prepared statements del lado del servidor (psycopg 3: prepare_threshold=None;
+  psycopg2 nunca los usa).
+- todo lo que dependa de la sesión (LISTEN, advisory locks de sesión) debe ir
+  por DATABASE_DIRECT_URL (conexión directa a Postgres, ver direct_dsn()).
+- los bloqueos (FOR UPDATE, pg_advisory_xact_lock, SAVEPOINT) deben vivir en
+  una sola transacción explícita: PgBouncer solo garantiza la misma conexión
+  del servidor hasta el COMMIT / ROLLBACK.
+"""
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from app.observability.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUT_SECONDS,
+    DB_POOL_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUTS,
+)
+
+
+def _as_bool(v, default=False):
+    if v is None:
+        return default
+    return str(v).lower() in ("1", "true", "yes", "y", "on")
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que actualiza los gauges en cada checkout / checkin."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        DB_POOL_SIZE.set(self.size())
+
+    def _publish(self) -> None:
+        DB_POOL_CHECKED_OUT.set(self.checkedout())
+        DB_POOL_OVERFLOW.set(max(self.overflow(), 0))
+
+    def connect(self):
+        t0 = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - t0)
+            self._publish()
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        self._publish()
+
+
+def pooler_mode() -> bool:
+    """True si la app habla con Postgres a través de PgBouncer (transaction pooling)."""
+    return (os.getenv("DB_POOLER_MODE") or "").strip().lower() in ("transaction", "pgbouncer", "1", "true")
+
+
+def direct_dsn() -> str | None:
+    """
+    DSN libpq para conexiones que necesitan estado de sesión (LISTEN, locks de
+    sesión). En modo pooler solo DATABASE_DIRECT_URL sirve; fuera de él, la misma
+    DATABASE_URL.
+    """
+    url = os.getenv("DATABASE_DIRECT_URL") or (None if pooler_mode() else os.getenv("DATABASE_URL"))
+    if not url:
+        return None
+    u = make_url(url)
+    if not u.drivername.startswith("postgres"):
+        return None
+    return u.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def engine_options_from_env(database_url: str | None) -> Dict[str, Any]:
+    """SQLALCHEMY_ENGINE_OPTIONS a partir del entorno (solo Postgres)."""
+    url = (database_url or "").lower()
+    if not url.startswith("postgres"):
+        return {}
+
+    opts: Dict[str, Any] = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _as_bool(os.getenv("DB_POOL_PRE_PING"), True),
+    }
+
+    connect_args: Dict[str, Any] = {}
+
+    # statement_timeout por conexión (ORM y raw_connection por igual)
+    stmt_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    if stmt_timeout > 0 and not pooler_mode():
+        connect_args["options"] = f"-c statement_timeout={stmt_timeout}"
+
+    if pooler_mode() and "+psycopg" in url and "+psycopg2" not in url:
+        connect_args["prepare_threshold"] = None  # psycopg 3: sin prepared statements
+
+    if connect_args:
+        opts["connect_args"] = connect_args
+    return opts
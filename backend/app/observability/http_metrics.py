@@ -0,0 +1,62 @@
+# app/observability/http_metrics.py
+"""
+Middleware de métricas HTTP (Prometheus).
+
+Por request: latencia (histograma), requests en curso, contador por código de
+estado y tamaño de la respuesta, etiquetados por blueprint y endpoint de Flask.
+Rutas sin match quedan como endpoint="unmatched" para no disparar la
+cardinalidad con URLs arbitrarias (404 de bots, etc.).
+
+Multiproceso: con PROMETHEUS_MULTIPROC_DIR definido (ver gunicorn.conf.py)
+prometheus_client escribe en archivos mmap por worker y /metrics los agrega.
+"""
+from __future__ import annotations
+
+import time
+
+from flask import Flask, g, request
+
+from app.observability.metrics import (
+    HTTP_IN_FLIGHT,
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS_TOTAL,
+    HTTP_RESPONSE_BYTES,
+)
+
+_SKIP_ENDPOINTS = {"metrics", "healthz", "static"}
+
+
+def _labels():
+    return request.blueprint or "", request.endpoint or "unmatched"
+
+
+def init_http_metrics(app: Flask) -> None:
+    @app.before_request
+    def _metrics_start():
+        if request.endpoint in _SKIP_ENDPOINTS:
+            return
+        bp, ep = _labels()
+        g._metrics_t0 = time.perf_counter()
+        g._metrics_labels = (bp, ep)
+        HTTP_IN_FLIGHT.labels(bp, ep).inc()
+
+    @app.after_request
+    def _metrics_observe(response):
+        t0 = g.pop("_metrics_t0", None)
+        if t0 is None:
+            return response
+        bp, ep = g._metrics_labels
+        method = request.method
+        HTTP_REQUEST_SECONDS.labels(method, bp, ep).observe(time.perf_counter() - t0)
+        HTTP_REQUESTS_TOTAL.labels(method, bp, ep, str(response.status_code)).inc()
+        size = response.calculate_content_length()
+        if size is not None:
+            HTTP_RESPONSE_BYTES.labels(method, bp, ep).observe(size)
+        return response
+
+    @app.teardown_request
+    def _metrics_done(exc):
+        # teardown corre siempre (incluso si after_request no llegó a ejecutarse)
+        labels = g.pop("_metrics_labels", None)
+        if labels is not None:
+            HTTP_IN_FLIGHT.labels(*labels).dec()
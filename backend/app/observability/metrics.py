@@ -1,4 +1,14 @@
-from prometheus_client import Counter, generate_latest, CONTENT_TYPE_LATEST
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
 
 SUBS_SYNC_OK = Counter("subs_sync_ok_total", "Sync OK de suscripciones")
 SUBS_SYNC_ERR = Counter("subs_sync_err_total", "Sync con error de suscripciones")
@@ -7,5 +17,114 @@ RTDN_ERR      = Counter("rtdn_error_total", "Errores procesando RTDN")
 RECONCILE_UPD = Counter("reconcile_updated_total", "Suscripciones actualizadas por reconcile")
 RECONCILE_ERR = Counter("reconcile_errors_total", "Errores en reconcile")
 
+# Pool de conexiones (app/db/pool.py). livesum: suma de los workers vivos.
+DB_POOL_SIZE        = Gauge("db_pool_size", "Tamaño configurado del pool (por worker)", multiprocess_mode="livesum")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Conexiones prestadas (ORM + raw_connection)", multiprocess_mode="livesum")
+DB_POOL_OVERFLOW    = Gauge("db_pool_overflow", "Conexiones abiertas por encima de pool_size", multiprocess_mode="livesum")
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Espera para obtener una conexión del pool (incluye conectar y pre_ping)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Checkouts que agotaron pool_timeout")
+
+# HTTP (app/observability/http_metrics.py). Etiquetas acotadas: endpoint de
+# Flask (no la URL), así /api/games/<id> no crea una serie por id.
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de requests por blueprint / endpoint",
+    ["method", "blueprint", "endpoint"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10, 30, 60),
+)
+HTTP_REQUESTS_TOTAL = Counter(
+    "http_requests_total",
+    "Requests por blueprint / endpoint / código de estado",
+    ["method", "blueprint", "endpoint", "status"],
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests en curso",
+    ["blueprint", "endpoint"],
+    multiprocess_mode="livesum",
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "http_response_size_bytes",
+    "Tamaño de la respuesta (sin streams de longitud desconocida)",
+    ["method", "blueprint", "endpoint"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000),
+)
+
+# SQL (app/observability/sql_metrics.py). fingerprint = hash del SQL normalizado
+# (máx. SQL_FINGERPRINT_MAX por proceso, el resto "other"); el texto sale en el log slow_query.
+SQL_QUERY_SECONDS = Histogram(
+    "sql_query_duration_seconds",
+    "Duración por sentencia (huella normalizada)",
+    ["fingerprint", "source"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+SQL_SLOW_TOTAL = Counter("sql_slow_queries_total", "Sentencias por encima de SQL_SLOW_MS", ["fingerprint"])
+SQL_QUERIES_PER_REQUEST = Histogram(
+    "sql_queries_per_request",
+    "Número de queries por request",
+    ["blueprint", "endpoint"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233, 500, 1000),
+)
+SQL_REQUEST_SECONDS = Histogram(
+    "sql_time_per_request_seconds",
+    "Tiempo total en SQL por request",
+    ["blueprint", "endpoint"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+# Scheduler con líder (app/scheduler.py)
+SCHEDULER_IS_LEADER = Gauge(
+    "scheduler_is_leader", "1 si este proceso tiene el lock de líder del scheduler", multiprocess_mode="livesum",
+)
+SCHEDULER_JOB_SECONDS = Histogram(
+    "scheduler_job_duration_seconds",
+    "Duración de cada job periódico",
+    ["job"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+SCHEDULER_JOB_RUNS = Counter("scheduler_job_runs_total", "Ejecuciones de jobs periódicos", ["job", "result"])
+
+# Correo saliente (app/services/notify/mail_queue.py)
+MAIL_QUEUE_DEPTH = Gauge("mail_queue_depth", "Correos en cola esperando un worker", multiprocess_mode="livesum")
+MAIL_QUEUE_WAIT_SECONDS = Histogram(
+    "mail_queue_wait_seconds",
+    "Tiempo en cola hasta que un worker toma el correo",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+MAIL_SEND_SECONDS = Histogram(
+    "mail_send_duration_seconds",
+    "Duración de cada intento de envío",
+    ["mode", "result"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30),
+)
+# result: queued | sent | retry | failed | inline | deferred
+MAIL_MESSAGES_TOTAL = Counter("mail_messages_total", "Correos por resultado", ["result"])
+
+# SMS (app/services/notify/sms_sender.py)
+SMS_SEND_SECONDS = Histogram(
+    "sms_send_duration_seconds",
+    "Duración de cada llamada al proveedor SMS",
+    ["provider", "kind", "result"],  # kind: single | bulk
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+SMS_MESSAGES_TOTAL = Counter("sms_messages_total", "SMS por resultado", ["provider", "result"])
+SMS_RATE_WAIT_SECONDS = Histogram(
+    "sms_rate_limit_wait_seconds",
+    "Espera en el limitador de tasa del proveedor",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+SMS_QUEUE_DEPTH = Gauge("sms_queue_depth", "SMS en cola esperando lote", multiprocess_mode="livesum")
+
+
 def metrics_http_response():
-    return generate_latest(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
\ No newline at end of file
+    # Con gunicorn (varios workers) cada proceso escribe en PROMETHEUS_MULTIPROC_DIR
+    # y aquí se agregan todos; sin esa variable, registro del proceso actual.
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), 200, {"Content-Type": CONTENT_TYPE_LATEST}
+    return generate_latest(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
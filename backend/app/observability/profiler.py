@@ -0,0 +1,223 @@
+# app/observability/profiler.py
+"""
+Profiler por muestreo para workers en producción (opt-in, sin dependencias).
+
+Un hilo toma sys._current_frames() cada PROFILE_INTERVAL_MS y acumula las pilas
+en formato "collapsed" (una línea "raíz;...;hoja N"), compatible con
+flamegraph.pl y speedscope. Los archivos quedan en PROFILES_DIR
+(storage/profiles).
+
+Formas de dispararlo (solo perfila el worker que lo recibe):
+- POST /api/admin/profile {seconds}: muestrea N s en segundo plano y devuelve
+  el nombre del archivo; GET /api/admin/profile/<name> lo descarga.
+- Señal PROFILE_SIGNAL (p. ej. SIGUSR2) enviada al PID de un worker:
+  muestrea PROFILE_SIGNAL_SEC s. Nunca al master de gunicorn (USR2 = upgrade).
+- Cabecera "X-Profile: 1" de un admin con PROFILE_REQUESTS=1: perfila solo el
+  hilo de ese request y responde con X-Profile-File.
+"""
+from __future__ import annotations
+
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from flask import Flask, current_app, g, request
+
+_busy = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_label(frame) -> str:
+    co = frame.f_code
+    return f"{co.co_name} ({os.path.basename(co.co_filename)}:{co.co_firstlineno})"
+
+
+class Sampler:
+    """Muestrea las pilas de todos los hilos (o solo `thread_ids`) del proceso."""
+
+    def __init__(self, interval: float, thread_ids: Optional[Iterable[int]] = None):
+        self.interval = max(0.001, float(interval))
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample_once(self, own_id: int, names: Dict[int, str]) -> None:
+        for tid, frame in sys._current_frames().items():
+            if tid == own_id or (self.thread_ids is not None and tid not in self.thread_ids):
+                continue
+            if names.get(tid, "").startswith("profiler"):
+                continue  # el hilo que controla el perfil (duerme N s)
+            parts: List[str] = []
+            while frame is not None:
+                parts.append(_frame_label(frame))
+                frame = frame.f_back
+            parts.append(names.get(tid, f"thread-{tid}"))
+            self.stacks[";".join(reversed(parts))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.is_set():
+            names = {t.ident: t.name for t in threading.enumerate()}
+            self._sample_once(own_id, names)
+            self._stop.wait(self.interval)
+
+    def start(self) -> "Sampler":
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+
+# -------------------------------------------------------------------
+#  Archivos
+# -------------------------------------------------------------------
+def profiles_dir(app: Optional[Flask] = None) -> Path:
+    app = app or current_app
+    rel = app.config.get("PROFILES_DIR") or os.path.join("storage", "profiles")
+    base = Path(app.root_path) / rel.replace("\\", "/").strip("/")
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def new_profile_name(tag: str) -> str:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S_%f")
+    return f"{stamp}_{os.getpid()}_{tag}.folded"
+
+
+def write_collapsed(path: Path, stacks: Counter) -> None:
+    part = path.with_suffix(".part")
+    with open(part, "w", encoding="utf-8") as fh:
+        for stack, n in stacks.most_common():
+            fh.write(f"{stack} {n}\n")
+    os.replace(part, path)
+
+
+def top_frames(stacks: Counter, limit: int = 15) -> List[Dict[str, object]]:
+    """Funciones hoja con más muestras (tiempo "propio")."""
+    total = sum(stacks.values()) or 1
+    leaves: Counter = Counter()
+    for stack, n in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += n
+    return [
+        {"frame": f, "samples": n, "pct": round(100.0 * n / total, 1)}
+        for f, n in leaves.most_common(limit)
+    ]
+
+
+def resolve_profile(name: str, app: Optional[Flask] = None) -> Optional[Path]:
+    """Ruta de un perfil ya escrito (sin permitir salir de PROFILES_DIR)."""
+    if not name or "/" in name or "\\" in name or not name.endswith(".folded"):
+        return None
+    path = profiles_dir(app) / name
+    return path if path.is_file() else None
+
+
+# -------------------------------------------------------------------
+#  Perfil de N segundos (endpoint admin / señal)
+# -------------------------------------------------------------------
+def _profile_for(app: Flask, seconds: float, interval: float, name: str) -> None:
+    try:
+        sampler = Sampler(interval).start()
+        time.sleep(seconds)
+        stacks = sampler.stop()
+        write_collapsed(profiles_dir(app) / name, stacks)
+        app.logger.info("🔥 perfil %s listo (%d muestras)", name, sampler.samples)
+    except Exception:
+        app.logger.exception("profiler: falló el perfil %s", name)
+    finally:
+        _busy.release()
+
+
+def start_profile(seconds: float, app: Optional[Flask] = None, tag: str = "api") -> Dict[str, object]:
+    """Lanza un perfil en segundo plano. ProfilerBusy si ya hay uno en curso."""
+    app = app or current_app._get_current_object()
+    max_sec = float(app.config.get("PROFILE_MAX_SEC") or 60)
+    seconds = min(max(float(seconds), 1.0), max_sec)
+    interval = float(app.config.get("PROFILE_INTERVAL_MS") or 5) / 1000.0
+
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("Ya hay un perfil en curso en este worker")
+    name = new_profile_name(tag)
+    try:
+        threading.Thread(
+            target=_profile_for, args=(app, seconds, interval, name),
+            name="profiler", daemon=True,
+        ).start()
+    except Exception:
+        _busy.release()
+        raise
+    return {"name": name, "seconds": seconds, "pid": os.getpid()}
+
+
+# -------------------------------------------------------------------
+#  Registro (señal + cabecera por request)
+# -------------------------------------------------------------------
+def init_profiler(app: Flask) -> None:
+    sig_name = (app.config.get("PROFILE_SIGNAL") or "").strip().upper()
+    if sig_name:
+        try:
+            signum = getattr(signal, sig_name)
+
+            def _on_signal(_signum, _frame):
+                try:
+                    start_profile(app.config.get("PROFILE_SIGNAL_SEC") or 30, app=app, tag="signal")
+                except ProfilerBusy:
+                    pass
+
+            signal.signal(signum, _on_signal)
+        except (AttributeError, ValueError) as e:
+            # ValueError: fuera del hilo principal
+            app.logger.warning("profiler: no se pudo registrar %s: %s", sig_name, e)
+
+    if not app.config.get("PROFILE_REQUESTS"):
+        return
+
+    @app.before_request
+    def _profile_request_start():
+        if request.headers.get("X-Profile") != "1":
+            return
+        from app.security.identity import current_identity
+        ident = current_identity()
+        if ident.source not in ("session", "bearer") or not ident.is_admin:
+            return
+        interval = float(app.config.get("PROFILE_INTERVAL_MS") or 5) / 1000.0
+        g._profile_sampler = Sampler(interval, thread_ids=[threading.get_ident()]).start()
+
+    @app.after_request
+    def _profile_request_end(response):
+        sampler = g.pop("_profile_sampler", None)
+        if sampler is None:
+            return response
+        stacks = sampler.stop()
+        name = new_profile_name("request")
+        try:
+            write_collapsed(profiles_dir(app) / name, stacks)
+            response.headers["X-Profile-File"] = name
+            response.headers["X-Profile-Samples"] = str(sampler.samples)
+        except OSError as e:
+            app.logger.warning("profiler: no se pudo escribir %s: %s", name, e)
+        return response
+
+    @app.teardown_request
+    def _profile_request_cleanup(exc):
+        # Si after_request no llegó a correr, que el hilo de muestreo no quede vivo
+        sampler = g.pop("_profile_sampler", None)
+        if sampler is not None:
+            sampler.stop()
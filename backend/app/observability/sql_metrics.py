@@ -0,0 +1,239 @@
+# app/observability/sql_metrics.py
+"""
+Instrumentación de SQL.
+
+- ORM / text(): eventos before/after_cursor_execute del engine.
+- Cursores crudos: get_db() (app/db) devuelve la conexión envuelta
+  (InstrumentedRawConnection) y cada cursor mide execute / executemany /
+  copy_expert. Los call sites usan get_db() en vez de db.engine.raw_connection().
+
+Por sentencia: huella (fingerprint) = SQL normalizado sin literales ni
+parámetros → histograma de duración por huella en /metrics. El label está
+acotado: pasadas SQL_FINGERPRINT_MAX huellas distintas en el proceso (SQL
+armado con f-strings / IN dinámicos), las nuevas se agrupan en "other"; el log
+slow_query conserva la huella real.
+Por request: número de queries y tiempo total (histograma por endpoint, y
+cabeceras X-SQL-Count / X-SQL-Time-Ms si SQL_DEBUG_HEADERS=1).
+
+Logs (logger "sql", una línea JSON):
+- slow_query: sentencias por encima de SQL_SLOW_MS.
+- n_plus_one: al cerrar el request, si una misma huella se repitió
+  SQL_REPEAT_WARN veces o más (típico bucle por comisión / por usuario).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Tuple
+
+from flask import Flask, g, has_request_context, request
+from sqlalchemy import event
+
+from app.observability.metrics import (
+    SQL_QUERIES_PER_REQUEST,
+    SQL_QUERY_SECONDS,
+    SQL_REQUEST_SECONDS,
+    SQL_SLOW_TOTAL,
+)
+
+log = logging.getLogger("sql")
+
+_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "500"))
+_REPEAT_WARN = int(os.getenv("SQL_REPEAT_WARN", "20"))
+_DEBUG_HEADERS = (os.getenv("SQL_DEBUG_HEADERS") or "").lower() in ("1", "true", "yes", "on")
+_FINGERPRINT_MAX = int(os.getenv("SQL_FINGERPRINT_MAX", "500"))
+_OTHER = "other"
+
+_seen_fps: set = set()
+_seen_lock = threading.Lock()
+
+_RE_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_PARAM = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|\$\d+|\?")
+_RE_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_VALUES = re.compile(r"(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.I)
+_RE_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> Tuple[str, str]:
+    """(huella corta, SQL normalizado). Cacheado: los text() del código se repiten."""
+    s = _RE_COMMENT.sub(" ", statement)
+    s = _RE_STRING.sub("?", s)
+    s = _RE_PARAM.sub("?", s)
+    s = _RE_NUMBER.sub("?", s)
+    s = _RE_LIST.sub("(?+)", s)
+    s = _RE_VALUES.sub(r"\1, ...", s)
+    s = _RE_SPACE.sub(" ", s).strip()
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()[:12], s
+
+
+def _label(fp: str) -> str:
+    """Huella como label de Prometheus, con cardinalidad acotada por proceso."""
+    if fp in _seen_fps:
+        return fp
+    with _seen_lock:
+        if fp in _seen_fps:
+            return fp
+        if len(_seen_fps) >= _FINGERPRINT_MAX:
+            return _OTHER
+        _seen_fps.add(fp)
+        return fp
+
+
+def _record(statement: str, elapsed: float, source: str) -> None:
+    fp, normalized = fingerprint(statement)
+    label = _label(fp)
+    SQL_QUERY_SECONDS.labels(label, source).observe(elapsed)
+
+    if has_request_context():
+        g._sql_count = g.get("_sql_count", 0) + 1
+        g._sql_time = g.get("_sql_time", 0.0) + elapsed
+        fps = g.get("_sql_fps")
+        if fps is None:
+            fps = g._sql_fps = Counter()
+        fps[fp] += 1
+        endpoint = request.endpoint or "unmatched"
+    else:
+        endpoint = None
+
+    ms = elapsed * 1000.0
+    if ms >= _SLOW_MS:
+        SQL_SLOW_TOTAL.labels(label).inc()
+        log.warning(json.dumps({
+            "event": "slow_query",
+            "fingerprint": fp,
+            "ms": round(ms, 1),
+            "source": source,
+            "endpoint": endpoint,
+            "sql": normalized[:1000],
+        }, ensure_ascii=False))
+
+
+# -------------------------------------------------------------------
+#  Cursores crudos
+# -------------------------------------------------------------------
+class InstrumentedCursor:
+    """Envuelve un cursor DBAPI; el resto de atributos pasan al cursor real."""
+
+    __slots__ = ("_cur",)
+
+    def __init__(self, cur):
+        object.__setattr__(self, "_cur", cur)
+
+    def _timed(self, fn, sql, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(sql, *args, **kwargs)
+        finally:
+            if isinstance(sql, bytes):
+                sql = sql.decode("utf-8", "replace")
+            _record(str(sql), time.perf_counter() - t0, "raw")
+
+    def execute(self, sql, *args, **kwargs):
+        return self._timed(self._cur.execute, sql, *args, **kwargs)
+
+    def executemany(self, sql, *args, **kwargs):
+        return self._timed(self._cur.executemany, sql, *args, **kwargs)
+
+    def copy_expert(self, sql, *args, **kwargs):
+        return self._timed(self._cur.copy_expert, sql, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cur, name, value)
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def __enter__(self):
+        self._cur.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._cur.__exit__(*exc)
+
+
+class InstrumentedRawConnection:
+    """Envuelve la conexión de raw_connection() (ver get_db); solo cambia cursor()."""
+
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn):
+        object.__setattr__(self, "_conn", conn)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+
+# -------------------------------------------------------------------
+#  Registro
+# -------------------------------------------------------------------
+def instrument_engine(engine) -> None:
+    if getattr(engine, "_sql_metrics", False):
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_sql_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_sql_t0")
+        if stack:
+            _record(statement, time.perf_counter() - stack.pop(), "orm")
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx):
+        stack = ctx.connection.info.get("_sql_t0") if ctx.connection is not None else None
+        if stack:
+            stack.pop()
+
+    engine._sql_metrics = True
+
+
+def init_sql_metrics(app: Flask) -> None:
+    from app.db.database import db
+
+    with app.app_context():
+        instrument_engine(db.engine)
+
+    @app.after_request
+    def _sql_per_request(response):
+        count = g.get("_sql_count", 0)
+        total = g.get("_sql_time", 0.0)
+        if request.endpoint not in (None, "metrics", "healthz", "static"):
+            SQL_QUERIES_PER_REQUEST.labels(request.blueprint or "", request.endpoint).observe(count)
+            SQL_REQUEST_SECONDS.labels(request.blueprint or "", request.endpoint).observe(total)
+        if _DEBUG_HEADERS:
+            response.headers["X-SQL-Count"] = str(count)
+            response.headers["X-SQL-Time-Ms"] = f"{total * 1000.0:.1f}"
+
+        fps = g.get("_sql_fps")
+        if fps:
+            fp, n = fps.most_common(1)[0]
+            if n >= _REPEAT_WARN:
+                log.warning(json.dumps({
+                    "event": "n_plus_one",
+                    "endpoint": request.endpoint,
+                    "fingerprint": fp,
+                    "repeats": n,
+                    "queries": count,
+                }, ensure_ascii=False))
+        return response
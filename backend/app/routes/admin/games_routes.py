@@ -1,8 +1,7 @@
 # app/routes/admin/games_routes.py
 from datetime import datetime
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from flask import Blueprint, request, jsonify, session
-from app.db.database import db  # <- tu SQLAlchemy()
+from app.db import get_db  # conexión cruda medida (sql_metrics)
 from app.services.admin.games_service import (
     list_games,
     list_lotteries,
@@ -12,6 +11,8 @@ from app.services.admin.games_service import (
     peek_latest_schedule_notice,   # 👈 en vez de pop
     mark_notifications_read,       # 👈 nueva
 )
+from app.services.notify.notifications_service import get_unread_count
+from app.security.identity import resolve_user_id
 
 admin_games_bp = Blueprint("admin_games_bp", __name__, url_prefix="/api/admin/games")
 
@@ -21,18 +22,19 @@ me_notifications_bp = Blueprint(
     url_prefix="/api/me/notifications"
 )
 
-# GET /api/admin/games?q=&page=&per_page=
+# GET /api/admin/games?q=&page=&per_page=&cursor=
 @admin_games_bp.get("/")
 
 def admin_list_games():
     q = (request.args.get("q") or "").strip()
     page = int(request.args.get("page") or 1)
     per_page = int(request.args.get("per_page") or 50)
+    cursor = request.args.get("cursor") or None   # keyset (next_cursor de la página anterior)
 
     conn = None
     try:
-        conn = db.engine.raw_connection()      # ✅ conexión cruda (psycopg2)
-        data = list_games(conn, q=q, page=page, per_page=per_page)
+        conn = get_db()      # ✅ conexión cruda (psycopg2)
+        data = list_games(conn, q=q, page=page, per_page=per_page, cursor=cursor)
         return jsonify(data), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -45,7 +47,7 @@ def admin_list_games():
 def admin_list_lotteries():
     conn = None
     try:
-        conn = db.engine.raw_connection()
+        conn = get_db()
         items = list_lotteries(conn)
         return jsonify({"items": items}), 200
     except Exception as e:
@@ -80,7 +82,7 @@ def admin_update_game(game_id: int):
 
     conn = None
     try:
-        conn = db.engine.raw_connection()
+        conn = get_db()
         item = update_game(conn, game_id, lottery_id, scheduled_date, scheduled_time, winning_number, lottery_name=lottery_name)
         if not item:
             return jsonify({"error": "Game not found"}), 404
@@ -118,7 +120,7 @@ def admin_set_winner(game_id: int):
 
     conn = None
     try:
-        conn = db.engine.raw_connection()
+        conn = get_db()
         item = set_winning_number(conn, game_id, winning_number, int(user_id))
         if not item:
             # Puede ser porque el número no pertenece al juego
@@ -135,7 +137,7 @@ def admin_set_winner(game_id: int):
 def admin_delete_game(game_id: int):
     conn = None
     try:
-        conn = db.engine.raw_connection()
+        conn = get_db()
         deleted = delete_game(conn, game_id)
         if not deleted:
             return jsonify({"error": "Game not found"}), 404
@@ -147,30 +149,14 @@ def admin_delete_game(game_id: int):
             conn.close()
 @me_notifications_bp.get("/peek-schedule")
 def peek_schedule():
-    uid = None
-
-    xuid = request.headers.get("X-USER-ID")
-    if xuid and xuid.isdigit():
-        uid = int(xuid)
-
-    if uid is None:
-        try:
-            verify_jwt_in_request(optional=True)
-            ident = get_jwt_identity()
-            uid = int(ident) if ident is not None else None
-        except Exception:
-            uid = None
-
-    if uid is None:
-        s_uid = session.get("user_id")
-        uid = int(s_uid) if s_uid else None
+    uid = resolve_user_id()
 
     if uid is None:
         return jsonify({}), 200
 
     conn = None
     try:
-        conn = db.engine.raw_connection()
+        conn = get_db()
         item = peek_latest_schedule_notice(conn, uid)  # no marca leído
         return jsonify(item or {}), 200
     except Exception as e:
@@ -181,23 +167,7 @@ def peek_schedule():
 
 @me_notifications_bp.post("/mark-read")
 def mark_read():
-    uid = None
-    auth = request.headers.get("Authorization", "")
-    if auth.startswith("Bearer "):
-        token = auth.split(" ", 1)[1]
-        try:
-            # payload = decode_token(token)
-            # uid = int(payload.get("user_id") or payload.get("sub"))
-            pass
-        except Exception:
-            uid = None
-    if uid is None:
-        xuid = request.headers.get("X-USER-ID")
-        if xuid and xuid.isdigit():
-            uid = int(xuid)
-    if uid is None:
-        s_uid = session.get("user_id")
-        uid = int(s_uid) if s_uid else None
+    uid = resolve_user_id()
 
     if uid is None:
         return jsonify({"error": "no_user"}), 401
@@ -211,9 +181,9 @@ def mark_read():
 
     conn = None
     try:
-        conn = db.engine.raw_connection()
+        conn = get_db()
         updated = mark_notifications_read(conn, uid, ids)
-        return jsonify({"ok": True, "updated": updated}), 200
+        return jsonify({"ok": True, "updated": updated, "unread": get_unread_count(conn, uid)}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -1,8 +1,7 @@
 # app/routes/admin/players_routes.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
-from sqlalchemy import text
-from app.db.database import db
+from flask_jwt_extended import jwt_required
+from app.security.identity import current_role_id
 from app.services.admin.players_service import (
     list_players,
     delete_player_numbers,
@@ -14,14 +13,8 @@ from app.services.admin.players_service import (
 admin_players_bp = Blueprint("admin_players", __name__, url_prefix="/api/admin")
 
 def _get_role_id():
-    claims = get_jwt() or {}
-    role_id = claims.get("role_id")
-    if role_id is None:
-        uid = get_jwt_identity()
-        role_id = db.session.execute(
-            text("SELECT role_id FROM users WHERE id=:uid"), {"uid": uid}
-        ).scalar()
-    return role_id
+    # Claim rid/role_id del token; fallback a DB como mucho una vez por petición
+    return current_role_id()
 
 @admin_players_bp.get("/players")
 @jwt_required()
@@ -1,15 +1,17 @@
 # app/routes/admin/referrals_routes.py
 from flask import jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import text
 from app.db.database import db
 from flask import current_app
 from . import bp  # blueprint del paquete admin
+from app.security.identity import require_admin
 from app.services.admin.referrals_service import get_referrals_summary
 from werkzeug.exceptions import BadRequest
 from app.services.admin.referrals_service import get_commission_request_breakdown
 from app.services.admin.referrals_payouts_service import (
     list_commission_requests,
+    SQL_PAYOUT_BATCHES_SELECT,
     create_payment_batch,           # pagar (con evidencias) sigue aquí
 )
 # 👇 rechazar debe venir del servicio core, que restaura 'available' y notifica
@@ -31,18 +33,9 @@ def referrals_summary():
       ?referrer_id=<id>  filtra por el promotor (si lo necesitas)
     """
     # ---- Guard: solo administradores ----
-    claims = get_jwt() or {}
-    role_id = claims.get("role_id") or claims.get("rid") or claims.get("role")
-
-    if role_id is None:
-        uid = get_jwt_identity()
-        role_id = db.session.execute(
-            text("SELECT role_id FROM users WHERE id=:uid"),
-            {"uid": uid},
-        ).scalar()
-
-    if int(role_id or 0) != 1:
-        return jsonify({"ok": False, "error": "Solo administradores"}), 403
+    resp = require_admin()
+    if resp:
+        return resp
 
     # ---- Parámetro opcional ----
     referrer_id = request.args.get("referrer_id", type=int)
@@ -58,11 +51,9 @@ def referrals_top():
     """
     Devuelve el top de referidores con más referidos activos.
     """
-    claims = get_jwt() or {}
-    role_id = claims.get("role_id") or claims.get("rid") or claims.get("role")
-
-    if int(role_id or 0) != 1:
-        return jsonify({"ok": False, "error": "Solo administradores"}), 403
+    resp = require_admin()
+    if resp:
+        return resp
 
     from app.services.admin.referrals_service import get_top_referrers
     top = get_top_referrers(limit=5)
@@ -113,10 +104,9 @@ def admin_get_user_detail(user_id: int):
       nombres, identificación, flag PRO y datos bancarios más recientes.
     """
     # Guard: solo admin
-    claims = get_jwt() or {}
-    role_id = claims.get("role_id") or claims.get("rid") or claims.get("role")
-    if int(role_id or 0) != 1:
-        return jsonify({"ok": False, "error": "Solo administradores"}), 403
+    resp = require_admin()
+    if resp:
+        return resp
 
     try:
         from app.services.admin.referrals_service import get_admin_user_detail
@@ -136,10 +126,9 @@ def admin_commission_request_breakdown(request_id: int):
       { ok: true, item: { request_id, user_id, requested_cop, items:[...], items_total_cop, matches_request, currency } }
     """
     # Guard: solo admin
-    claims = get_jwt() or {}
-    role_id = claims.get("role_id") or claims.get("rid") or claims.get("role")
-    if int(role_id or 0) != 1:
-        return jsonify({"ok": False, "error": "Solo administradores"}), 403
+    resp = require_admin()
+    if resp:
+        return resp
 
     try:
         data = get_commission_request_breakdown(request_id)
@@ -155,10 +144,9 @@ def admin_commission_request_breakdown(request_id: int):
 @bp.post("/referrals/payout-requests/<int:request_id>/reject")
 @jwt_required()
 def admin_reject_payout_request(request_id: int):
-    claims = get_jwt() or {}
-    role_id = claims.get("role_id") or claims.get("rid") or claims.get("role")
-    if int(role_id or 0) != 1:
-        return jsonify({"ok": False, "error": "Solo administradores"}), 403
+    resp = require_admin()
+    if resp:
+        return resp
 
     body = request.get_json(silent=True) or {}
     reason = (body.get("reason") or "").strip()
@@ -195,10 +183,9 @@ def admin_create_payout_batch():
       { ok: true, item: { batch_id, total_micros, currency, request_ids, files_count, created_at } }
     """
     # Guard: solo admin
-    claims = get_jwt() or {}
-    role_id = claims.get("role_id") or claims.get("rid") or claims.get("role")
-    if int(role_id or 0) != 1:
-        return jsonify({"ok": False, "error": "Solo administradores"}), 403
+    resp = require_admin()
+    if resp:
+        return resp
 
     admin_id = get_jwt_identity()
 
@@ -275,50 +262,16 @@ from sqlalchemy import text
 @jwt_required()
 def admin_list_payout_batches():
     # Guard admin
-    claims = get_jwt() or {}
-    role_id = claims.get("role_id") or claims.get("rid") or claims.get("role")
-    if int(role_id or 0) != 1:
-        return jsonify({"ok": False, "error": "Solo administradores"}), 403
+    resp = require_admin()
+    if resp:
+        return resp
 
     try:
         limit  = int(request.args.get("limit",  "50"))
         offset = int(request.args.get("offset", "0"))
 
-        sql = text("""
-            WITH base AS (
-            SELECT
-                pb.id,
-                pb.created_at,
-                pb.currency_code AS currency,
-                COALESCE(
-                pb.total_micros,
-                SUM(COALESCE(pbi.amount_micros, pr.amount_micros))
-                ) AS total_micros,
-                COUNT(DISTINCT pbi.payout_request_id) AS requests_count,
-                MIN(pr.user_id)           AS first_user_id,
-                MIN(u.name)               AS first_user_name,
-                MIN(u.public_code)        AS first_user_code,        -- 👈 NUEVO
-                EXISTS (
-                SELECT 1 FROM payout_payment_files pf WHERE pf.batch_id = pb.id
-                ) AS has_files
-            FROM payout_payment_batches pb
-            LEFT JOIN payout_payment_batch_items pbi ON pbi.batch_id = pb.id
-            LEFT JOIN payout_requests pr            ON pr.id = pbi.payout_request_id
-            LEFT JOIN users u                       ON u.id = pr.user_id
-            GROUP BY pb.id, pb.created_at, pb.currency_code, pb.total_micros
-            )
-            SELECT
-            id,
-            created_at,
-            currency,
-            requests_count                                   AS items,
-            (total_micros / 1000000)::bigint                 AS total_cop,
-            has_files,
-            first_user_id,
-            first_user_name,
-            first_user_code,                                  -- 👈 NUEVO
-            ('PB-' || lpad(id::text, 6, '0'))               AS code
-            FROM base
+        sql = text(f"""
+            {SQL_PAYOUT_BATCHES_SELECT}
             ORDER BY id DESC
             LIMIT :limit OFFSET :offset
         """)
@@ -352,10 +305,9 @@ def admin_list_payout_batches():
 @jwt_required()
 def admin_payout_batch_details(batch_id: int):
     # Guard admin
-    claims = get_jwt() or {}
-    role_id = claims.get("role_id") or claims.get("rid") or claims.get("role")
-    if int(role_id or 0) != 1:
-        return jsonify({"ok": False, "error": "Solo administradores"}), 403
+    resp = require_admin()
+    if resp:
+        return resp
 
     try:
         # HEAD
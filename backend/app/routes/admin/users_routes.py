@@ -1,9 +1,11 @@
 # app/routes/admin/users_routes.py
 from flask import jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from sqlalchemy import text
 from app.db.database import db
 from . import bp
+from app.security.identity import require_admin
+from app.services.auth.profile_cache import invalidate_user, notify_user_changed
 
 from app.services.admin.users_service import (
     list_users,
@@ -19,18 +21,9 @@ from app.subscriptions.service import expire_all_stale
 @bp.get("/users")
 @jwt_required()
 def admin_users():
-    claims = get_jwt() or {}
-    role_id = claims.get("role_id") or claims.get("rid") or claims.get("role")
-
-    if role_id is None:
-        user_id = get_jwt_identity()
-        role_id = db.session.execute(
-            text("SELECT role_id FROM users WHERE id=:uid"),
-            {"uid": user_id},
-        ).scalar()
-
-    if int(role_id) != 1:
-        return jsonify({"ok": False, "error": "Solo administradores"}), 403
+    resp = require_admin()
+    if resp:
+        return resp
 
     q = request.args.get("q")
     page = request.args.get("page", type=int, default=1)
@@ -49,19 +42,9 @@ def admin_users():
 @bp.patch("/users/<int:user_id>/role")
 @jwt_required()
 def update_user_role(user_id):
-    claims = get_jwt() or {}
-    role_id = claims.get("role_id") or claims.get("rid") or claims.get("role")
-
-    if role_id is None:
-        # fallback: leer desde BD usando el identity del token
-        user_id_token = get_jwt_identity()
-        role_id = db.session.execute(
-            text("SELECT role_id FROM users WHERE id=:uid"),
-            {"uid": user_id_token}
-        ).scalar()
-
-    if int(role_id) != 1:
-        return jsonify({"ok": False, "error": "Solo administradores"}), 403
+    resp = require_admin()
+    if resp:
+        return resp
 
     data = request.get_json()
     new_role_id = data.get("role_id")
@@ -73,7 +56,9 @@ def update_user_role(user_id):
         text("UPDATE users SET role_id=:rid WHERE id=:uid"),
         {"rid": new_role_id, "uid": user_id}
     )
+    notify_user_changed(db.session, user_id)
     db.session.commit()
+    invalidate_user(user_id)
 
     return jsonify({"ok": True, "message": "Rol actualizado correctamente"})
 
@@ -83,18 +68,9 @@ def update_user_role(user_id):
 @bp.delete("/users/<int:user_id>")
 @jwt_required()
 def admin_users_delete(user_id: int):
-    claims = get_jwt() or {}
-    role_id = claims.get("role_id") or claims.get("rid") or claims.get("role")
-
-    if role_id is None:
-        uid = get_jwt_identity()
-        role_id = db.session.execute(
-            text("SELECT role_id FROM users WHERE id=:uid"),
-            {"uid": uid},
-        ).scalar()
-
-    if int(role_id) != 1:
-        return jsonify({"ok": False, "error": "Solo administradores"}), 403
+    resp = require_admin()
+    if resp:
+        return resp
 
     try:
         ok = delete_user(user_id)
@@ -126,15 +102,9 @@ def admin_users_delete(user_id: int):
 @bp.post("/subscriptions/expire-stale")
 @jwt_required()
 def admin_expire_stale():
-    claims = get_jwt() or {}
-    role_id = claims.get("role_id") or claims.get("rid") or claims.get("role")
-    if role_id is None:
-        uid = get_jwt_identity()
-        role_id = db.session.execute(
-            text("SELECT role_id FROM users WHERE id=:uid"), {"uid": uid}
-        ).scalar()
-    if int(role_id) != 1:
-        return jsonify({"ok": False, "error": "Solo administradores"}), 403
+    resp = require_admin()
+    if resp:
+        return resp
 
     try:
         updated = expire_all_stale()
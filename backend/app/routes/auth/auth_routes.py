@@ -1,6 +1,6 @@
 # backend/app/routes/auth/auth_routes.py
 from flask import Blueprint, request, jsonify, current_app
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,   # <-- NUEVO
@@ -11,10 +11,18 @@ from flask_jwt_extended import (
 from app.services.auth.auth_service import login_with_phone, AuthError, get_profile
 from app.models.user import User
 from app.models.token_blocklist import TokenBlocklist
+from app.security.revocation_cache import revocation_cache, notify_revoked
 from app.db.database import db
 
 auth_bp = Blueprint("auth_bp", __name__, url_prefix="/api/auth")
 
+def _token_exp(claims) -> datetime | None:
+    """exp del JWT como datetime UTC naive (token_blocklist.expires_at), para poder purgarlo."""
+    exp = claims.get("exp")
+    if exp is None:
+        return None
+    return datetime.fromtimestamp(int(exp), tz=timezone.utc).replace(tzinfo=None)
+
 def _to_int(value, default=0):
     try:
         return int(value)
@@ -94,8 +102,10 @@ def logout_access():
     jti = j.get("jti")
     uid = get_jwt_identity()
 
-    db.session.add(TokenBlocklist(jti=jti, token_type="access", user_id=int(uid)))
+    db.session.add(TokenBlocklist(jti=jti, token_type="access", user_id=int(uid), expires_at=_token_exp(j)))
+    notify_revoked(db.session, jti)   # 👈 otros workers se enteran al hacer commit
     db.session.commit()
+    revocation_cache.mark_revoked(jti)
 
     return jsonify({"ok": True, "revoked": True, "type": "access"}), 200
 
@@ -106,8 +116,10 @@ def logout_refresh():
     jti = j.get("jti")
     uid = get_jwt_identity()
 
-    db.session.add(TokenBlocklist(jti=jti, token_type="refresh", user_id=int(uid)))
+    db.session.add(TokenBlocklist(jti=jti, token_type="refresh", user_id=int(uid), expires_at=_token_exp(j)))
+    notify_revoked(db.session, jti)   # 👈 otros workers se enteran al hacer commit
     db.session.commit()
+    revocation_cache.mark_revoked(jti)
 
     return jsonify({"ok": True, "revoked": True, "type": "refresh"}), 200
 
@@ -2,6 +2,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.db.database import db
+from app.db import get_db
 from app.subscriptions.service import get_status as get_sub_status
 
 # Usa el guard centralizado del service (fecha + estado)
@@ -22,6 +23,7 @@ from app.services.games.games_service import (
 from app.services.notify.notifications_service import (
     create_notifications_for_game_winner,
 )
+from app.services.admin.kpi_snapshot import request_counters_refresh
 
 # Resolver user_id unificado (session → bearer → X-USER-ID)
 from app.security.auth_utils import resolve_user_id as _resolve_user_id
@@ -130,6 +132,7 @@ def commit():
         res = commit_selection(uid, game_id, numbers_int)
 
     if res.get("ok"):
+        request_counters_refresh()  # 📊 solo contadores; referidos y series quedan al scheduler
         flat = {k: v for k, v in res.items() if k != "ok"}
         return jsonify({"ok": True, "data": flat}), 200
 
@@ -144,15 +147,8 @@ def commit():
 @games_bp.delete("/<int:game_id>/selection")
 @jwt_required(optional=True)
 def release(game_id: int):
-    # primero intenta con header X-USER-ID (para forzar identidad exacta)
-    uid_hdr = request.headers.get("X-USER-ID")
-    uid_jwt = get_jwt_identity()
-
-    uid = uid_hdr if uid_hdr is not None else uid_jwt
-    try:
-        uid = int(uid) if uid is not None else None
-    except Exception:
-        uid = None
+    # JWT ya verificado por el decorador → session → X-USER-ID
+    uid = _resolve_user_id()
 
     if uid is None:
         return jsonify({"ok": False, "code": "UNAUTHORIZED", "message": "Sin usuario"}), 401
@@ -259,7 +255,7 @@ def announce_winner(game_id: int):
     if not ok:
         return jsonify({"ok": False, "message": msg or "No se pudo cerrar el juego"}), 400
 
-    conn = db.engine.raw_connection()
+    conn = get_db()
     try:
         inserted = create_notifications_for_game_winner(conn, game_id, winning_number)
     finally:
@@ -289,7 +285,7 @@ def api_history():
     sub_status = get_sub_status(int(uid))
     max_digits = (sub_status.max_digits or 3) if sub_status.is_premium else 2
 
-    conn = db.engine.raw_connection()
+    conn = get_db()
     try:
         data = list_user_history(conn, int(uid), page, per_page, max_digits=max_digits)
         return jsonify(data), 200
@@ -1,10 +1,10 @@
-from flask import Blueprint, request, jsonify, session, current_app
-from app.db.database import db
+from flask import Blueprint, request, jsonify
+from app.db import get_db
+from app.security.identity import current_identity
 from app.services.notify.notifications_service import (
-    list_notifications, mark_as_read, mark_all_as_read
+    list_notifications, mark_as_read, mark_all_as_read,
+    get_unread_count, list_notifications_since,
 )
-import os
-import jwt           # PyJWT
 import logging
 from app.services.notify.device_tokens_service import (
     register_device_token as svc_register,
@@ -17,60 +17,15 @@ from app.services.notify.device_tokens_service import (
     delete_device_token   as svc_delete_token,
 )
 
-def _jwt_secret():
-    # Usa el mismo secreto que firmó el token
-    return (
-        current_app.config.get("JWT_SECRET_KEY")
-        or os.getenv("JWT_SECRET")                 # por si lo cargas desde .env
-        or current_app.config.get("SECRET_KEY")    # último recurso
-    )
-
-ALLOW_UNVERIFIED_JWT = os.getenv("ALLOW_UNVERIFIED_JWT", "false").lower() in ("1", "true", "yes")
-
 def _log(msg, *args):
     logging.getLogger("notifications").warning(msg, *args)
 
-def _user_from_session() -> int | None:
-    uid = session.get("user_id")
-    if uid:
-        _log("[AUTH] session user_id=%s", uid)
-        return int(uid)
-    return None
-
-def _user_from_bearer() -> int | None:
-    auth = request.headers.get("Authorization", "")
-    if not auth.startswith("Bearer "):
-        return None
-    token = auth.split(" ", 1)[1]
-
-    # 1) Intento con verificación de firma
-    try:
-        payload = jwt.decode(token, _jwt_secret(), algorithms=["HS256"])
-        sub = payload.get("sub")
-        _log("[AUTH] Bearer OK con firma; sub=%s", sub)
-        return int(sub) if sub is not None else None
-    
-    except Exception as e:
-        _log("[AUTH] Bearer con firma FALLÓ: %s", e)
-        # Solo para depurar el payload, no aceptar:
-        try:
-            payload_unverified = jwt.decode(token, options={"verify_signature": False}, algorithms=["HS256"])
-            _log("[AUTH] Bearer sin verif.: payload=%s", payload_unverified)
-        except Exception:
-            pass
-        return None
-
-
-def _user_from_x_user_id() -> int | None:
-    xuid = request.headers.get("X-USER-ID")
-    if xuid and str(xuid).isdigit():
-        _log("[AUTH] X-USER-ID=%s", xuid)
-        return int(xuid)
-    return None
-
 def _resolve_user_id() -> int | None:
-    """Intenta: session → bearer → X-USER-ID"""
-    return _user_from_session() or _user_from_bearer() or _user_from_x_user_id()
+    """session → bearer → X-USER-ID (resuelto una vez por petición en security.identity)"""
+    ident = current_identity()
+    if ident.user_id:
+        _log("[AUTH] %s user_id=%s", ident.source, ident.user_id)
+    return ident.user_id
 
 notifications_bp = Blueprint("notifications_bp", __name__, url_prefix="/api/notifications")
 
@@ -87,13 +42,46 @@ def get_notifications():
 
     _log("[NOTIFS] uid=%s unread=%s page=%s per_page=%s", uid, unread, page, per_page)
 
-    conn = db.engine.raw_connection()
+    conn = get_db()
     try:
         data = list_notifications(conn, int(uid), unread, page, per_page)
         return jsonify(data), 200
     finally:
         conn.close()
 
+@notifications_bp.get("/unread-count")
+def get_unread_badge():
+    uid = _resolve_user_id()
+    if not uid:
+        _log("[AUTH] unread_count => 403")
+        return jsonify({"error": "No autorizado"}), 403
+
+    conn = get_db()
+    try:
+        return jsonify({"unread": get_unread_count(conn, int(uid))}), 200
+    finally:
+        conn.close()
+
+@notifications_bp.get("/since")
+def get_notifications_since():
+    uid = _resolve_user_id()
+    if not uid:
+        _log("[AUTH] notifications_since => 403")
+        return jsonify({"error": "No autorizado"}), 403
+
+    try:
+        since_id = int(request.args.get("since_id") or 0)
+        limit = int(request.args.get("limit") or 50)
+    except ValueError:
+        return jsonify({"error": "since_id/limit inválidos"}), 400
+
+    conn = get_db()
+    try:
+        data = list_notifications_since(conn, int(uid), since_id, limit)
+        return jsonify(data), 200
+    finally:
+        conn.close()
+
 @notifications_bp.patch("/read")
 def api_mark_read():
     uid = _resolve_user_id()
@@ -104,11 +92,11 @@ def api_mark_read():
     body = request.get_json(silent=True) or {}
     ids = [int(x) for x in (body.get("ids") or []) if str(x).isdigit()]
 
-    conn = db.engine.raw_connection()
+    conn = get_db()
     try:
         n = mark_as_read(conn, int(uid), ids)
         _log("[NOTIFS] mark_read uid=%s updated=%s", uid, n)
-        return jsonify({"ok": True, "updated": n}), 200
+        return jsonify({"ok": True, "updated": n, "unread": get_unread_count(conn, int(uid))}), 200
     finally:
         conn.close()
 
@@ -119,11 +107,11 @@ def api_mark_all_read():
         _log("[AUTH] mark_all_read => 403")
         return jsonify({"error": "No autorizado"}), 403
 
-    conn = db.engine.raw_connection()
+    conn = get_db()
     try:
         n = mark_all_as_read(conn, int(uid))
         _log("[NOTIFS] mark_all_read uid=%s updated=%s", uid, n)
-        return jsonify({"ok": True, "updated": n}), 200
+        return jsonify({"ok": True, "updated": n, "unread": get_unread_count(conn, int(uid))}), 200
     finally:
         conn.close()
 
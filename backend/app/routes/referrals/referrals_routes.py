@@ -1,6 +1,7 @@
 # app/routes/referrals/referrals_routes.py
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.security.identity import current_identity
 from flask import send_file, abort, current_app
 from sqlalchemy import text
 from app.db.database import db
@@ -84,11 +85,8 @@ def _get_payout_evidence_impl(batch_id: int, file_id: int):
     ident = get_jwt_identity()
     uid = ident.get("id") if isinstance(ident, dict) else int(ident)
 
-    # ¿Es admin?
-    role_id = db.session.execute(
-        text("SELECT role_id FROM users WHERE id=:uid"), {"uid": uid}
-    ).scalar()
-    is_admin = int(role_id or 0) == 1
+    # ¿Es admin? (claim rid del token; DB solo si falta)
+    is_admin = current_identity().is_admin
 
     q = text("""
         SELECT f.storage_path
@@ -0,0 +1,256 @@
+# app/scheduler.py
+"""
+Jobs periódicos con un solo líder entre todos los workers / réplicas.
+
+- Cada worker de gunicorn arranca un BackgroundScheduler EN PAUSA y un hilo de
+  elección que intenta pg_try_advisory_lock(hashtext('scheduler:leader')) en una
+  conexión DIRECTA y propia (no del pool, no PgBouncer: el lock es de sesión).
+- Quien obtiene el lock reanuda el scheduler; el resto sigue en pausa. Si el
+  líder muere su conexión se cierra, Postgres libera el lock y otro worker lo
+  toma en la siguiente vuelta (SCHEDULER_LEADER_POLL_SEC).
+- El arranque no escribe en la BD: la expiración de suscripciones que antes
+  corría al importar la app ahora la dispara el líder apenas es elegido, y la
+  primera elección espera SCHEDULER_START_DELAY_SEC para no competir con el boot.
+- Duración y resultado de cada job en /metrics (scheduler_job_*).
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import text
+
+from app.observability.metrics import SCHEDULER_IS_LEADER, SCHEDULER_JOB_RUNS, SCHEDULER_JOB_SECONDS
+
+log = logging.getLogger("scheduler")
+
+LEADER_LOCK_SQL = "SELECT pg_try_advisory_lock(hashtext('scheduler:leader'))"
+
+# Jobs que el líder corre apenas es elegido (antes: al arrancar cada worker)
+_RUN_ON_ELECTION = ("expire_stale",)
+
+
+# -------------------------------------------------------------------
+#  Jobs
+# -------------------------------------------------------------------
+def _job_expire_stale(app) -> None:
+    from app.subscriptions.service import expire_all_stale
+    count = expire_all_stale()
+    if count:
+        app.logger.info("cron_expire_stale: %d suscripciones expiradas", count)
+
+
+def _job_mature_commissions(app) -> None:
+    from app.services.referrals.payouts_service import mature_commissions
+    updated = mature_commissions()
+    if updated:
+        app.logger.info("cron_mature_commissions: %d comisiones disponibles", updated)
+
+
+def _job_reconcile(app) -> None:
+    from app.subscriptions.service import reconcile_subscriptions
+    out = reconcile_subscriptions()
+    app.logger.info("cron_reconcile: %s", out)
+
+
+def prune_expired_tokens() -> dict:
+    """Borra JTIs revocados cuyo token ya venció y códigos de reset vencidos / usados."""
+    from app.db.database import db
+
+    tokens = db.session.execute(text("""
+        DELETE FROM token_blocklist
+         WHERE expires_at IS NOT NULL
+           AND expires_at < (now() AT TIME ZONE 'utc')
+    """)).rowcount
+    resets = db.session.execute(text("""
+        DELETE FROM password_resets
+         WHERE expires_at < now() - interval '1 day'
+            OR (used AND created_at < now() - interval '1 day')
+    """)).rowcount
+    db.session.commit()
+    return {"token_blocklist": int(tokens or 0), "password_resets": int(resets or 0)}
+
+
+def _job_prune_tokens(app) -> None:
+    out = prune_expired_tokens()
+    if any(out.values()):
+        app.logger.info("cron_prune_tokens: %s", out)
+
+
+def _job_notifications_retention(app) -> None:
+    from app.db import get_db
+    from app.services.notify.notifications_retention import run_retention
+
+    conn = get_db()
+    try:
+        out = run_retention(
+            conn,
+            keep_months=app.config['NOTIFICATIONS_RETENTION_MONTHS'],
+            mode=app.config['NOTIFICATIONS_RETENTION_MODE'],
+            months_ahead=app.config['NOTIFICATIONS_PARTITIONS_AHEAD'],
+        )
+        if out["partitions"]:
+            app.logger.info("cron_notifications_retention: %s", out)
+    finally:
+        conn.close()
+
+
+def _job_kpi_refresh(app) -> None:
+    from app.services.admin.kpi_snapshot import refresh_dashboard_kpis
+    refresh_dashboard_kpis()
+
+
+def _job_mail_outbox(app) -> None:
+    from app.services.notify.mail_queue import drain_outbox
+    out = drain_outbox(app)
+    if any(out.values()):
+        app.logger.info("cron_mail_outbox: %s", out)
+
+
+def _jobs(app):
+    """(id, función, minutos). Intervalo <= 0 desactiva el job."""
+    cfg = app.config
+    jobs = [
+        ("expire_stale", _job_expire_stale, cfg['SCHEDULER_EXPIRE_MIN']),
+        ("mature_commissions", _job_mature_commissions, cfg['SCHEDULER_MATURE_MIN']),
+        ("prune_tokens", _job_prune_tokens, cfg['SCHEDULER_PRUNE_MIN']),
+        ("notifications_retention", _job_notifications_retention, 24 * 60),
+        ("kpi_refresh", _job_kpi_refresh, cfg['KPI_REFRESH_MIN']),
+    ]
+    if cfg.get('MAIL_OUTBOX'):
+        jobs.append(("mail_outbox", _job_mail_outbox, cfg['MAIL_OUTBOX_DRAIN_MIN']))
+    # Reconcile necesita credenciales de Google Play
+    if cfg.get('GOOGLE_PLAY_PACKAGE_NAME'):
+        jobs.append(("reconcile", _job_reconcile, cfg['SCHEDULER_RECONCILE_MIN']))
+    return [j for j in jobs if j[2] and j[2] > 0]
+
+
+# -------------------------------------------------------------------
+#  Scheduler con líder
+# -------------------------------------------------------------------
+class LeaderScheduler:
+    def __init__(self, app):
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        self.app = app
+        self.is_leader = False
+        self.poll_sec = float(app.config['SCHEDULER_LEADER_POLL_SEC'])
+        self.start_delay = float(app.config.get('SCHEDULER_START_DELAY_SEC') or 0)
+        self.scheduler = BackgroundScheduler(
+            daemon=True,
+            job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 300},
+        )
+        self._conn = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------- jobs ----------------
+    def _wrap(self, name: str, fn: Callable) -> Callable[[], None]:
+        app = self.app
+
+        def run():
+            if not self.is_leader:
+                return
+            from app.db.database import db
+
+            t0 = time.perf_counter()
+            result = "ok"
+            with app.app_context():
+                try:
+                    fn(app)
+                except Exception as e:
+                    result = "error"
+                    db.session.rollback()
+                    app.logger.error("cron_%s falló: %s", name, e)
+                finally:
+                    db.session.remove()
+            SCHEDULER_JOB_SECONDS.labels(name).observe(time.perf_counter() - t0)
+            SCHEDULER_JOB_RUNS.labels(name, result).inc()
+
+        return run
+
+    # ---------------- liderazgo ----------------
+    def _become_leader(self) -> None:
+        self.is_leader = True
+        SCHEDULER_IS_LEADER.set(1)
+        now = datetime.now(timezone.utc)
+        for job_id in _RUN_ON_ELECTION:
+            if self.scheduler.get_job(job_id):
+                self.scheduler.modify_job(job_id, next_run_time=now)
+        self.scheduler.resume()
+        log.info("scheduler: este proceso es el líder")
+
+    def _lose_leadership(self) -> None:
+        if self.is_leader:
+            log.warning("scheduler: se perdió el liderazgo")
+        self.is_leader = False
+        SCHEDULER_IS_LEADER.set(0)
+        try:
+            self.scheduler.pause()
+        except Exception:
+            pass
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+
+    def _elect_loop(self, dsn: str) -> None:
+        # Nada de BD durante el arranque: la primera elección espera start_delay
+        if self.start_delay > 0:
+            time.sleep(self.start_delay)
+        import psycopg2
+
+        while True:
+            try:
+                if self._conn is None:
+                    self._conn = psycopg2.connect(dsn, application_name="scheduler-leader")
+                    self._conn.autocommit = True
+                with self._conn.cursor() as cur:
+                    if self.is_leader:
+                        cur.execute("SELECT 1")  # conexión viva = lock vivo
+                    else:
+                        cur.execute(LEADER_LOCK_SQL)
+                        if cur.fetchone()[0]:
+                            self._become_leader()
+            except Exception as e:
+                log.error("scheduler: elección falló (%s); reintento", e)
+                self._lose_leadership()
+                self._close()
+            time.sleep(self.poll_sec)
+
+    def start(self) -> None:
+        from app.db.pool import direct_dsn, pooler_mode
+
+        for job_id, fn, minutes in _jobs(self.app):
+            self.scheduler.add_job(self._wrap(job_id, fn), "interval", minutes=minutes, id=job_id)
+        self.scheduler.start(paused=True)
+
+        dsn = direct_dsn()
+        if dsn:
+            self._thread = threading.Thread(target=self._elect_loop, args=(dsn,), name="scheduler-leader", daemon=True)
+            self._thread.start()
+        elif pooler_mode():
+            # Sin conexión directa no hay lock de sesión fiable: los jobs quedan al cron del CLI
+            log.error("scheduler: modo pooler sin DATABASE_DIRECT_URL; scheduler desactivado")
+        else:
+            # BD que no es Postgres (desarrollo local): proceso único, líder directo
+            self._become_leader()
+
+
+_scheduler: Optional[LeaderScheduler] = None
+
+
+def start_scheduler(app) -> LeaderScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LeaderScheduler(app)
+        _scheduler.start()
+        app.logger.info("scheduler: iniciado en pausa; jobs = %s",
+                        [j.id for j in _scheduler.scheduler.get_jobs()])
+    return _scheduler
@@ -0,0 +1,162 @@
+# app/security/identity.py
+"""
+Identidad unificada por petición.
+
+Resuelve el usuario UNA sola vez (session → Bearer → X-USER-ID) y deja el
+resultado en flask.g; todas las rutas (notificaciones, juegos, admin) leen de aquí
+en vez de decodificar el JWT cada una por su lado.
+
+- Si flask_jwt_extended ya verificó el token (@jwt_required) se reutilizan sus claims.
+- Si no, se decodifica con PyJWT (HS256) y se valida contra la caché de revocados.
+- El rol sale de users.role_id (vía profile_cache, TTL corto, invalidado al
+  cambiar el rol) y se resuelve como mucho una vez por petición. El claim rid del
+  token NO autoriza: los access tokens no vencen y un admin degradado lo
+  conservaría. Solo se usa como pista si la lectura del rol falla.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import jwt  # PyJWT
+from flask import current_app, g, jsonify, request, session
+
+ADMIN_ROLE_ID = 1
+
+_MISSING = object()
+
+
+@dataclass
+class Identity:
+    user_id: Optional[int] = None
+    source: Optional[str] = None           # 'session' | 'bearer' | 'x-user-id'
+    claims: Dict[str, Any] = field(default_factory=dict)
+    _role_id: Any = _MISSING
+
+    @property
+    def role_id(self) -> Optional[int]:
+        if self._role_id is _MISSING:
+            self._role_id = _resolve_role_id(self)
+        return self._role_id
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role_id == ADMIN_ROLE_ID
+
+
+def _jwt_secret():
+    return (
+        current_app.config.get("JWT_SECRET_KEY")
+        or os.getenv("JWT_SECRET")
+        or current_app.config.get("SECRET_KEY")
+    )
+
+
+def _to_int(v) -> Optional[int]:
+    try:
+        return int(v) if v is not None and str(v).strip() != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _claims_from_jwt_extended() -> Optional[Dict[str, Any]]:
+    """Claims ya verificados por @jwt_required / verify_jwt_in_request en esta petición."""
+    try:
+        from flask_jwt_extended import get_jwt
+        claims = get_jwt()
+        return dict(claims) if claims else None
+    except Exception:
+        return None
+
+
+def _claims_from_bearer() -> Optional[Dict[str, Any]]:
+    """Decodifica el Bearer una sola vez con PyJWT. None si falta o no es válido."""
+    auth = request.headers.get("Authorization", "")
+    if not auth.startswith("Bearer "):
+        return None
+    token = auth.split(" ", 1)[1].strip()
+    try:
+        payload = jwt.decode(token, _jwt_secret(), algorithms=["HS256"])
+    except Exception:
+        return None
+
+    from app.security.revocation_cache import revocation_cache
+    if revocation_cache.is_revoked(payload.get("jti")):
+        return None
+    return payload
+
+
+def _bearer_identity(claims: Optional[Dict[str, Any]]) -> Optional[Identity]:
+    uid = _to_int((claims or {}).get("sub"))
+    return Identity(user_id=uid, source="bearer", claims=claims) if uid else None
+
+
+def _load_identity() -> Identity:
+    # 0) Token ya verificado por el decorador de la ruta: manda sobre todo lo demás
+    ident = _bearer_identity(_claims_from_jwt_extended())
+    if ident:
+        return ident
+
+    # 1) session
+    uid = _to_int(session.get("user_id"))
+    if uid:
+        return Identity(user_id=uid, source="session")
+
+    # 2) Bearer
+    ident = _bearer_identity(_claims_from_bearer())
+    if ident:
+        return ident
+
+    # 3) X-USER-ID
+    uid = _to_int(request.headers.get("X-USER-ID"))
+    if uid:
+        return Identity(user_id=uid, source="x-user-id")
+
+    return Identity()
+
+
+def _resolve_role_id(ident: Identity) -> Optional[int]:
+    if ident.user_id is None:
+        return None
+    from app.services.auth.profile_cache import get_user_role_id
+    try:
+        return _to_int(get_user_role_id(ident.user_id))
+    except Exception:
+        # BD caída: el claim como pista, pero nunca para conceder admin
+        current_app.logger.exception("identity: no se pudo leer role_id de %s", ident.user_id)
+        raw = ident.claims.get("rid") or ident.claims.get("role_id") or ident.claims.get("role")
+        rid = _to_int(raw)
+        return None if rid == ADMIN_ROLE_ID else rid
+
+
+def current_identity() -> Identity:
+    ident = g.get("_identity")
+    if ident is None:
+        ident = _load_identity()
+        g._identity = ident
+    return ident
+
+
+def resolve_user_id() -> Optional[int]:
+    return current_identity().user_id
+
+
+def current_role_id() -> Optional[int]:
+    return current_identity().role_id
+
+
+def require_admin():
+    """
+    None si el usuario actual es admin; si no, la respuesta 403 lista para devolver.
+    """
+    ident = current_identity()
+    if ident.user_id is None:
+        return jsonify({"ok": False, "error": "No autorizado"}), 401
+    try:
+        if ident.is_admin:
+            return None
+    except Exception:
+        current_app.logger.exception("require_admin: role check failed")
+        return jsonify({"ok": False, "error": "Rol inválido"}), 403
+    return jsonify({"ok": False, "error": "Solo administradores"}), 403
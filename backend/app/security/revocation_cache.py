@@ -0,0 +1,248 @@
+# app/security/revocation_cache.py
+"""
+Caché por worker de JTIs revocados (token_blocklist).
+
+Los JWT no expiran (JWT_ACCESS_TOKEN_EXPIRES=False), así que token_in_blocklist_loader
+corre en TODAS las peticiones autenticadas. En vez de consultar la tabla cada vez:
+
+- Un filtro de Bloom en memoria con todos los JTIs revocados.
+  Si el Bloom dice "no está" → no revocado, sin tocar la DB.
+  Si dice "quizá" → se confirma contra la DB (falsos positivos raros).
+- Carga completa perezosa (primer uso) y refresco incremental por marca de agua
+  (token_blocklist.created_at).
+- Invalidación entre workers: logout hace NOTIFY token_revoked y cada worker
+  tiene un hilo LISTEN que añade el JTI al Bloom apenas se confirma la transacción.
+  Si el listener no está disponible, el refresco incremental acota la ventana
+  a REVOCATION_REFRESH_SEC segundos.
+- El mismo listener escucha user_changed (cambio de rol / borrado de usuario) e
+  invalida profile_cache, de donde sale el rol para autorizar.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import os
+import select
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import text
+
+from app.services.auth import profile_cache
+from app.services.auth.profile_cache import invalidate_user
+
+log = logging.getLogger("revocation_cache")
+
+NOTIFY_CHANNEL = "token_revoked"
+USER_CHANGED_CHANNEL = profile_cache.NOTIFY_CHANNEL
+
+_REFRESH_SEC = float(os.getenv("REVOCATION_REFRESH_SEC", "30"))
+_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "200000"))
+_FP_RATE = float(os.getenv("REVOCATION_BLOOM_FP_RATE", "0.001"))
+
+
+class BloomFilter:
+    """Bloom simple sobre bytearray con doble hashing (blake2b)."""
+
+    def __init__(self, capacity: int, fp_rate: float = 0.001):
+        capacity = max(int(capacity), 1000)
+        self.capacity = capacity
+        self.m = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.k = max(1, int(round(self.m / capacity * math.log(2))))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        h = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(h[:8], "little")
+        h2 = int.from_bytes(h[8:], "little") | 1
+        for i in range(self.k):
+            yield (h1 + i * h2) % self.m
+
+    def add(self, item: str) -> None:
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    @property
+    def saturated(self) -> bool:
+        return self.count > self.capacity
+
+
+class RevocationCache:
+    def __init__(self, refresh_sec: float = _REFRESH_SEC, capacity: int = _CAPACITY, fp_rate: float = _FP_RATE):
+        self.refresh_sec = refresh_sec
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self._bloom: Optional[BloomFilter] = None
+        self._watermark: Optional[datetime] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._listening = False
+
+    # ---------------- carga ----------------
+    def _full_load(self) -> None:
+        from app.db.database import db
+
+        rows = db.session.execute(
+            text("SELECT jti, created_at FROM token_blocklist")
+        ).all()
+        capacity = self.capacity
+        while capacity < len(rows) * 2:
+            capacity *= 2
+        bloom = BloomFilter(capacity, self.fp_rate)
+        wm = None
+        for jti, created_at in rows:
+            bloom.add(jti)
+            if created_at and (wm is None or created_at > wm):
+                wm = created_at
+        self._bloom = bloom
+        self.capacity = capacity
+        self._watermark = wm
+        self._checked_at = time.monotonic()
+        log.info("revocation_cache: %d JTIs cargados (m=%d bits, k=%d)", len(rows), bloom.m, bloom.k)
+
+    def _incremental(self) -> None:
+        from app.db.database import db
+
+        if self._bloom is None or self._bloom.saturated:
+            self._full_load()
+            return
+        # >= y un pequeño margen: filas con el mismo created_at o commits tardíos
+        since = (self._watermark - timedelta(seconds=5)) if self._watermark else datetime(1970, 1, 1)
+        rows = db.session.execute(
+            text("SELECT jti, created_at FROM token_blocklist WHERE created_at >= :wm"),
+            {"wm": since},
+        ).all()
+        for jti, created_at in rows:
+            if jti not in self._bloom:
+                self._bloom.add(jti)
+            if created_at and (self._watermark is None or created_at > self._watermark):
+                self._watermark = created_at
+        self._checked_at = time.monotonic()
+
+    def _ensure_fresh(self) -> None:
+        # Con el listener activo basta la carga inicial + refrescos espaciados
+        max_age = self.refresh_sec * (10 if self._listening else 1)
+        if self._bloom is not None and (time.monotonic() - self._checked_at) < max_age:
+            return
+        with self._lock:
+            if self._bloom is not None and (time.monotonic() - self._checked_at) < max_age:
+                return
+            self._incremental()
+
+    # ---------------- API ----------------
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        try:
+            self._ensure_fresh()
+        except Exception as e:
+            log.error("revocation_cache: refresco falló, consulto DB directo: %s", e)
+            return self._db_lookup(jti)
+        if jti not in self._bloom:
+            return False
+        # "Quizá revocado": confirmar (falso positivo del Bloom)
+        return self._db_lookup(jti)
+
+    def mark_revoked(self, jti: Optional[str]) -> None:
+        """Marca local inmediata (el resto de workers se entera vía NOTIFY)."""
+        if not jti:
+            return
+        with self._lock:
+            if self._bloom is None:
+                return  # la carga completa lo incluirá
+            self._bloom.add(jti)
+
+    @staticmethod
+    def _db_lookup(jti: str) -> bool:
+        from app.db.database import db
+
+        row = db.session.execute(
+            text("SELECT 1 FROM token_blocklist WHERE jti = :jti LIMIT 1"),
+            {"jti": jti},
+        ).first()
+        return row is not None
+
+    # ---------------- LISTEN/NOTIFY ----------------
+    def start_listener(self, app) -> None:
+        if self._listener is not None:
+            return
+        t = threading.Thread(target=self._listen_loop, args=(app,), name="revocation-listener", daemon=True)
+        self._listener = t
+        t.start()
+
+    def _listen_loop(self, app) -> None:
+        from app.db.database import db
+        from app.db.pool import direct_dsn, pooler_mode
+
+        backoff = 1.0
+        while True:
+            conn = None
+            try:
+                if pooler_mode():
+                    # PgBouncer (transaction pooling) no soporta LISTEN: conexión directa
+                    dsn = direct_dsn()
+                    if not dsn:
+                        log.warning("revocation_cache: modo pooler sin DATABASE_DIRECT_URL; sólo refresco por marca de agua")
+                        return
+                    import psycopg2
+                    conn = psycopg2.connect(dsn)
+                    pg = conn
+                else:
+                    with app.app_context():
+                        conn = db.engine.raw_connection()
+                    pg = getattr(conn, "driver_connection", None) or conn.connection
+                if not hasattr(pg, "poll"):
+                    log.warning("revocation_cache: driver sin poll(); sólo refresco por marca de agua")
+                    return
+                pg.autocommit = True
+                with pg.cursor() as cur:
+                    cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    cur.execute(f"LISTEN {USER_CHANGED_CHANNEL}")
+                self._listening = True
+                backoff = 1.0
+                log.info("revocation_cache: escuchando canal %s", NOTIFY_CHANNEL)
+
+                while True:
+                    ready, _, _ = select.select([pg], [], [], 60)
+                    if not ready:
+                        continue
+                    pg.poll()
+                    while pg.notifies:
+                        n = pg.notifies.pop(0)
+                        if n.channel == USER_CHANGED_CHANNEL:
+                            # Cambio de rol / borrado en otro worker (profile_cache)
+                            invalidate_user(int(n.payload))
+                        else:
+                            self.mark_revoked(n.payload)
+            except Exception as e:
+                self._listening = False
+                log.error("revocation_cache: listener caído (%s); reintento en %.0fs", e, backoff)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                if conn is not None:
+                    try:
+                        # del pool: invalidate(); conexión directa psycopg2: close()
+                        (getattr(conn, "invalidate", None) or conn.close)()
+                    except Exception:
+                        pass
+
+
+revocation_cache = RevocationCache()
+
+
+def notify_revoked(session, jti: str) -> None:
+    """
+    Encola el NOTIFY dentro de la transacción del logout: Postgres sólo lo entrega
+    si el INSERT en token_blocklist hace commit.
+    """
+    session.execute(text("SELECT pg_notify(:ch, :jti)"), {"ch": NOTIFY_CHANNEL, "jti": jti})
@@ -4,65 +4,64 @@ from app.db.database import db
 
 
 def get_lottery_dashboard_summary():
-    total_users = db.session.execute(text("SELECT COUNT(*) FROM users")).scalar() or 0
-
-    # Juegos activos (state_id=1)
-    try:
-        active_games = db.session.execute(text("""
-            SELECT COUNT(*) FROM games WHERE state_id = 1
-        """)).scalar() or 0
-    except Exception:
-        db.session.rollback()
-        active_games = 0
-
-    # 👇 jugadores = COUNT DISTINCT (game_id, taken_by) en game_numbers
-    try:
-        players_count = db.session.execute(text("""
-            SELECT COUNT(*) FROM (
-                SELECT gn.game_id, gn.taken_by
-                FROM game_numbers gn
-                -- Si quisieras contar SOLO juegos activos, descomenta la línea de abajo:
-                -- JOIN games g ON g.id = gn.game_id AND g.state_id = 1
-                GROUP BY gn.game_id, gn.taken_by
-            ) t
-        """)).scalar() or 0
-    except Exception:
-        db.session.rollback()
-        players_count = 0
-
-    tickets_today = 0
-    revenue_ytd = 0.0
-    sales_by_month = []
-    revenue_by_month = []
-    latest_sales = []
-
-    latest_users = db.session.execute(text("""
-        SELECT id, name, phone, public_code, role_id
-        FROM users
-        ORDER BY id DESC
-        LIMIT 5
-    """)).mappings().all()
-    latest_users = [dict(r) for r in latest_users]
-
-    return {
-        "kpis": {
-            "users": int(total_users),
-            "total_users": int(total_users),
+    """
+    Payload del dashboard admin desde el snapshot precalculado
+    (app/services/admin/kpi_snapshot.py). Ya no cuenta users / game_numbers
+    en cada carga.
+    """
+    from app.services.admin.kpi_snapshot import get_dashboard_snapshot
 
-            "games": int(active_games),
-            "total_games": int(active_games),
+    payload, _version = get_dashboard_snapshot()
+    return payload
 
-            "players": int(players_count),
-            "total_players": int(players_count),
+# Stats por juego desde game_players (mantenida por triggers, ver sql/004)
+_SQL_ACTIVE_GAMES_EXPORT = """
+    WITH stats AS (
+        SELECT
+            gp.game_id,
+            SUM(gp.numbers) AS reserved_numbers_in_game,
+            COUNT(*)        AS players_in_game
+        FROM game_players gp
+        JOIN games g ON g.id = gp.game_id
+        WHERE COALESCE(g.state_id, 1) = 1
+        GROUP BY gp.game_id
+    )
+    SELECT
+        g.id     AS game_id,
+        COALESCE(l.name, g.lottery_name) AS lottery_name,
+        COALESCE(to_char(g.scheduled_date, 'YYYY-MM-DD'),
+                 to_char(g.played_at,      'YYYY-MM-DD')) AS played_date,
+        COALESCE(to_char(g.scheduled_time, 'HH24:MI'),
+                 to_char(g.played_at,      'HH24:MI'))    AS played_time,
+        COALESCE(g.digits, 3) AS digits,
+        u.id    AS user_id,
+        u.name  AS user_name,
+        u.phone AS user_phone,
+        gn.number AS number,
+        s.reserved_numbers_in_game,
+        s.players_in_game
+    FROM game_numbers gn
+    JOIN games g          ON g.id = gn.game_id
+    LEFT JOIN lotteries l ON l.id = g.lottery_id
+    JOIN users u          ON u.id = gn.taken_by
+    JOIN stats s          ON s.game_id = g.id
+    WHERE COALESCE(g.state_id, 1) = 1
+    ORDER BY g.id, u.id, gn.number
+"""
 
-            "tickets_today": int(tickets_today),
-            "revenue_ytd": float(revenue_ytd),
-        },
-        "sales_by_month": sales_by_month,
-        "revenue_by_month": revenue_by_month,
-        "latest_users": latest_users,
-        "latest_sales": latest_sales,
-    }
+def iter_active_games_export_rows(batch_size: int = 2000):
+    """
+    Igual que get_active_games_export_rows pero en streaming:
+    cursor del lado del servidor (stream_results), `batch_size` filas por viaje.
+    Usa su propia conexión; se cierra al agotar (o cerrar) el generador.
+    """
+    conn = db.engine.connect().execution_options(stream_results=True, max_row_buffer=batch_size)
+    try:
+        result = conn.execute(text(_SQL_ACTIVE_GAMES_EXPORT))
+        for r in result.mappings():
+            yield dict(r)
+    finally:
+        conn.close()
 
 def get_active_games_export_rows():
     """
@@ -70,42 +69,7 @@ def get_active_games_export_rows():
     Incluye g.digits para formatear el número con ceros a la izquierda.
     """
     try:
-        rows = db.session.execute(text("""
-            WITH stats AS (
-                SELECT
-                    g.id AS game_id,
-                    COUNT(*)                    AS reserved_numbers_in_game,
-                    COUNT(DISTINCT gn.taken_by) AS players_in_game
-                FROM game_numbers gn
-                JOIN games g ON g.id = gn.game_id
-                WHERE COALESCE(g.state_id, 1) = 1
-                GROUP BY g.id
-            )
-            SELECT
-                g.id     AS game_id,
-                COALESCE(l.name, g.lottery_name) AS lottery_name,
-                COALESCE(to_char(g.scheduled_date, 'YYYY-MM-DD'),
-                         to_char(g.played_at,      'YYYY-MM-DD')) AS played_date,
-                COALESCE(to_char(g.scheduled_time, 'HH24:MI'),
-                         to_char(g.played_at,      'HH24:MI'))    AS played_time,
-                COALESCE(g.digits, 3) AS digits,
-                u.id    AS user_id,
-                u.name  AS user_name,
-                u.phone AS user_phone,
-                gn.number AS number,
-                s.reserved_numbers_in_game,
-                s.players_in_game
-            FROM game_numbers gn
-            JOIN games g          ON g.id = gn.game_id
-            LEFT JOIN lotteries l ON l.id = g.lottery_id
-            JOIN users u          ON u.id = gn.taken_by
-            JOIN stats s          ON s.game_id = g.id
-            WHERE COALESCE(g.state_id, 1) = 1
-            ORDER BY g.id, u.id, gn.number
-        """)).mappings().all()
-
-        return [dict(r) for r in rows]
-
+        return list(iter_active_games_export_rows())
     except Exception as e:
         print("⚠️ Error en get_active_games_export_rows:", e)
         db.session.rollback()
@@ -0,0 +1,181 @@
+# app/services/admin/copy_export.py
+"""
+Exportaciones planas (CSV / Parquet / Arrow) con `COPY ... TO STDOUT`.
+
+- Postgres serializa el CSV y psycopg2 lo escribe directo en el archivo destino:
+  no se crea un dict de Python por fila (cientos de miles de filas en segundos).
+- Parquet / Arrow son opcionales: si `pyarrow` está instalado, el CSV se lee
+  en columnas (pyarrow.csv, en C++) y se reescribe en el formato pedido.
+- Datasets: mismos SELECT que el Excel de juegos activos, el listado de
+  solicitudes de comisión y el listado de lotes de pago.
+"""
+from __future__ import annotations
+
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.db.database import db
+from app.db import get_db
+from app.services.admin.admin_service import _SQL_ACTIVE_GAMES_EXPORT
+from app.services.admin.referrals_payouts_service import (
+    SQL_COMMISSION_REQUESTS_SELECT,
+    SQL_PAYOUT_BATCHES_SELECT,
+    commission_requests_where,
+)
+
+try:  # opcional: solo para parquet / arrow
+    import pyarrow  # noqa: F401
+    import pyarrow.csv as pa_csv
+    HAS_PYARROW = True
+except ImportError:  # pragma: no cover - depende del entorno
+    pa_csv = None
+    HAS_PYARROW = False
+
+FORMATS: Dict[str, Tuple[str, str]] = {
+    # fmt: (mimetype, extensión)
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+}
+
+
+class ExportError(ValueError):
+    """Dataset o formato inválido (→ 400 en la ruta)."""
+
+
+class ExportUnavailable(ExportError):
+    """Formato válido pero sin soporte en este servidor (→ 501)."""
+
+
+@dataclass(frozen=True)
+class Dataset:
+    name: str
+    filename: str
+    build: Callable[[Dict[str, Any]], Tuple[str, Dict[str, Any]]]
+
+
+def parse_user_id(value: Any) -> Optional[int]:
+    """Filtro user_id opcional; no numérico → ExportError (400), no un 500."""
+    if value in (None, ""):
+        return None
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise ExportError(f"user_id inválido: {value!r}") from None
+
+
+def _active_games(_args: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    return _SQL_ACTIVE_GAMES_EXPORT, {}
+
+
+def _commission_requests(args: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    user_id = args.get("user_id")
+    where_sql, params = commission_requests_where(
+        status=args.get("status") or None,
+        user_id=parse_user_id(user_id),
+        q=args.get("q") or None,
+    )
+    sql = f"""
+        {SQL_COMMISSION_REQUESTS_SELECT}
+        WHERE {where_sql}
+        ORDER BY pr.requested_at DESC, pr.id DESC
+    """
+    return sql, params
+
+
+def _payout_batches(_args: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    return f"{SQL_PAYOUT_BATCHES_SELECT}\nORDER BY id DESC", {}
+
+
+DATASETS: Dict[str, Dataset] = {
+    d.name: d
+    for d in (
+        Dataset("active-games", "juegos_activos", _active_games),
+        Dataset("commission-requests", "solicitudes_comision", _commission_requests),
+        Dataset("payout-batches", "lotes_pago", _payout_batches),
+    )
+}
+
+
+def resolve(dataset: str, fmt: str) -> Tuple[Dataset, str, str]:
+    """Valida dataset + formato → (dataset, mimetype, extensión)."""
+    ds = DATASETS.get((dataset or "").strip().lower())
+    if ds is None:
+        raise ExportError(f"Dataset desconocido: {dataset}. Opciones: {', '.join(DATASETS)}")
+    fmt = (fmt or "csv").strip().lower()
+    if fmt not in FORMATS:
+        raise ExportError(f"Formato no soportado: {fmt}. Opciones: {', '.join(FORMATS)}")
+    mimetype, ext = FORMATS[fmt]
+    return ds, mimetype, ext
+
+
+def _render_sql(cur, sql: str, params: Dict[str, Any]) -> str:
+    """
+    COPY no acepta parámetros: se compila el SELECT con el dialecto del engine
+    (:name → %(name)s) y psycopg2 incrusta los valores ya escapados (mogrify).
+    """
+    stmt = text(sql).bindparams(**params) if params else text(sql)
+    compiled = stmt.compile(dialect=db.engine.dialect)
+    rendered = cur.mogrify(str(compiled), compiled.params or None)
+    return rendered.decode("utf-8") if isinstance(rendered, bytes) else rendered
+
+
+def copy_csv(ds: Dataset, fileobj, args: Optional[Dict[str, Any]] = None) -> None:
+    """Escribe el dataset como CSV (con cabecera) en `fileobj` (binario)."""
+    sql, params = ds.build(args or {})
+    conn = get_db()
+    try:
+        with conn.cursor() as cur:
+            select_sql = _render_sql(cur, sql, params)
+            cur.copy_expert(
+                f"COPY ({select_sql}) TO STDOUT WITH (FORMAT csv, HEADER true, ENCODING 'UTF8')",
+                fileobj,
+            )
+        conn.rollback()  # solo lectura: cierra la transacción antes de devolver al pool
+    finally:
+        conn.close()
+
+
+def _csv_to_columnar(src, dst, fmt: str) -> None:
+    table = pa_csv.read_csv(src)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, dst, compression="zstd")
+    else:
+        import pyarrow.ipc as ipc
+        with ipc.new_file(dst, table.schema) as writer:
+            writer.write_table(table)
+
+
+def export_dataset(dataset: str, fmt: str, args: Optional[Dict[str, Any]] = None):
+    """
+    Genera la exportación en un archivo temporal (posicionado al inicio).
+    Devuelve (fileobj, mimetype, download_name_sin_fecha, extensión).
+    """
+    fmt = (fmt or "csv").strip().lower()
+    ds, mimetype, ext = resolve(dataset, fmt)
+    if fmt != "csv" and not HAS_PYARROW:
+        raise ExportUnavailable(f"El formato {fmt} requiere pyarrow instalado en el servidor")
+
+    csv_tmp = tempfile.TemporaryFile()
+    try:
+        copy_csv(ds, csv_tmp, args)
+        csv_tmp.seek(0)
+        if fmt == "csv":
+            return csv_tmp, mimetype, ds.filename, ext
+
+        out = tempfile.TemporaryFile()
+        try:
+            _csv_to_columnar(csv_tmp, out, fmt)
+            out.seek(0)
+        except Exception:
+            out.close()
+            raise
+        csv_tmp.close()
+        return out, mimetype, ds.filename, ext
+    except Exception:
+        csv_tmp.close()
+        raise
@@ -0,0 +1,307 @@
+# app/services/admin/export_jobs.py
+"""
+Exportaciones asíncronas con artefactos en caché (tabla export_jobs,
+ver sql/005_export_jobs.sql).
+
+- create_job(): calcula la versión del snapshot del dataset (consultas baratas
+  por índice / contadores). Si ya hay un archivo para esa versión, lo devuelve
+  sin regenerar. Si hay uno en curso, devuelve ese job. Si no, encola uno nuevo.
+- Un pool de hilos del proceso (EXPORT_JOB_WORKERS) genera el archivo en
+  storage/exports (escritura a *.part + rename atómico), fuera del request,
+  así el timeout de gunicorn (120 s) ya no aplica.
+- Al terminar un job se borran los artefactos anteriores del mismo
+  (dataset, formato, filtros): quedaron obsoletos.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from flask import current_app
+from sqlalchemy import text
+
+from app.db.database import db
+from app.services.admin.copy_export import (
+    DATASETS,
+    FORMATS,
+    HAS_PYARROW,
+    ExportError,
+    ExportUnavailable,
+    export_dataset,
+    parse_user_id,
+)
+
+XLSX_FORMAT = "xlsx"
+# Filtros que cambian el contenido (el resto de query args se ignoran)
+_ARG_KEYS = ("status", "user_id", "q")
+
+# Versión del snapshot por dataset: si no cambia, el archivo previo sigue válido
+_SQL_SNAPSHOT: Dict[str, str] = {
+    "active-games": """
+        SELECT concat_ws(':',
+            (SELECT COALESCE(MAX(id), 0) FROM public.game_numbers),
+            (SELECT COALESCE(SUM(numbers), 0) FROM public.game_players),
+            (SELECT COALESCE(MAX(id), 0) FROM public.games),
+            (SELECT COUNT(*) FROM public.games WHERE COALESCE(state_id, 1) = 1)
+        )
+    """,
+    "commission-requests": """
+        SELECT concat_ws(':',
+            COUNT(*),
+            COALESCE(MAX(id), 0),
+            COALESCE(EXTRACT(EPOCH FROM MAX(updated_at))::bigint, 0)
+        )
+        FROM public.payout_requests
+    """,
+    "payout-batches": """
+        SELECT concat_ws(':',
+            (SELECT COALESCE(MAX(id), 0) FROM public.payout_payment_batches),
+            (SELECT COUNT(*) FROM public.payout_payment_batch_items),
+            (SELECT COUNT(*) FROM public.payout_payment_files)
+        )
+    """,
+}
+
+_JOB_COLUMNS = """
+    id, dataset, format, args, snapshot_version, status, file_path,
+    size_bytes, error, created_at, started_at, finished_at
+"""
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+class ExportJobNotFound(LookupError):
+    pass
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            workers = int(current_app.config.get("EXPORT_JOB_WORKERS") or 2)
+            _EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export-job")
+        return _EXECUTOR
+
+
+def _exports_dir() -> Path:
+    rel = current_app.config.get("EXPORTS_DIR") or os.path.join("storage", "exports")
+    base = Path(current_app.root_path) / rel.replace("\\", "/").strip("/")
+    base.mkdir(parents=True, exist_ok=True)
+    return base
+
+
+def _normalize(dataset: str, fmt: str, args: Optional[Dict[str, Any]]):
+    dataset = (dataset or "").strip().lower()
+    fmt = (fmt or "csv").strip().lower()
+    if dataset not in DATASETS:
+        raise ExportError(f"Dataset desconocido: {dataset}. Opciones: {', '.join(DATASETS)}")
+    if fmt == XLSX_FORMAT:
+        if dataset != "active-games":
+            raise ExportError("El formato xlsx solo está disponible para active-games")
+    elif fmt not in FORMATS:
+        raise ExportError(f"Formato no soportado: {fmt}. Opciones: {', '.join([*FORMATS, XLSX_FORMAT])}")
+    elif fmt != "csv" and not HAS_PYARROW:
+        raise ExportUnavailable(f"El formato {fmt} requiere pyarrow instalado en el servidor")
+
+    clean = {k: str(args[k]).strip() for k in _ARG_KEYS if args and args.get(k) not in (None, "")}
+    if dataset != "commission-requests":
+        clean = {}
+    elif "user_id" in clean:
+        # Se valida al crear el job (400), no cuando ya corre en el worker
+        clean["user_id"] = str(parse_user_id(clean["user_id"]))
+    args_hash = hashlib.sha1(json.dumps(clean, sort_keys=True).encode()).hexdigest()[:16] if clean else ""
+    return dataset, fmt, clean, args_hash
+
+
+def _snapshot_version(dataset: str) -> str:
+    return str(db.session.execute(text(_SQL_SNAPSHOT[dataset])).scalar() or "0")
+
+
+def _iso(dt):
+    return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z") if dt else None
+
+
+def _serialize(row, cached: bool = False) -> Dict[str, Any]:
+    return {
+        "id": int(row["id"]),
+        "dataset": row["dataset"],
+        "format": row["format"],
+        "args": row["args"] or {},
+        "snapshot_version": row["snapshot_version"],
+        "status": row["status"],
+        "size_bytes": int(row["size_bytes"]) if row["size_bytes"] is not None else None,
+        "error": row["error"],
+        "created_at": _iso(row["created_at"]),
+        "started_at": _iso(row["started_at"]),
+        "finished_at": _iso(row["finished_at"]),
+        "cached": cached,
+    }
+
+
+def _artifact_exists(row) -> bool:
+    return bool(row["file_path"]) and (Path(current_app.root_path) / row["file_path"]).is_file()
+
+
+def create_job(dataset: str, fmt: str, args: Optional[Dict[str, Any]] = None,
+               requested_by: Optional[int] = None) -> Dict[str, Any]:
+    """Devuelve el job (nuevo, en curso o ya terminado para este snapshot)."""
+    dataset, fmt, clean, args_hash = _normalize(dataset, fmt, args)
+    version = _snapshot_version(dataset)
+    stale_sec = int(current_app.config.get("EXPORT_JOB_STALE_SEC") or 900)
+
+    # Serializa la creación por clave: dos clics simultáneos → un solo job
+    key = f"export:{dataset}:{fmt}:{args_hash}:{version}"
+    db.session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:k))"), {"k": key})
+
+    prev = db.session.execute(text(f"""
+        SELECT {_JOB_COLUMNS}
+          FROM public.export_jobs
+         WHERE dataset = :ds AND format = :fmt AND args_hash = :ah
+           AND snapshot_version = :ver
+           AND (status = 'done'
+                OR (status IN ('pending', 'running')
+                    AND created_at > now() - make_interval(secs => :stale)))
+         ORDER BY id DESC
+         LIMIT 1
+    """), {"ds": dataset, "fmt": fmt, "ah": args_hash, "ver": version, "stale": stale_sec}).mappings().first()
+
+    if prev and (prev["status"] != "done" or _artifact_exists(prev)):
+        db.session.commit()
+        return _serialize(prev, cached=prev["status"] == "done")
+
+    row = db.session.execute(text(f"""
+        INSERT INTO public.export_jobs
+            (dataset, format, args_hash, args, snapshot_version, requested_by)
+        VALUES (:ds, :fmt, :ah, CAST(:args AS JSONB), :ver, :uid)
+        RETURNING {_JOB_COLUMNS}
+    """), {
+        "ds": dataset, "fmt": fmt, "ah": args_hash, "args": json.dumps(clean),
+        "ver": version, "uid": requested_by,
+    }).mappings().first()
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    _executor().submit(_run_job, app, int(row["id"]))
+    return _serialize(row)
+
+
+def get_job(job_id: int) -> Dict[str, Any]:
+    row = db.session.execute(
+        text(f"SELECT {_JOB_COLUMNS} FROM public.export_jobs WHERE id = :id"),
+        {"id": int(job_id)},
+    ).mappings().first()
+    if not row:
+        raise ExportJobNotFound(f"Job {job_id} no existe")
+    return _serialize(row)
+
+
+def get_job_file(job_id: int):
+    """(ruta_absoluta, dataset, formato) de un job terminado."""
+    row = db.session.execute(
+        text("SELECT id, dataset, format, status, file_path FROM public.export_jobs WHERE id = :id"),
+        {"id": int(job_id)},
+    ).mappings().first()
+    if not row:
+        raise ExportJobNotFound(f"Job {job_id} no existe")
+    if row["status"] != "done" or not _artifact_exists(row):
+        return None, row["dataset"], row["format"]
+    return Path(current_app.root_path) / row["file_path"], row["dataset"], row["format"]
+
+
+def mimetype_for(fmt: str) -> str:
+    if fmt == XLSX_FORMAT:
+        from app.services.admin.xlsx_export import XLSX_MIMETYPE
+        return XLSX_MIMETYPE
+    return FORMATS[fmt][0]
+
+
+# -------------------------------------------------------------------
+#  Worker
+# -------------------------------------------------------------------
+def _build_file(dataset: str, fmt: str, args: Dict[str, Any], dest: Path) -> None:
+    if fmt == XLSX_FORMAT:
+        from app.services.admin.admin_service import iter_active_games_export_rows
+        from app.services.admin.xlsx_export import write_active_games_xlsx
+        with open(dest, "wb") as fh:
+            write_active_games_xlsx(iter_active_games_export_rows(), fh)
+        return
+
+    src, _mimetype, _name, _ext = export_dataset(dataset, fmt, args)
+    try:
+        with open(dest, "wb") as fh:
+            shutil.copyfileobj(src, fh, 1024 * 1024)
+    finally:
+        src.close()
+
+
+def _run_job(app, job_id: int) -> None:
+    with app.app_context():
+        try:
+            job = db.session.execute(text("""
+                UPDATE public.export_jobs
+                   SET status = 'running', started_at = now()
+                 WHERE id = :id AND status = 'pending'
+                RETURNING id, dataset, format, args, args_hash, snapshot_version
+            """), {"id": job_id}).mappings().first()
+            db.session.commit()
+            if not job:
+                return
+
+            ext = "xlsx" if job["format"] == XLSX_FORMAT else FORMATS[job["format"]][1]
+            base = _exports_dir()
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+            fname = f"{job['dataset']}_{job['id']}_{stamp}.{ext}"
+            part = base / f"{fname}.part"
+
+            _build_file(job["dataset"], job["format"], job["args"] or {}, part)
+            os.replace(part, base / fname)
+
+            rel = (base / fname).relative_to(app.root_path).as_posix()
+            db.session.execute(text("""
+                UPDATE public.export_jobs
+                   SET status = 'done', file_path = :fp, size_bytes = :sz, finished_at = now()
+                 WHERE id = :id
+            """), {"id": job_id, "fp": rel, "sz": (base / fname).stat().st_size})
+            db.session.commit()
+            app.logger.info("📦 export job %s listo (%s, %s)", job_id, job["dataset"], job["format"])
+
+            _purge_superseded(app, job)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception("❌ export job %s falló", job_id)
+            try:
+                db.session.execute(text("""
+                    UPDATE public.export_jobs
+                       SET status = 'failed', error = :err, finished_at = now()
+                     WHERE id = :id
+                """), {"id": job_id, "err": str(e)[:1000]})
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+        finally:
+            db.session.remove()
+
+
+def _purge_superseded(app, job) -> None:
+    """Borra archivos de snapshots anteriores del mismo (dataset, formato, filtros)."""
+    old = db.session.execute(text("""
+        UPDATE public.export_jobs
+           SET file_path = NULL
+         WHERE dataset = :ds AND format = :fmt AND args_hash = :ah
+           AND id < :id AND status = 'done' AND file_path IS NOT NULL
+        RETURNING file_path
+    """), {"ds": job["dataset"], "fmt": job["format"], "ah": job["args_hash"], "id": job["id"]}).scalars().all()
+    db.session.commit()
+    for rel in old:
+        try:
+            (Path(app.root_path) / rel).unlink(missing_ok=True)
+        except OSError:
+            app.logger.warning("No se pudo borrar export obsoleto: %s", rel)
@@ -1,6 +1,7 @@
 # app/services/admin/games_service.py
 from typing import Any, Dict, List, Optional
 from app.services.notify.push_sender import send_bulk_push
+from app.services.admin.search import parse_admin_search
 
 # ---------- helpers ----------
 def _fetch_all_dicts(cur) -> List[dict]:
@@ -20,9 +21,7 @@ SELECT
   COALESCE(l.name, g.lottery_name)                         AS lottery_name,
   COALESCE(to_char(g.scheduled_date, 'YYYY-MM-DD'), '')    AS played_date,
   COALESCE(to_char(g.scheduled_time, 'HH24:MI'), '')       AS played_time,
-  (SELECT COUNT(DISTINCT gn.taken_by)
-   FROM public.game_numbers gn
-   WHERE gn.game_id = g.id)                                AS players_count,
+  (SELECT COUNT(*) FROM public.game_players gp WHERE gp.game_id = g.id)::int AS players_count,
   g.winning_number                                         AS winning_number,
   g.state_id                                               AS state_id,
   g.digits                                                 AS digits
@@ -47,124 +46,180 @@ FOR UPDATE
 """
 
 # ---------- listados ----------
-SQL_LIST_NOQ = """
+# Hora efectiva del juego. Debe coincidir EXACTO con ix_games_effective_at_id
+# (sql/004_games_admin_list.sql) para que el ORDER BY / keyset use el índice.
+_EFFECTIVE_AT = """COALESCE(
+           g.scheduled_date::timestamp + COALESCE(g.scheduled_time, '00:00'::time),
+           g.played_at,
+           '-infinity'::timestamp
+         )"""
+
+# Jugadores por juego: se cuentan en game_players (una fila por jugador, la
+# mantienen los triggers de game_numbers) solo para los juegos de la página.
+# Nada escribe en la fila de games al comprometer números.
+def _with_players(page_sql: str) -> str:
+    return f"""
+SELECT
+  p.id, p.lottery_name, p.played_date, p.played_time,
+  pc.players_count                                         AS players_count,
+  p.winning_number, p.state_id, p.digits, p.cursor_at
+FROM ({page_sql}) p
+LEFT JOIN LATERAL (
+  SELECT COUNT(*)::int AS players_count
+    FROM public.game_players gp
+   WHERE gp.game_id = p.id
+) pc ON TRUE
+ORDER BY p.effective_at DESC, p.id DESC
+"""
+
+_SQL_LIST_BASE = f"""
 SELECT
   g.id                                                     AS id,
   COALESCE(l.name, g.lottery_name)                         AS lottery_name,
   COALESCE(to_char(g.scheduled_date, 'YYYY-MM-DD'), '')    AS played_date,
   COALESCE(to_char(g.scheduled_time, 'HH24:MI'), '')       AS played_time,
-  COUNT(DISTINCT gn.taken_by)                              AS players_count,
-  MAX(g.winning_number)                                    AS winning_number,
-  MAX(g.state_id)                                          AS state_id,
-  g.digits                                                 AS digits
+  g.winning_number                                         AS winning_number,
+  g.state_id                                               AS state_id,
+  g.digits                                                 AS digits,
+  {_EFFECTIVE_AT}                                          AS effective_at,
+  ({_EFFECTIVE_AT})::text                                  AS cursor_at
 FROM public.games g
-LEFT JOIN public.lotteries     l  ON l.id = g.lottery_id
-LEFT JOIN public.game_numbers  gn ON gn.game_id = g.id
-GROUP BY
-  g.id,
-  COALESCE(l.name, g.lottery_name),
-  g.scheduled_date,
-  g.scheduled_time,
-  g.digits
-ORDER BY COALESCE(
-           g.scheduled_date::timestamp
-           + COALESCE(g.scheduled_time, '00:00'::time),
-           g.played_at
-         ) DESC
-LIMIT %(limit)s OFFSET %(offset)s
+LEFT JOIN public.lotteries l ON l.id = g.lottery_id
 """
 
+SQL_LIST_NOQ = _with_players(_SQL_LIST_BASE + f"""
+ORDER BY {_EFFECTIVE_AT} DESC, g.id DESC
+LIMIT %(limit)s OFFSET %(offset)s
+""")
+
+# Keyset: siguiente página a partir del último (hora efectiva, id) visto
+SQL_LIST_NOQ_AFTER = _with_players(_SQL_LIST_BASE + f"""
+WHERE ({_EFFECTIVE_AT}, g.id) < (%(after_at)s::timestamp, %(after_id)s)
+ORDER BY {_EFFECTIVE_AT} DESC, g.id DESC
+LIMIT %(limit)s
+""")
 
+# Total desde el contador (triggers de games); estimación del planner como respaldo
 SQL_COUNT_NOQ = """
-SELECT COUNT(*) AS total
-FROM (
+SELECT COALESCE(
+         (SELECT value FROM public.table_counters WHERE name = 'games'),
+         (SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = 'public.games'::regclass)
+       ) AS total
+"""
+
+# ---------- búsqueda (ver app/services/admin/search.py) ----------
+# Número exacto: id del juego o número jugado (btree)
+_SQL_HITS_NUM = """
+  SELECT g.id FROM public.games g WHERE g.id = %(num)s
+  UNION
+  SELECT gn.game_id FROM public.game_numbers gn
+   WHERE gn.number = %(num)s AND gn.taken_by IS NOT NULL
+"""
+
+# Texto: nombre de la lotería (trigram)
+_SQL_HITS_TEXT = """
   SELECT g.id
-  FROM public.games g
-  GROUP BY g.id
-) t
+    FROM public.games g
+    JOIN public.lotteries l ON l.id = g.lottery_id
+   WHERE l.name ILIKE %(like)s
+  UNION
+  SELECT g.id
+    FROM public.games g
+    LEFT JOIN public.lotteries l ON l.id = g.lottery_id
+   WHERE l.id IS NULL
+     AND g.lottery_name ILIKE %(like)s
 """
 
-SQL_LIST_Q = """
+_SQL_LIST_HITS = """
+WITH hits AS ({hits})
 SELECT
   g.id                                                     AS id,
   COALESCE(l.name, g.lottery_name)                         AS lottery_name,
   COALESCE(to_char(g.scheduled_date, 'YYYY-MM-DD'), '')    AS played_date,
   COALESCE(to_char(g.scheduled_time, 'HH24:MI'), '')       AS played_time,
-  COUNT(DISTINCT gn.taken_by)                              AS players_count,
-  MAX(g.winning_number)                                    AS winning_number,
-  MAX(g.state_id)                                          AS state_id,
-  g.digits                                                 AS digits
-FROM public.games g
-LEFT JOIN public.lotteries     l  ON l.id = g.lottery_id
-LEFT JOIN public.game_numbers  gn ON gn.game_id = g.id
-WHERE CAST(g.id AS TEXT) ILIKE %(like)s
-   OR COALESCE(l.name, g.lottery_name) ILIKE %(like)s
-   OR EXISTS (
-       SELECT 1
-       FROM public.game_numbers gn2
-       WHERE gn2.game_id = g.id
-         AND CAST(gn2.number AS TEXT) ILIKE %(like)s
-   )
-GROUP BY
-  g.id,
-  COALESCE(l.name, g.lottery_name),
-  g.scheduled_date,
-  g.scheduled_time,
-  g.digits
-ORDER BY COALESCE(
-           g.scheduled_date::timestamp
-           + COALESCE(g.scheduled_time, '00:00'::time),
-           g.played_at
-         ) DESC
+  g.winning_number                                         AS winning_number,
+  g.state_id                                               AS state_id,
+  g.digits                                                 AS digits,
+  {effective_at}                                           AS effective_at,
+  ({effective_at})::text                                   AS cursor_at
+FROM hits h
+JOIN public.games g ON g.id = h.id
+LEFT JOIN public.lotteries l ON l.id = g.lottery_id
+ORDER BY {effective_at} DESC, g.id DESC
 LIMIT %(limit)s OFFSET %(offset)s
 """
 
+_SQL_COUNT_HITS = "WITH hits AS ({hits}) SELECT COUNT(*) AS total FROM hits"
 
-SQL_COUNT_Q = """
-SELECT COUNT(*) AS total
-FROM (
-  SELECT g.id
-  FROM public.games g
-  LEFT JOIN public.lotteries l ON l.id = g.lottery_id
-  WHERE CAST(g.id AS TEXT) ILIKE %(like)s
-     OR COALESCE(l.name, g.lottery_name) ILIKE %(like)s
-     OR EXISTS (
-         SELECT 1
-         FROM public.game_numbers gn2
-         WHERE gn2.game_id = g.id
-           AND CAST(gn2.number AS TEXT) ILIKE %(like)s
-     )
-  GROUP BY g.id
-) t
-"""
+SQL_LIST_Q_NUM = _with_players(_SQL_LIST_HITS.format(hits=_SQL_HITS_NUM, effective_at=_EFFECTIVE_AT))
+SQL_COUNT_Q_NUM = _SQL_COUNT_HITS.format(hits=_SQL_HITS_NUM)
+SQL_LIST_Q = _with_players(_SQL_LIST_HITS.format(hits=_SQL_HITS_TEXT, effective_at=_EFFECTIVE_AT))
+SQL_COUNT_Q = _SQL_COUNT_HITS.format(hits=_SQL_HITS_TEXT)
+
+def _encode_cursor(row: Dict[str, Any]) -> str:
+    return f"{row['cursor_at']}|{row['id']}"
+
+def _decode_cursor(cursor: Optional[str]):
+    """'<hora efectiva>|<id>' → (texto timestamp, id) o None si no es válido."""
+    if not cursor or "|" not in cursor:
+        return None
+    at, _, gid = cursor.rpartition("|")
+    try:
+        return at, int(gid)
+    except ValueError:
+        return None
 
-def list_games(conn, q: str, page: int, per_page: int) -> Dict[str, Any]:
-    """Lista juegos con cantidad de jugadores por juego."""
+def list_games(conn, q: str, page: int, per_page: int, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Lista juegos con cantidad de jugadores por juego.
+    Sin búsqueda acepta `cursor` (keyset, devuelto en next_cursor) en vez de page/OFFSET.
+    Con búsqueda next_cursor es siempre None: se pagina con page / total.
+    """
     page = max(page, 1)
     per_page = min(max(per_page, 1), 200)
     offset = (page - 1) * per_page
 
+    search = parse_admin_search(q)
+    after = None if search else _decode_cursor(cursor)
+
     with conn.cursor() as cur:
-        if q:
-            params = {"like": f"%{q}%", "limit": per_page, "offset": offset}
+        if search and search.is_numeric:
+            params = {"num": search.number, "limit": per_page, "offset": offset}
+            cur.execute(SQL_LIST_Q_NUM, params)
+            items = _fetch_all_dicts(cur)
+
+            cur.execute(SQL_COUNT_Q_NUM, params)
+            total = cur.fetchone()[0]
+        elif search:
+            params = {"like": search.like, "limit": per_page, "offset": offset}
             cur.execute(SQL_LIST_Q, params)
             items = _fetch_all_dicts(cur)
 
             cur.execute(SQL_COUNT_Q, params)
             total = cur.fetchone()[0]
         else:
-            params = {"limit": per_page, "offset": offset}
-            cur.execute(SQL_LIST_NOQ, params)
+            if after:
+                params = {"after_at": after[0], "after_id": after[1], "limit": per_page}
+                cur.execute(SQL_LIST_NOQ_AFTER, params)
+            else:
+                params = {"limit": per_page, "offset": offset}
+                cur.execute(SQL_LIST_NOQ, params)
             items = _fetch_all_dicts(cur)
 
             cur.execute(SQL_COUNT_NOQ)
             total = cur.fetchone()[0]
 
+    # Solo el camino keyset (sin q) sabe seguir un cursor: las búsquedas paginan por page/total
+    next_cursor = _encode_cursor(items[-1]) if not search and len(items) == per_page else None
+    for it in items:
+        it.pop("cursor_at", None)
+
     return {
         "items": items,
         "page": page,
         "per_page": per_page,
         "total": int(total or 0),
+        "next_cursor": next_cursor,
     }
 
 # ---------- loterías para el select ----------
@@ -0,0 +1,351 @@
+# app/services/admin/kpi_snapshot.py
+"""
+KPIs del dashboard admin precalculados (ver sql/006_admin_kpis.sql).
+
+- refresh_dashboard_kpis(): arma el payload del dashboard con lecturas baratas
+  (table_counters, game_players, admin_kpi_monthly) y lo guarda en
+  admin_kpi_snapshot. La versión solo sube si el payload cambió → ETag estable.
+- Las series mensuales se recalculan solo desde el mes anterior (incremental);
+  la primera vez (o con full=True) se recalcula todo el histórico.
+- Se refresca desde el scheduler (KPI_REFRESH_MIN) y por eventos: registro y
+  sincronización de suscripciones llaman request_refresh(), que agrupa los
+  eventos de KPI_REFRESH_DEBOUNCE_SEC en un solo refresh.
+- El commit de números (camino caliente) solo pide request_counters_refresh():
+  actualiza usuarios / juegos activos / jugadores dentro del snapshot, sin
+  referidos ni series mensuales.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import text
+
+from app.db.database import db
+
+SNAPSHOT_NAME = "dashboard"
+_MONTHS_IN_PAYLOAD = 12
+
+# Ventas: suscripciones con precio de catálogo > 0 (sin pruebas gratuitas)
+_SQL_SALES_MONTHLY = """
+    WITH price(prefix, micros) AS (VALUES {values}),
+    subs AS (
+        SELECT date_trunc('month', COALESCE(s.current_period_start, s.created_at))::date AS month,
+               p.micros
+          FROM public.user_subscriptions s
+          JOIN LATERAL (
+                SELECT price.micros
+                  FROM price
+                 WHERE left(s.last_product_id, length(price.prefix)) = price.prefix
+                 ORDER BY length(price.prefix) DESC
+                 LIMIT 1
+          ) p ON TRUE
+         WHERE COALESCE(s.current_period_start, s.created_at) >= :since
+           AND p.micros > 0
+    )
+    SELECT month,
+           COUNT(*)::bigint                  AS sales_count,
+           (SUM(micros) / 1000000)::bigint   AS sales_cop
+      FROM subs
+     GROUP BY month
+"""
+
+# Ingresos: compras registradas en referral_commissions (monto bruto y comisión)
+_SQL_REVENUE_MONTHLY = """
+    SELECT date_trunc('month', rc.event_time)::date           AS month,
+           (SUM(rc.amount_micros) / 1000000)::bigint          AS revenue_cop,
+           (SUM(rc.commission_micros) / 1000000)::bigint      AS commission_cop
+      FROM public.referral_commissions rc
+     WHERE rc.event_time >= :since
+       AND rc.status <> 'rejected'
+     GROUP BY 1
+"""
+
+_SQL_KPIS = """
+    SELECT
+        COALESCE((SELECT value FROM public.table_counters WHERE name = 'users'),
+                 (SELECT COUNT(*) FROM public.users))                        AS users,
+        (SELECT COUNT(*) FROM public.games WHERE state_id = 1)              AS active_games,
+        (SELECT COUNT(*) FROM public.game_players)                          AS players
+"""
+
+_refresh_lock = threading.Lock()
+_refresh_pending = {"full": False, "counters": False}
+
+
+def _price_values() -> Tuple[str, Dict[str, Any]]:
+    from app.subscriptions.service import _PRICE_CATALOG
+
+    parts, params = [], {}
+    for i, (prefix, (micros, _cur)) in enumerate(_PRICE_CATALOG.items()):
+        parts.append(f"(CAST(:pp{i} AS TEXT), CAST(:pm{i} AS BIGINT))")
+        params[f"pp{i}"] = prefix
+        params[f"pm{i}"] = int(micros)
+    return ", ".join(parts), params
+
+
+def _refresh_monthly(full: bool) -> None:
+    """Recalcula admin_kpi_monthly desde `since` (mes anterior, o todo)."""
+    if not full:
+        full = db.session.execute(text("SELECT NOT EXISTS (SELECT 1 FROM public.admin_kpi_monthly)")).scalar()
+    since = datetime(1970, 1, 1, tzinfo=timezone.utc) if full else db.session.execute(
+        text("SELECT date_trunc('month', now()) - interval '1 month'")
+    ).scalar()
+
+    values, params = _price_values()
+    rows = []
+    for r in db.session.execute(text(_SQL_SALES_MONTHLY.format(values=values)), {**params, "since": since}).mappings():
+        rows.append((r["month"], "sales_count", r["sales_count"]))
+        rows.append((r["month"], "sales_cop", r["sales_cop"]))
+    for r in db.session.execute(text(_SQL_REVENUE_MONTHLY), {"since": since}).mappings():
+        rows.append((r["month"], "revenue_cop", r["revenue_cop"]))
+        rows.append((r["month"], "commission_cop", r["commission_cop"]))
+
+    db.session.execute(
+        text("DELETE FROM public.admin_kpi_monthly WHERE month >= CAST(:since AS DATE)"),
+        {"since": since},
+    )
+    if rows:
+        db.session.execute(
+            text("""
+                INSERT INTO public.admin_kpi_monthly (month, metric, value, updated_at)
+                VALUES (:month, :metric, :value, now())
+            """),
+            [{"month": m, "metric": k, "value": int(v or 0)} for m, k, v in rows],
+        )
+
+
+def _monthly_series() -> Tuple[list, list, int]:
+    rows = db.session.execute(text("""
+        SELECT to_char(month, 'YYYY-MM') AS month, metric, value,
+               month >= date_trunc('year', now())::date AS this_year
+          FROM public.admin_kpi_monthly
+         WHERE month >= (date_trunc('month', now()) - make_interval(months => :n))::date
+         ORDER BY month
+    """), {"n": _MONTHS_IN_PAYLOAD - 1}).mappings().all()
+
+    by_month: Dict[str, Dict[str, int]] = {}
+    revenue_ytd = 0
+    for r in rows:
+        by_month.setdefault(r["month"], {})[r["metric"]] = int(r["value"] or 0)
+        if r["metric"] == "sales_cop" and r["this_year"]:
+            revenue_ytd += int(r["value"] or 0)
+
+    sales = [
+        {"month": m, "count": v.get("sales_count", 0), "amount_cop": v.get("sales_cop", 0)}
+        for m, v in by_month.items()
+    ]
+    revenue = [
+        {"month": m, "revenue_cop": v.get("revenue_cop", 0), "commission_cop": v.get("commission_cop", 0)}
+        for m, v in by_month.items()
+    ]
+    return sales, revenue, revenue_ytd
+
+
+def _counters() -> Dict[str, int]:
+    k = db.session.execute(text(_SQL_KPIS)).mappings().first()
+    return {
+        "users": int(k["users"] or 0),
+        "games": int(k["active_games"] or 0),
+        "players": int(k["players"] or 0),
+    }
+
+
+def _build_payload() -> Dict[str, Any]:
+    from app.services.admin.referrals_service import compute_referrals_summary
+
+    c = _counters()
+    users, games, players = c["users"], c["games"], c["players"]
+
+    latest_users = [dict(r) for r in db.session.execute(text("""
+        SELECT id, name, phone, public_code, role_id
+        FROM users
+        ORDER BY id DESC
+        LIMIT 5
+    """)).mappings().all()]
+
+    sales_by_month, revenue_by_month, revenue_ytd = _monthly_series()
+
+    # Savepoint: si faltan tablas de referidos no se pierde el resto del refresh
+    try:
+        with db.session.begin_nested():
+            referrals = compute_referrals_summary(None)
+    except Exception as e:
+        current_app.logger.warning("kpi_refresh: resumen de referidos no disponible: %s", e)
+        referrals = {"total": 0, "active": 0, "inactive": 0, "pending_cop": 0, "paid_cop": 0, "currency": "COP"}
+
+    return {
+        "kpis": {
+            "users": users,
+            "total_users": users,
+
+            "games": games,
+            "total_games": games,
+
+            "players": players,
+            "total_players": players,
+
+            "tickets_today": 0,
+            "revenue_ytd": float(revenue_ytd),
+        },
+        "sales_by_month": sales_by_month,
+        "revenue_by_month": revenue_by_month,
+        "latest_users": latest_users,
+        "latest_sales": [],
+        "referrals": referrals,
+    }
+
+
+def refresh_dashboard_kpis(full: bool = False) -> Optional[int]:
+    """
+    Recalcula y guarda el snapshot. Devuelve la versión vigente, o None si otro
+    proceso ya estaba refrescando (advisory lock).
+    """
+    try:
+        got = db.session.execute(
+            text("SELECT pg_try_advisory_xact_lock(hashtext('admin_kpi_snapshot'))")
+        ).scalar()
+        if not got:
+            db.session.rollback()
+            return None
+
+        _refresh_monthly(full)
+        payload = json.dumps(_build_payload(), default=str, sort_keys=True)
+
+        version = db.session.execute(text("""
+            INSERT INTO public.admin_kpi_snapshot AS s (name, payload, version, updated_at)
+            VALUES (:name, CAST(:payload AS JSONB), 1, now())
+            ON CONFLICT (name) DO UPDATE
+               SET payload = EXCLUDED.payload,
+                   version = s.version + 1,
+                   updated_at = now()
+             WHERE s.payload IS DISTINCT FROM EXCLUDED.payload
+            RETURNING version
+        """), {"name": SNAPSHOT_NAME, "payload": payload}).scalar()
+        if version is None:
+            version = db.session.execute(
+                text("SELECT version FROM public.admin_kpi_snapshot WHERE name = :name"),
+                {"name": SNAPSHOT_NAME},
+            ).scalar()
+        db.session.commit()
+        return int(version)
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def refresh_kpi_counters() -> Optional[int]:
+    """
+    Solo los contadores de `kpis` (tres lecturas baratas) sobre el snapshot
+    existente. Devuelve la versión nueva, o None si no cambió nada o aún no
+    hay snapshot (lo arma el scheduler / la primera lectura).
+    """
+    try:
+        c = _counters()
+        patch = json.dumps({
+            "users": c["users"], "total_users": c["users"],
+            "games": c["games"], "total_games": c["games"],
+            "players": c["players"], "total_players": c["players"],
+        })
+        version = db.session.execute(text("""
+            UPDATE public.admin_kpi_snapshot
+               SET payload = jsonb_set(payload, '{kpis}', (payload -> 'kpis') || CAST(:patch AS JSONB)),
+                   version = version + 1,
+                   updated_at = now()
+             WHERE name = :name
+               AND (payload -> 'kpis') IS DISTINCT FROM (payload -> 'kpis') || CAST(:patch AS JSONB)
+            RETURNING version
+        """), {"name": SNAPSHOT_NAME, "patch": patch}).scalar()
+        db.session.commit()
+        return int(version) if version is not None else None
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def get_dashboard_snapshot() -> Tuple[Dict[str, Any], int]:
+    """(payload, version). Si aún no existe el snapshot, lo calcula en línea."""
+    row = db.session.execute(
+        text("SELECT payload, version, updated_at FROM public.admin_kpi_snapshot WHERE name = :name"),
+        {"name": SNAPSHOT_NAME},
+    ).mappings().first()
+    if row is None:
+        refresh_dashboard_kpis()
+        row = db.session.execute(
+            text("SELECT payload, version, updated_at FROM public.admin_kpi_snapshot WHERE name = :name"),
+            {"name": SNAPSHOT_NAME},
+        ).mappings().first()
+        if row is None:
+            raise RuntimeError("admin_kpi_snapshot no disponible")
+
+    payload = row["payload"]
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    payload["updated_at"] = row["updated_at"].isoformat() if row["updated_at"] else None
+    return payload, int(row["version"])
+
+
+def get_snapshot_section(key: str) -> Optional[Any]:
+    """Una sección del snapshot (p. ej. 'referrals') sin recalcular; None si no hay."""
+    try:
+        return db.session.execute(
+            text("SELECT payload -> :key FROM public.admin_kpi_snapshot WHERE name = :name"),
+            {"key": key, "name": SNAPSHOT_NAME},
+        ).scalar()
+    except Exception:
+        db.session.rollback()
+        return None
+
+
+# -------------------------------------------------------------------
+#  Hooks de eventos (registro, commit, sync de suscripción)
+# -------------------------------------------------------------------
+def _run_refresh(app, kind: str) -> None:
+    with _refresh_lock:
+        _refresh_pending[kind] = False
+    with app.app_context():
+        try:
+            if kind == "full":
+                refresh_dashboard_kpis()
+            else:
+                refresh_kpi_counters()
+        except Exception as e:
+            app.logger.error("kpi_refresh (evento, %s) falló: %s", kind, e)
+        finally:
+            db.session.remove()
+
+
+def _schedule(kind: str) -> None:
+    try:
+        app = current_app._get_current_object()
+    except RuntimeError:
+        return  # sin app context (scripts): el scheduler lo cubrirá
+    delay = float(app.config.get("KPI_REFRESH_DEBOUNCE_SEC") or 5)
+    with _refresh_lock:
+        if _refresh_pending[kind]:
+            return
+        _refresh_pending[kind] = True
+    try:
+        t = threading.Timer(delay, _run_refresh, args=(app, kind))
+        t.daemon = True
+        t.start()
+    except Exception as e:
+        with _refresh_lock:
+            _refresh_pending[kind] = False
+        app.logger.warning("kpi_refresh: no se pudo programar: %s", e)
+
+
+def request_refresh() -> None:
+    """
+    Pide un refresh asíncrono. Los eventos dentro de la ventana de debounce
+    se agrupan en uno solo. Nunca lanza: no debe romper el flujo que lo llama.
+    """
+    _schedule("full")
+
+
+def request_counters_refresh() -> None:
+    """Como request_refresh(), pero solo los contadores (refresh_kpi_counters)."""
+    _schedule("counters")
@@ -2,9 +2,47 @@
 from typing import Any, Dict, List, Literal
 from sqlalchemy import text
 from app.db.database import db
+from app.services.admin.search import parse_admin_search
 
 State = Literal["active", "historical", "all"]
 
+# ---------- búsqueda: pares (user_id, game_id) ----------
+# Número exacto: id de usuario, id de juego, número jugado o código público
+_SQL_HITS_NUM = """
+    SELECT gn.taken_by AS user_id, gn.game_id
+      FROM public.game_numbers gn
+     WHERE gn.taken_by = :num
+    UNION
+    SELECT gn.taken_by, gn.game_id
+      FROM public.game_numbers gn
+     WHERE gn.game_id = :num AND gn.taken_by IS NOT NULL
+    UNION
+    SELECT gn.taken_by, gn.game_id
+      FROM public.game_numbers gn
+     WHERE gn.number = :num AND gn.taken_by IS NOT NULL
+    UNION
+    SELECT gn.taken_by, gn.game_id
+      FROM public.users u
+      JOIN public.game_numbers gn ON gn.taken_by = u.id
+     WHERE u.public_code = :code
+"""
+
+# Texto: nombre / código del jugador y nombre de la lotería (trigram)
+_SQL_HITS_TEXT = """
+    SELECT gn.taken_by AS user_id, gn.game_id
+      FROM public.users u
+      JOIN public.game_numbers gn ON gn.taken_by = u.id
+     WHERE u.name ILIKE :like
+        OR u.public_code ILIKE :like
+    UNION
+    SELECT gn.taken_by, gn.game_id
+      FROM public.games g
+      LEFT JOIN public.lotteries l ON l.id = g.lottery_id
+      JOIN public.game_numbers gn ON gn.game_id = g.id
+     WHERE gn.taken_by IS NOT NULL
+       AND COALESCE(l.name, g.lottery_name) ILIKE :like
+"""
+
 def list_players(q: str, page: int, per_page: int, state: State = "active") -> Dict[str, Any]:
     """
     Devuelve una fila por (player=taken_by, game_id) con:
@@ -67,7 +105,12 @@ def list_players(q: str, page: int, per_page: int, state: State = "active") -> D
         ) t
     """)
 
+    # 🔎 Búsqueda: pares (jugador, juego) que coinciden; ver app/services/admin/search.py
+    search = parse_admin_search(q)
+    hits_sql = _SQL_HITS_NUM if (search and search.is_numeric) else _SQL_HITS_TEXT
+
     base_list_q = text(f"""
+        WITH hits AS ({hits_sql})
         SELECT
         u.id                                  AS user_id,
         u.name                                AS player_name,
@@ -79,23 +122,12 @@ def list_players(q: str, page: int, per_page: int, state: State = "active") -> D
         to_char(g.played_at, 'HH24:MI')       AS played_time,
         ARRAY_AGG(gn.number ORDER BY gn.position) AS numbers
 
-        FROM public.game_numbers gn
+        FROM hits h
+        JOIN public.game_numbers gn ON gn.game_id = h.game_id AND gn.taken_by = h.user_id
         JOIN public.games      g  ON g.id = gn.game_id
         LEFT JOIN public.lotteries l ON l.id = g.lottery_id
         JOIN public.users      u  ON u.id = gn.taken_by
-        WHERE
-              ( CAST(u.id AS TEXT) ILIKE :like
-             OR u.name ILIKE :like
-             OR u.public_code ILIKE :like
-             OR CAST(g.id AS TEXT) ILIKE :like
-             OR COALESCE(l.name, g.lottery_name) ILIKE :like
-             OR EXISTS (
-                 SELECT 1
-                 FROM public.game_numbers gn2
-                 WHERE gn2.game_id = g.id
-                   AND gn2.taken_by = u.id
-                   AND CAST(gn2.number AS TEXT) ILIKE :like
-             ))
+        WHERE 1=1
           {state_where}
         GROUP BY
           u.id, u.name, u.public_code,
@@ -107,33 +139,20 @@ def list_players(q: str, page: int, per_page: int, state: State = "active") -> D
     """)
 
     base_count_q = text(f"""
+        WITH hits AS ({hits_sql})
         SELECT COUNT(*) AS total
-        FROM (
-          SELECT u.id, g.id
-          FROM public.game_numbers gn
-          JOIN public.games g ON g.id = gn.game_id
-          JOIN public.users u ON u.id = gn.taken_by
-          LEFT JOIN public.lotteries l ON l.id = g.lottery_id
-          WHERE
-                ( CAST(u.id AS TEXT) ILIKE :like
-               OR u.name ILIKE :like
-               OR u.public_code ILIKE :like
-               OR CAST(g.id AS TEXT) ILIKE :like
-               OR COALESCE(l.name, g.lottery_name) ILIKE :like
-               OR EXISTS (
-                   SELECT 1
-                   FROM public.game_numbers gn2
-                   WHERE gn2.game_id = g.id
-                     AND gn2.taken_by = u.id
-                     AND CAST(gn2.number AS TEXT) ILIKE :like
-               ))
-            {state_where}
-          GROUP BY u.id, g.id
-        ) t
+        FROM hits h
+        JOIN public.games g ON g.id = h.game_id
+        WHERE 1=1
+          {state_where}
     """)
 
-    if q:
-        params = {"like": f"%{q}%", "limit": per_page, "offset": offset}
+    if search and search.is_numeric:
+        params = {"num": search.number, "code": search.raw, "limit": per_page, "offset": offset}
+        rows = db.session.execute(base_list_q, params).mappings().all()
+        total = db.session.execute(base_count_q, params).scalar() or 0
+    elif search:
+        params = {"like": search.like, "limit": per_page, "offset": offset}
         rows = db.session.execute(base_list_q, params).mappings().all()
         total = db.session.execute(base_count_q, params).scalar() or 0
     else:
@@ -95,42 +95,8 @@ def mature_commissions(days: int | None = None, minutes: int | None = None) -> i
 #  (sin depender de app.services.referrals.payouts_service)
 # =========================================================
 
-def list_commission_requests(
-    status: Optional[str] = None,
-    user_id: Optional[int] = None,
-    q: Optional[str] = None,
-    limit: int = 50,
-    offset: int = 0,
-    order: str = "pr.requested_at DESC",
-) -> Dict[str, Any]:
-    """
-    Lista solicitudes en payout_requests con filtros básicos.
-    Devuelve {"items":[...], "total": int}
-    Incluye account_type/account_kind traducidos al ES y los crudos *_raw.
-    """
-    where = ["1=1"]
-    params: Dict[str, Any] = {}
-
-    if status:
-        where.append("pr.status = :status")
-        params["status"] = status
-
-    if user_id is not None:
-        where.append("pr.user_id = :user_id")
-        params["user_id"] = int(user_id)
-
-    if q:
-        where.append(
-            "(pr.account_number ILIKE :q "
-            "OR COALESCE(pr.user_note,'') ILIKE :q "
-            "OR COALESCE(pr.admin_note,'') ILIKE :q)"
-        )
-        params["q"] = f"%{q}%"
-
-    where_sql = " AND ".join(where)
-    order_sql = order if order.strip() else "pr.requested_at DESC"
-
-    sql_items = text(f"""
+# SELECT compartido por el listado paginado y la exportación COPY (copy_export.py)
+SQL_COMMISSION_REQUESTS_SELECT = """
         SELECT
             pr.id,
             pr.user_id,
@@ -171,6 +137,53 @@ def list_commission_requests(
             pr.created_at
         FROM public.payout_requests pr
         LEFT JOIN public.users u ON u.id = pr.user_id
+"""
+
+def commission_requests_where(
+    status: Optional[str] = None,
+    user_id: Optional[int] = None,
+    q: Optional[str] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """Filtros de payout_requests → (where_sql, params)."""
+    where = ["1=1"]
+    params: Dict[str, Any] = {}
+
+    if status:
+        where.append("pr.status = :status")
+        params["status"] = status
+
+    if user_id is not None:
+        where.append("pr.user_id = :user_id")
+        params["user_id"] = int(user_id)
+
+    if q:
+        where.append(
+            "(pr.account_number ILIKE :q "
+            "OR COALESCE(pr.user_note,'') ILIKE :q "
+            "OR COALESCE(pr.admin_note,'') ILIKE :q)"
+        )
+        params["q"] = f"%{q}%"
+
+    return " AND ".join(where), params
+
+def list_commission_requests(
+    status: Optional[str] = None,
+    user_id: Optional[int] = None,
+    q: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+    order: str = "pr.requested_at DESC",
+) -> Dict[str, Any]:
+    """
+    Lista solicitudes en payout_requests con filtros básicos.
+    Devuelve {"items":[...], "total": int}
+    Incluye account_type/account_kind traducidos al ES y los crudos *_raw.
+    """
+    where_sql, params = commission_requests_where(status=status, user_id=user_id, q=q)
+    order_sql = order if order.strip() else "pr.requested_at DESC"
+
+    sql_items = text(f"""
+        {SQL_COMMISSION_REQUESTS_SELECT}
         WHERE {where_sql}
         ORDER BY {order_sql}
         LIMIT :limit OFFSET :offset
@@ -232,6 +245,45 @@ def reject_commission_request(request_id: int, admin_user_id: Optional[int] = No
         raise ValueError(f"Solicitud {request_id} no existe")
     return _isoify_record(dict(row), keys=("updated_at",))
 
+# Lotes de pago con total, #solicitudes y primer beneficiario.
+# Lo usan el listado admin (referrals_routes) y la exportación COPY.
+SQL_PAYOUT_BATCHES_SELECT = """
+            WITH base AS (
+            SELECT
+                pb.id,
+                pb.created_at,
+                pb.currency_code AS currency,
+                COALESCE(
+                pb.total_micros,
+                SUM(COALESCE(pbi.amount_micros, pr.amount_micros))
+                ) AS total_micros,
+                COUNT(DISTINCT pbi.payout_request_id) AS requests_count,
+                MIN(pr.user_id)           AS first_user_id,
+                MIN(u.name)               AS first_user_name,
+                MIN(u.public_code)        AS first_user_code,        -- 👈 NUEVO
+                EXISTS (
+                SELECT 1 FROM payout_payment_files pf WHERE pf.batch_id = pb.id
+                ) AS has_files
+            FROM payout_payment_batches pb
+            LEFT JOIN payout_payment_batch_items pbi ON pbi.batch_id = pb.id
+            LEFT JOIN payout_requests pr            ON pr.id = pbi.payout_request_id
+            LEFT JOIN users u                       ON u.id = pr.user_id
+            GROUP BY pb.id, pb.created_at, pb.currency_code, pb.total_micros
+            )
+            SELECT
+            id,
+            created_at,
+            currency,
+            requests_count                                   AS items,
+            (total_micros / 1000000)::bigint                 AS total_cop,
+            has_files,
+            first_user_id,
+            first_user_name,
+            first_user_code,                                  -- 👈 NUEVO
+            ('PB-' || lpad(id::text, 6, '0'))               AS code
+            FROM base
+"""
+
 # =========================================================
 #  PAGAR: crear lote y marcar requests como 'paid'
 # =========================================================
@@ -1,6 +1,10 @@
 # app/services/admin/referrals_service.py
 from __future__ import annotations
 
+import copy
+import os
+import threading
+import time
 from typing import Optional, Dict, Any
 from sqlalchemy import text, bindparam, Integer
 from app.db.database import db
@@ -23,9 +27,11 @@ def _micros_to_int(v) -> int:
         return 0
 
 
-def get_referrals_summary(referrer_id: Optional[int] = None) -> Dict[str, Any]:
+def compute_referrals_summary(referrer_id: Optional[int] = None) -> Dict[str, Any]:
     """
     Resumen global (o por referidor) de personas referidas + montos.
+    Calcula siempre contra las tablas (lo usa el refresh de kpi_snapshot);
+    para servir al panel usar get_referrals_summary().
 
     Definiciones:
       - total   : cantidad de filas en public.referrals
@@ -50,77 +56,85 @@ def get_referrals_summary(referrer_id: Optional[int] = None) -> Dict[str, Any]:
         "currency": "COP"
       }
     """
-    try:
-        where_total = "WHERE 1=1"
-        params: Dict[str, Any] = {}
-
-        if referrer_id is not None:
-            where_total += " AND r.referrer_user_id = :rid"
-            params["rid"] = int(referrer_id)
-
-        # ---------- TOTAL ----------
-        total_stmt = text(f"""
-            SELECT COUNT(*)::bigint
-            FROM public.referrals r
-            {where_total}
-        """).bindparams(*([bindparam("rid", type_=Integer)] if referrer_id is not None else []))
-
-        total = db.session.execute(total_stmt, params).scalar() or 0
-
-        # ---------- ACTIVOS ----------
-        where_active = where_total + """
-            AND sub.is_premium IS TRUE
-            AND sub.expires_at IS NOT NULL
-            AND sub.expires_at > NOW()
-        """
-
-        active_stmt = text(f"""
-            SELECT COUNT(*)::bigint
-            FROM public.referrals r
-            LEFT JOIN LATERAL (
-                SELECT s.is_premium, s.expires_at
-                FROM public.user_subscriptions s
-                WHERE s.user_id = r.referred_user_id
-                ORDER BY COALESCE(s.expires_at, s.updated_at, s.created_at) DESC NULLS LAST
-                LIMIT 1
-            ) AS sub ON TRUE
-            {where_active}
-        """).bindparams(*([bindparam("rid", type_=Integer)] if referrer_id is not None else []))
-
-        active = db.session.execute(active_stmt, params).scalar() or 0
-        inactive = max(int(total) - int(active), 0)
-
-        # ---------- COMISIONES: pendiente / pagada ----------
-        where_comm = "WHERE 1=1"
-        if referrer_id is not None:
-            where_comm += " AND rc.referrer_user_id = :rid"
-
-        comm_stmt = text(f"""
-            SELECT
-                COALESCE(SUM(CASE WHEN rc.status = 'available' THEN rc.commission_micros END), 0) AS pending_micros,
-                COALESCE(SUM(CASE WHEN rc.status = 'paid'      THEN rc.commission_micros END), 0) AS paid_micros,
-                -- Si tienes múltiples monedas, aquí podrías agregar lógica adicional.
-                COALESCE(MAX(rc.currency_code), 'COP') AS currency
-            FROM public.referral_commissions rc
-            {where_comm}
-        """).bindparams(*([bindparam("rid", type_=Integer)] if referrer_id is not None else []))
-
-        row = db.session.execute(comm_stmt, params).mappings().first() or {}
-        pending_cop = _micros_to_cop(row.get("pending_micros"))
-        paid_cop = _micros_to_cop(row.get("paid_micros"))
-        currency = row.get("currency") or "COP"
+    where_total = "WHERE 1=1"
+    params: Dict[str, Any] = {}
+
+    if referrer_id is not None:
+        where_total += " AND r.referrer_user_id = :rid"
+        params["rid"] = int(referrer_id)
+
+    # ---------- TOTAL ----------
+    total_stmt = text(f"""
+        SELECT COUNT(*)::bigint
+        FROM public.referrals r
+        {where_total}
+    """).bindparams(*([bindparam("rid", type_=Integer)] if referrer_id is not None else []))
+
+    total = db.session.execute(total_stmt, params).scalar() or 0
+
+    # ---------- ACTIVOS ----------
+    where_active = where_total + """
+        AND sub.is_premium IS TRUE
+        AND sub.expires_at IS NOT NULL
+        AND sub.expires_at > NOW()
+    """
 
-        return {
-            "total": int(total),
-            "active": int(active),
-            "inactive": int(inactive),
-            "pending_cop": int(pending_cop),
-            "paid_cop": int(paid_cop),
-            "currency": str(currency),
-        }
+    active_stmt = text(f"""
+        SELECT COUNT(*)::bigint
+        FROM public.referrals r
+        LEFT JOIN public.user_current_subscription sub
+               ON sub.user_id = r.referred_user_id
+        {where_active}
+    """).bindparams(*([bindparam("rid", type_=Integer)] if referrer_id is not None else []))
+
+    active = db.session.execute(active_stmt, params).scalar() or 0
+    inactive = max(int(total) - int(active), 0)
+
+    # ---------- COMISIONES: pendiente / pagada ----------
+    where_comm = "WHERE 1=1"
+    if referrer_id is not None:
+        where_comm += " AND rc.referrer_user_id = :rid"
+
+    comm_stmt = text(f"""
+        SELECT
+            COALESCE(SUM(CASE WHEN rc.status = 'available' THEN rc.commission_micros END), 0) AS pending_micros,
+            COALESCE(SUM(CASE WHEN rc.status = 'paid'      THEN rc.commission_micros END), 0) AS paid_micros,
+            -- Si tienes múltiples monedas, aquí podrías agregar lógica adicional.
+            COALESCE(MAX(rc.currency_code), 'COP') AS currency
+        FROM public.referral_commissions rc
+        {where_comm}
+    """).bindparams(*([bindparam("rid", type_=Integer)] if referrer_id is not None else []))
+
+    row = db.session.execute(comm_stmt, params).mappings().first() or {}
+    pending_cop = _micros_to_cop(row.get("pending_micros"))
+    paid_cop = _micros_to_cop(row.get("paid_micros"))
+    currency = row.get("currency") or "COP"
+
+    return {
+        "total": int(total),
+        "active": int(active),
+        "inactive": int(inactive),
+        "pending_cop": int(pending_cop),
+        "paid_cop": int(paid_cop),
+        "currency": str(currency),
+    }
+
+def get_referrals_summary(referrer_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Igual que compute_referrals_summary, pero el resumen global (sin referrer_id)
+    se sirve desde el snapshot de KPIs del dashboard (sql/006_admin_kpis.sql).
+    """
+    if referrer_id is None:
+        from app.services.admin.kpi_snapshot import get_snapshot_section
+        cached = get_snapshot_section("referrals")
+        if cached:
+            return dict(cached)
 
+    try:
+        return compute_referrals_summary(referrer_id)
     except Exception:
         # Fallback silencioso si las tablas no existen aún
+        db.session.rollback()
         return {
             "total": 0,
             "active": 0,
@@ -130,6 +144,79 @@ def get_referrals_summary(referrer_id: Optional[int] = None) -> Dict[str, Any]:
             "currency": "COP",
         }
 
+
+# Ranking en una sola pasada sobre la proyección user_current_subscription (sql/007):
+#   active_refs → referidos con sub vigente (cada referido se evalúa una vez)
+#   top         → conteo por promotor + top N
+#   detalle     → json_agg solo de los N promotores elegidos
+_SQL_TOP_REFERRERS = """
+    WITH active_refs AS (
+        SELECT r.referrer_user_id, r.referred_user_id,
+               COALESCE(c.sub_created_at, c.expires_at) AS subscription_date
+          FROM public.referrals r
+          JOIN public.user_current_subscription c ON c.user_id = r.referred_user_id
+         WHERE r.referrer_user_id IS NOT NULL
+           AND c.is_premium IS TRUE
+           AND c.expires_at IS NOT NULL
+           AND c.expires_at > NOW()
+    ),
+    top AS (
+        SELECT referrer_user_id, COUNT(*)::int AS active_count
+          FROM active_refs
+         GROUP BY referrer_user_id
+         ORDER BY active_count DESC, referrer_user_id
+         LIMIT :lim
+    ),
+    detalle AS (
+        SELECT a.referrer_user_id,
+               json_agg(
+                   json_build_object(
+                       'user_id', ru.id,
+                       'name', COALESCE(NULLIF(ru.name, ''), ru.email, 'ID #' || ru.id::text),
+                       'phone', COALESCE(NULLIF(ru.phone, ''), ''),
+                       'status', 'PRO',   -- activo ⇒ su sub vigente es PRO
+                       'subscription_date', a.subscription_date
+                   )
+                   ORDER BY ru.id
+               ) AS active_users
+          FROM active_refs a
+          JOIN top t             ON t.referrer_user_id = a.referrer_user_id
+          JOIN public.users ru   ON ru.id = a.referred_user_id
+         GROUP BY a.referrer_user_id
+    )
+    SELECT
+        t.referrer_user_id AS user_id,
+        COALESCE(NULLIF(u.name, ''), u.email, 'ID #' || t.referrer_user_id::text) AS name,
+        COALESCE(NULLIF(u.phone, ''), '') AS phone,
+        t.active_count,
+        CASE
+          WHEN c.is_premium IS TRUE AND c.expires_at IS NOT NULL AND c.expires_at > NOW()
+          THEN 'PRO' ELSE 'FREE'
+        END AS status,
+        COALESCE(d.active_users, '[]'::json) AS active_users
+    FROM top t
+    LEFT JOIN public.users u ON u.id = t.referrer_user_id
+    LEFT JOIN public.user_current_subscription c ON c.user_id = t.referrer_user_id
+    LEFT JOIN detalle d      ON d.referrer_user_id = t.referrer_user_id
+    ORDER BY t.active_count DESC, t.referrer_user_id
+"""
+
+# Caché corta del top (el panel de referidos hace polling)
+_TOP_CACHE_TTL_SEC = float(os.getenv("TOP_REFERRERS_CACHE_TTL_SEC", "30"))
+_TOP_CACHE: Dict[int, tuple[float, list]] = {}
+_TOP_CACHE_LOCK = threading.Lock()
+
+
+def invalidate_top_referrers_cache() -> None:
+    """
+    Vacía el top cacheado de ESTE proceso. Lo llaman los caminos que cambian
+    referidos o suscripciones (registro con código, sync / webhook de compra);
+    los demás workers se ponen al día al vencer su TTL.
+    """
+    with _TOP_CACHE_LOCK:
+        _TOP_CACHE.clear()
+
+
 def get_top_referrers(limit: int = 5) -> list[dict]:
     """
     Devuelve el top de usuarios que más referidos activos tienen.
@@ -137,129 +224,25 @@ def get_top_referrers(limit: int = 5) -> list[dict]:
       {
         user_id, name, phone, active_count, status,
         active_users: [
-          { user_id, name, phone, status },
+          { user_id, name, phone, status, subscription_date },
           ...
         ]
       }
 
       - status: 'PRO' si el PROMOTOR tiene una suscripción activa; de lo contrario 'FREE'.
-      - active_users: lista de referidos ACTIVOS (PRO o FREE según su sub).
+      - active_users: lista de referidos ACTIVOS.
+
+    El resultado se cachea TOP_REFERRERS_CACHE_TTL_SEC segundos por `limit`.
     """
-    try:
-        stmt = text("""
-WITH last_sub AS (
-    SELECT
-        s.user_id,
-        s.is_premium,
-        s.expires_at,
-        s.created_at,  -- 👈 NUEVO: fecha de compra/alta de la sub
-        ROW_NUMBER() OVER (
-            PARTITION BY s.user_id
-            ORDER BY COALESCE(s.expires_at, s.updated_at, s.created_at)
-                 DESC NULLS LAST
-        ) AS rn
-    FROM public.user_subscriptions s
-),
-
-            last_sub_ref AS (         -- última suscripción del PROMOTOR
-                SELECT
-                    s.user_id,
-                    s.is_premium,
-                    s.expires_at,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY s.user_id
-                        ORDER BY COALESCE(s.expires_at, s.updated_at, s.created_at)
-                             DESC NULLS LAST
-                    ) AS rn
-                FROM public.user_subscriptions s
-            )
-            SELECT
-                r.referrer_user_id AS user_id,
-                COALESCE(
-                  NULLIF(MAX(u.name), ''),
-                  MAX(u.email),
-                  'ID #' || r.referrer_user_id::text
-                ) AS name,
-                COALESCE(NULLIF(MAX(u.phone), ''), '') AS phone,
-                COUNT(*)::int AS active_count,
-
-                -- PRO si el promotor tiene una sub activa; si no, FREE
-                MAX(
-                  CASE
-                    WHEN lsr.is_premium IS TRUE
-                     AND lsr.expires_at IS NOT NULL
-                     AND lsr.expires_at > NOW()
-                    THEN 'PRO' ELSE 'FREE'
-                  END
-                ) AS status,
-
-                -- 👇 Lista de referidos activos (los mismos que cuentan en active_count)
-                COALESCE(
-                  (
-SELECT json_agg(
-  json_build_object(
-    'user_id', ru.id,
-    'name', COALESCE(
-               NULLIF(ru.name, ''),
-               ru.email,
-               'ID #' || ru.id::text
-           ),
-    'phone', COALESCE(NULLIF(ru.phone, ''), ''),
-
-    'status',
-      CASE
-        WHEN lsr2.is_premium IS TRUE
-         AND lsr2.expires_at IS NOT NULL
-         AND lsr2.expires_at > NOW()
-        THEN 'PRO' ELSE 'FREE'
-      END,
-
-    -- 👇 NUEVO: fecha de suscripción para ese referido activo
-    'subscription_date',
-      COALESCE(
-        ls2.created_at,    -- cuando se creó la sub
-        ls2.expires_at     -- fallback por si acaso
-      )
-  )
-  ORDER BY ru.id
-)
-FROM public.referrals r2
-JOIN last_sub ls2
-  ON ls2.user_id = r2.referred_user_id
- AND ls2.rn = 1
-JOIN public.users ru
-  ON ru.id = r2.referred_user_id
-LEFT JOIN last_sub lsr2
-  ON lsr2.user_id = r2.referred_user_id
- AND lsr2.rn = 1
-WHERE r2.referrer_user_id = r.referrer_user_id
-  AND ls2.is_premium IS TRUE
-  AND ls2.expires_at IS NOT NULL
-  AND ls2.expires_at > NOW()
-
-                  ),
-                  '[]'::json
-                ) AS active_users
-
-            FROM public.referrals r
-            JOIN last_sub ls
-              ON ls.user_id = r.referred_user_id
-             AND ls.rn = 1
-            LEFT JOIN public.users u
-              ON u.id = r.referrer_user_id
-            LEFT JOIN last_sub_ref lsr
-              ON lsr.user_id = r.referrer_user_id
-             AND lsr.rn = 1
-            WHERE r.referrer_user_id IS NOT NULL
-              AND ls.is_premium IS TRUE
-              AND ls.expires_at IS NOT NULL
-              AND ls.expires_at > NOW()
-            GROUP BY r.referrer_user_id
-            ORDER BY active_count DESC
-            LIMIT :lim
-        """)
+    limit = int(limit)
+    now = time.monotonic()
+    with _TOP_CACHE_LOCK:
+        hit = _TOP_CACHE.get(limit)
+        if hit and hit[0] > now:
+            return copy.deepcopy(hit[1])
 
-        rows = db.session.execute(stmt, {"lim": limit}).mappings().all()
+    try:
+        rows = db.session.execute(text(_SQL_TOP_REFERRERS), {"lim": limit}).mappings().all()
 
         out: list[dict] = []
         for r in rows:
@@ -276,12 +259,15 @@ WHERE r2.referrer_user_id = r.referrer_user_id
                     "active_users": active_users,
                 }
             )
-        return out
-
     except Exception as e:
+        db.session.rollback()
         print("get_top_referrers ERROR:", e)
         return []
 
+    with _TOP_CACHE_LOCK:
+        _TOP_CACHE[limit] = (now + _TOP_CACHE_TTL_SEC, out)
+    return copy.deepcopy(out)
+
 def get_admin_user_detail(user_id: int) -> Dict[str, Any]:
     """
     Devuelve el objeto que el front necesita para 'Ver usuario':
@@ -299,24 +285,13 @@ def get_admin_user_detail(user_id: int) -> Dict[str, Any]:
       }
     Saca:
       - users: full_name / identification_number
-      - user_subscriptions: última fila activa para is_pro
+      - user_current_subscription: suscripción vigente para is_pro
       - payout_requests: ÚLTIMA solicitud (ORDER BY requested_at/created_at DESC) para datos bancarios
       - banks: mapear bank_id -> name
     """
 
     sql = text("""
-        WITH last_sub AS (
-            SELECT
-                s.user_id,
-                s.is_premium,
-                s.expires_at,
-                ROW_NUMBER() OVER (
-                  PARTITION BY s.user_id
-                  ORDER BY COALESCE(s.expires_at, s.updated_at, s.created_at) DESC NULLS LAST
-                ) AS rn
-            FROM public.user_subscriptions s
-        ),
-        latest_payout AS (
+        WITH latest_payout AS (
             SELECT pr.*
             FROM public.payout_requests pr
             WHERE pr.user_id = :user_id
@@ -342,8 +317,8 @@ def get_admin_user_detail(user_id: int) -> Dict[str, Any]:
             COALESCE(lp.observations, '') AS observations
 
         FROM public.users u
-        LEFT JOIN last_sub ls
-          ON ls.user_id = u.id AND ls.rn = 1
+        LEFT JOIN public.user_current_subscription ls
+          ON ls.user_id = u.id
         LEFT JOIN latest_payout lp
           ON TRUE
         LEFT JOIN public.banks b
@@ -435,15 +410,6 @@ def get_commission_request_breakdown(request_id: int) -> Dict[str, Any]:
     currency = head["currency"]
 
     items_sql = text("""
-        WITH last_sub AS (
-            SELECT
-              s.user_id, s.is_premium, s.expires_at,
-              ROW_NUMBER() OVER (
-                PARTITION BY s.user_id
-                ORDER BY COALESCE(s.expires_at, s.updated_at, s.created_at) DESC NULLS LAST
-              ) AS rn
-            FROM public.user_subscriptions s
-        )
        SELECT
   rc.referred_user_id,
   u.public_code,
@@ -459,9 +425,8 @@ def get_commission_request_breakdown(request_id: int) -> Dict[str, Any]:
   rc.created_at                   -- 👈 NUEVO
 FROM public.referral_commissions rc
 JOIN public.users u ON u.id = rc.referred_user_id
-LEFT JOIN last_sub ls
+LEFT JOIN public.user_current_subscription ls
   ON ls.user_id = rc.referred_user_id
- AND ls.rn = 1
 WHERE rc.payout_request_id = :rid
 ORDER BY rc.id ASC
 
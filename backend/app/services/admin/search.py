@@ -0,0 +1,39 @@
+# app/services/admin/search.py
+"""
+Clasificación de la búsqueda `q` del panel admin (juegos / jugadores).
+
+- Solo dígitos → búsqueda exacta (id de juego, id de usuario, número jugado):
+  usa índices btree, sin CAST(... AS TEXT) ILIKE.
+- Cualquier otra cosa → ILIKE '%q%' sobre columnas con índice trigram
+  (ver sql/003_admin_search.sql).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+# Evita desbordar INTEGER en Postgres con números larguísimos
+_MAX_NUMERIC_LEN = 9
+
+
+@dataclass(frozen=True)
+class AdminSearch:
+    raw: str
+    number: Optional[int]
+    like: str
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.number is not None
+
+
+def _escape_like(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def parse_admin_search(q: Optional[str]) -> Optional[AdminSearch]:
+    q = (q or "").strip()
+    if not q:
+        return None
+    number = int(q) if q.isdigit() and len(q) <= _MAX_NUMERIC_LEN else None
+    return AdminSearch(raw=q, number=number, like=f"%{_escape_like(q)}%")
@@ -2,6 +2,7 @@
 from typing import Optional, Dict, Any
 from sqlalchemy import text, bindparam, Integer, String
 from app.db.database import db
+from app.services.auth.profile_cache import invalidate_user, notify_user_changed
 
 class UserHasActiveGames(Exception):
     """El usuario tiene juegos/balotas asociados; no se puede eliminar."""
@@ -27,6 +28,8 @@ def list_users(q: Optional[str] = None, page: int = 1, per_page: int = 50) -> Di
                 COALESCE(r.role_name, 'Desconocido') AS role,
 
                 -- datos crudos de suscripción (última fila por usuario)
+                sub.plan                            AS subscription_plan,
+                sub.max_digits                      AS subscription_max_digits,
                 sub.entitlement                     AS subscription_entitlement,
                 UPPER(COALESCE(sub.status,'NONE'))  AS subscription_status,
                 -- is_active se recalcula en tiempo real para no depender de la columna desactualizada
@@ -54,13 +57,8 @@ def list_users(q: Optional[str] = None, page: int = 1, per_page: int = 50) -> Di
 
                 FROM users u
                 LEFT JOIN public.roles r ON r.id = u.role_id
-                LEFT JOIN LATERAL (
-                SELECT s.entitlement, s.status, s.is_premium, s.expires_at
-                FROM public.user_subscriptions s
-                WHERE s.user_id = u.id
-                ORDER BY COALESCE(s.expires_at, s.updated_at, s.created_at) DESC NULLS LAST
-                LIMIT 1
-                ) sub ON TRUE
+                -- suscripción vigente (proyección mantenida por trigger, sql/007)
+                LEFT JOIN public.user_current_subscription sub ON sub.user_id = u.id
         {where_sql}
         ORDER BY u.id DESC
         OFFSET :offset
@@ -183,7 +181,9 @@ def update_user_role(user_id: int, new_role_id: int) -> Dict[str, Any]:
             db.session.rollback()
             raise ValueError("Usuario no encontrado.")
 
+        notify_user_changed(db.session, user_id)
         db.session.commit()
+        invalidate_user(user_id)
         return {
             "id": updated["id"],
             "name": updated["name"],
@@ -225,7 +225,9 @@ def delete_user(user_id: int) -> bool:
             db.session.rollback()
             return False
 
+        notify_user_changed(db.session, user_id)
         db.session.commit()
+        invalidate_user(user_id)
         return True
     except UserHasActiveGames:
         db.session.rollback()
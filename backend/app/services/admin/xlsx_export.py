@@ -0,0 +1,169 @@
+# app/services/admin/xlsx_export.py
+"""
+Motor de exportación XLSX en streaming (openpyxl write-only).
+
+- Las filas llegan de un iterador (cursor del lado del servidor), nunca una lista.
+- Estilos compartidos como NamedStyle: cada celda referencia el estilo por nombre
+  en vez de crear Font/Fill/Border propios.
+- write-only escribe la hoja a disco a medida que se hace append(), así que la
+  memoria se mantiene plana aunque el sorteo tenga 100k+ números.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List
+
+if TYPE_CHECKING:  # openpyxl (~100 ms) se importa solo al exportar, no al arrancar
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+# ── Paleta ──────────────────────────────────────────────────────────
+GOLD      = "FFD700"
+DARK      = "1A1A2E"
+BLUE_HDR  = "16213E"
+BLUE_ROW  = "0F3460"
+WHITE     = "FFFFFF"
+GRAY_ALT  = "F2F2F2"
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+_COLS = 5
+_COL_WIDTHS = [12, 30, 18, 20, 16]
+
+
+def _register_styles(wb: Workbook) -> None:
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+    thin = Side(style="thin", color="CCCCCC")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    center = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    left = Alignment(horizontal="left", vertical="center")
+
+    def _fill(hex_color):
+        return PatternFill("solid", fgColor=hex_color)
+
+    styles = [
+        NamedStyle("ag_title", font=Font(bold=True, color=GOLD, size=14, name="Calibri"),
+                   fill=_fill(DARK), alignment=center),
+        NamedStyle("ag_empty", font=Font(color="666666", size=11, name="Calibri"), alignment=center),
+        NamedStyle("ag_game", font=Font(bold=True, color=WHITE, size=12, name="Calibri"),
+                   fill=_fill(BLUE_HDR), alignment=left),
+        NamedStyle("ag_stat_label", font=Font(bold=True, color=GOLD, size=10, name="Calibri"),
+                   fill=_fill(BLUE_ROW), alignment=center, border=border),
+        NamedStyle("ag_stat_value", font=Font(bold=True, color=WHITE, size=10, name="Calibri"),
+                   fill=_fill(BLUE_ROW), alignment=center, border=border),
+        NamedStyle("ag_header", font=Font(bold=True, color=DARK, size=10, name="Calibri"),
+                   fill=_fill(GOLD), alignment=center, border=border),
+        NamedStyle("ag_row", font=Font(color="222222", size=10, name="Calibri"),
+                   fill=_fill(WHITE), alignment=left, border=border),
+        NamedStyle("ag_row_alt", font=Font(color="222222", size=10, name="Calibri"),
+                   fill=_fill(GRAY_ALT), alignment=left, border=border),
+    ]
+    for st in styles:
+        wb.add_named_style(st)
+
+
+class _SheetWriter:
+    """Lleva el número de fila actual (write-only no permite volver atrás)."""
+
+    def __init__(self, ws):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.utils import get_column_letter
+
+        self.ws = ws
+        self.row_idx = 0
+        self._cell_cls = WriteOnlyCell
+        self._last_col = get_column_letter(_COLS)
+
+    def cell(self, value: Any, style: str | None = None) -> WriteOnlyCell:
+        c = self._cell_cls(self.ws, value=value)
+        if style:
+            c.style = style
+        return c
+
+    def append(self, cells: List[Any], height: float | None = None, merge: bool = False) -> None:
+        self.row_idx += 1
+        if height:
+            self.ws.row_dimensions[self.row_idx].height = height
+        if merge:
+            self.ws.merged_cells.add(f"A{self.row_idx}:{self._last_col}{self.row_idx}")
+        self.ws.append(cells)
+        # La fila ya quedó escrita: soltar su RowDimension para no acumular una por fila
+        self.ws.row_dimensions.pop(self.row_idx, None)
+
+
+def write_active_games_xlsx(rows: Iterable[Dict[str, Any]], fileobj) -> int:
+    """
+    Escribe el reporte de juegos activos en `fileobj` (ruta o archivo binario).
+    Devuelve cuántas filas de datos (números reservados) se escribieron.
+    """
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    _register_styles(wb)
+    ws = wb.create_sheet("Juegos Activos")
+
+    # Anchos y paneles: deben fijarse ANTES del primer append en write-only
+    for i, w in enumerate(_COL_WIDTHS, 1):
+        ws.column_dimensions[get_column_letter(i)].width = w
+    ws.freeze_panes = "A3"
+
+    out = _SheetWriter(ws)
+
+    # Fila 1: título general del reporte / fila 2 vacía como separador
+    generated = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+    out.append([out.cell(f"Reporte de Juegos Activos  —  {generated}", "ag_title")], height=32, merge=True)
+    out.append([])
+
+    current_game_id = None
+    alt = False
+    written = 0
+
+    for r in rows:
+        game_id = r.get("game_id")
+        digits = int(r.get("digits") or 3)
+
+        # ── Cabecera del juego ───────────────────────────────────────
+        if game_id != current_game_id:
+            if current_game_id is not None:
+                out.append([])  # línea en blanco entre juegos
+
+            lot_name = r.get("lottery_name") or "—"
+            p_date = r.get("played_date") or "—"
+            p_time = r.get("played_time") or "—"
+            out.append(
+                [out.cell(f"Juego #{game_id}  ·  {lot_name}  ·  {p_date}  {p_time}", "ag_game")],
+                height=24, merge=True,
+            )
+            out.append([
+                out.cell("Jugadores", "ag_stat_label"),
+                out.cell(r.get("players_in_game") or 0, "ag_stat_value"),
+                out.cell("Números reservados", "ag_stat_label"),
+                out.cell(r.get("reserved_numbers_in_game") or 0, "ag_stat_value"),
+            ], height=20)
+            headers = ["ID Usuario", "Nombre", "Teléfono", f"Número ({digits} dígitos)", "Suscripción"]
+            out.append([out.cell(h, "ag_header") for h in headers], height=20)
+
+            current_game_id = game_id
+            alt = False
+
+        # ── Fila de datos ────────────────────────────────────────────
+        raw_num = r.get("number")
+        num_str = str(int(raw_num)).zfill(digits) if raw_num is not None else "—"
+        style = "ag_row_alt" if alt else "ag_row"
+        out.append([
+            out.cell(r.get("user_id", ""), style),
+            out.cell(r.get("user_name", "") or "—", style),
+            out.cell(r.get("user_phone", "") or "—", style),
+            out.cell(num_str, style),
+            out.cell("", style),  # columna suscripción (vacía, para uso futuro)
+        ], height=18)
+        alt = not alt
+        written += 1
+
+    if current_game_id is None:
+        out.append([out.cell("No hay juegos activos ni números reservados.", "ag_empty")], merge=True)
+
+    wb.save(fileobj)
+    return written
@@ -3,6 +3,7 @@ import re
 from flask import current_app
 from werkzeug.security import check_password_hash
 from app.models.user import User
+from app.services.auth.profile_cache import get_user_profile
 
 class AuthError(Exception):
     """Excepción personalizada para errores de autenticación."""
@@ -126,15 +127,16 @@ def login_with_phone(phone: str, password: str) -> dict:
 
 
 def get_profile(user_id: int) -> dict | None:
-    u = User.query.get(user_id)
-    if not u:
+    # Perfil corto desde la caché LRU+TTL (no carga el User completo)
+    p = get_user_profile(user_id)
+    if not p:
         return None
     return {
-        "id": u.id,
-        "name": getattr(u, "name", None),
-        "phone": getattr(u, "phone", None),
-        "role_id": _safe_role_id(u),
-        "created_at": _created_at_iso(u),
-        "public_code": getattr(u, "public_code", None),   # 👈 IMPORTANTE
-        "referral_code": getattr(u, "public_code", None), # (alias opcional)
+        "id": p["id"],
+        "name": p["name"],
+        "phone": p["phone"],
+        "role_id": p["role_id"] if p["role_id"] is not None else 2,
+        "created_at": p["created_at"],
+        "public_code": p["public_code"],   # 👈 IMPORTANTE
+        "referral_code": p["public_code"], # (alias opcional)
     }
\ No newline at end of file
@@ -0,0 +1,112 @@
+# app/services/auth/profile_cache.py
+"""
+Caché LRU + TTL (por worker) del perfil corto del usuario:
+id → role_id, name, phone, public_code, created_at.
+
+La usan los guards de admin (identity, payout_batches_service._is_admin) y
+auth_service.get_profile. Los dashboards de admin hacen polling constante y así
+no pagan un SELECT a users en cada llamada.
+
+Es la fuente del rol para autorizar (app/security/identity.py): el claim rid del
+token no cuenta, así que degradar a un admin surte efecto apenas se invalida.
+
+Invalidación: users_service.update_user_role / delete_user (y la ruta de rol)
+llaman notify_user_changed() dentro de su transacción y invalidate_user() al
+confirmar. El NOTIFY llega a los demás workers por el listener de
+revocation_cache (canal user_changed); el TTL (USER_PROFILE_CACHE_TTL_SEC) queda
+como red de seguridad si el listener no está activo (modo pooler sin conexión
+directa, SQLite).
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+_MAX_SIZE = int(os.getenv("USER_PROFILE_CACHE_SIZE", "2048"))
+_TTL_SEC = float(os.getenv("USER_PROFILE_CACHE_TTL_SEC", "60"))
+
+NOTIFY_CHANNEL = "user_changed"
+
+_CACHE: "OrderedDict[int, tuple[float, Dict[str, Any]]]" = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def _load(user_id: int) -> Optional[Dict[str, Any]]:
+    from app.db.database import db
+
+    row = db.session.execute(
+        text("""
+            SELECT id, name, phone, role_id, public_code, created_at
+              FROM public.users
+             WHERE id = :uid
+        """),
+        {"uid": user_id},
+    ).mappings().first()
+    if not row:
+        return None
+    created_at = row["created_at"]
+    return {
+        "id": int(row["id"]),
+        "name": row["name"],
+        "phone": row["phone"],
+        "role_id": int(row["role_id"]) if row["role_id"] is not None else None,
+        "public_code": row["public_code"],
+        "created_at": created_at.isoformat() if created_at else None,
+    }
+
+
+def get_user_profile(user_id: int) -> Optional[Dict[str, Any]]:
+    """Perfil corto desde caché; si venció o no está, una lectura por PK."""
+    try:
+        uid = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    now = time.monotonic()
+    with _LOCK:
+        hit = _CACHE.get(uid)
+        if hit and hit[0] > now:
+            _CACHE.move_to_end(uid)
+            return dict(hit[1])
+
+    prof = _load(uid)
+    if prof is None:
+        invalidate_user(uid)
+        return None
+
+    with _LOCK:
+        _CACHE[uid] = (now + _TTL_SEC, prof)
+        _CACHE.move_to_end(uid)
+        while len(_CACHE) > _MAX_SIZE:
+            _CACHE.popitem(last=False)
+    return dict(prof)
+
+
+def get_user_role_id(user_id: int) -> Optional[int]:
+    prof = get_user_profile(user_id)
+    return prof["role_id"] if prof else None
+
+
+def invalidate_user(user_id: int) -> None:
+    with _LOCK:
+        _CACHE.pop(int(user_id), None)
+
+
+def clear() -> None:
+    with _LOCK:
+        _CACHE.clear()
+
+
+def notify_user_changed(session, user_id: int) -> None:
+    """
+    Encola el NOTIFY en la transacción del cambio de rol / borrado: los demás
+    workers invalidan su copia solo si el cambio hace commit.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    session.execute(text("SELECT pg_notify(:ch, :uid)"), {"ch": NOTIFY_CHANNEL, "uid": str(int(user_id))})
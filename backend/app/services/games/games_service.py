@@ -160,8 +160,16 @@ def get_or_create_active_unscheduled_game_id(
     """
     Usa/crea el ÚNICO juego ABIERTO sin ganador para ese digits.
     (state_id = 1 y winning_number IS NULL y digits = 3/4).
+
+    Debe correr dentro de la misma transacción que inserta los números: el
+    lock es de transacción (válido también detrás de PgBouncer) y serializa
+    el "buscar o crear" para que dos commits simultáneos no abran dos juegos.
     """
     params = {"digits": digits}
+    db.session.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext('open_game:' || CAST(:digits AS TEXT)))"),
+        params,
+    )
     row = db.session.execute(text("""
         SELECT id
         FROM games
@@ -0,0 +1,81 @@
+# app/services/http_session.py
+"""
+Sesiones HTTP salientes compartidas (requests.Session con pool de conexiones).
+
+Antes cada envío (FCM, Resend, ...) hacía requests.post() suelto: una conexión
+TCP + TLS nueva por llamada. Ahora hay una Session por destino y por proceso:
+
+- pool_maxsize = HTTP_POOL_MAXSIZE (gunicorn.conf.py lo iguala a la concurrencia
+  del worker: threads en gthread, un tope de worker_connections en gevent), así
+  ningún hilo / greenlet abre conexiones fuera del pool.
+- Con el worker gevent, requests / urllib3 usan el socket parcheado por gevent:
+  la espera de red cede el control y el worker sigue atendiendo otros requests.
+- Tras un fork las sesiones se descartan (los sockets no se comparten entre
+  procesos).
+
+Uso:
+    from app.services.http_session import get_session
+    r = get_session("fcm").post(url, json=payload, timeout=7)
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    import requests
+
+_sessions: Dict[str, "requests.Session"] = {}
+_lock = threading.Lock()
+
+
+def pool_maxsize() -> int:
+    return max(1, int(os.getenv("HTTP_POOL_MAXSIZE", "10")))
+
+
+def _build(name: str) -> "requests.Session":
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    # Sin reintentos automáticos: los POST de envío no son idempotentes y cada
+    # llamador decide si reintenta.
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize(), max_retries=0)
+    s = requests.Session()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers["User-Agent"] = f"LuckyApp/{name}"
+    return s
+
+
+def get_session(name: str = "default") -> "requests.Session":
+    """Session compartida del proceso para `name` (se crea la primera vez)."""
+    s = _sessions.get(name)
+    if s is not None:
+        return s
+    with _lock:
+        s = _sessions.get(name)
+        if s is None:
+            s = _sessions[name] = _build(name)
+        return s
+
+
+def close_sessions() -> None:
+    with _lock:
+        for s in _sessions.values():
+            try:
+                s.close()
+            except Exception:
+                pass
+        _sessions.clear()
+
+
+def _reset_after_fork() -> None:
+    # El hijo no debe reutilizar sockets del padre; tampoco un lock tomado.
+    global _lock
+    _lock = threading.Lock()
+    _sessions.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -3,7 +3,7 @@ from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from flask import current_app
 from datetime import datetime, timezone
-import requests, json
+import json
 
 from app.db.database import db
 from app.models.device_token import DeviceToken
@@ -76,7 +76,8 @@ def send_test_push(*, device_token: str, title: str | None, body: str | None, da
         "data": data or {},
         "priority": "high",
     }
-    resp = requests.post("https://fcm.googleapis.com/fcm/send", headers=headers, data=json.dumps(payload), timeout=7)
+    from app.services.http_session import get_session
+    resp = get_session("fcm").post("https://fcm.googleapis.com/fcm/send", headers=headers, data=json.dumps(payload), timeout=7)
     try:
         j = resp.json()
     except Exception:
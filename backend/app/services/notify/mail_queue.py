@@ -0,0 +1,327 @@
+# app/services/notify/mail_queue.py
+"""
+Cola de envío de correo del proceso (antes: un threading.Thread por correo).
+
+- MAIL_WORKERS hilos fijos consumen una cola acotada (MAIL_QUEUE_MAX) y envían
+  por la sesión HTTP compartida de Resend (keep-alive, sin TLS por correo).
+- Backpressure: con la cola llena, send_html espera MAIL_QUEUE_PUT_TIMEOUT_SEC;
+  si sigue llena, el correo se envía en el hilo del request (o se deja al
+  drenador si hay outbox). Ni se pierde ni se crean hilos sin límite.
+- Reintentos con backoff exponencial + jitter solo para fallos transitorios
+  (red, timeouts, HTTP 429 / 5xx, SMTP 4xx), hasta MAIL_MAX_ATTEMPTS.
+- Outbox opcional (MAIL_OUTBOX=1, sql/008_mail_outbox.sql): el correo se guarda
+  antes de encolarse; si el worker muere, el líder del scheduler lo reenvía
+  (drain_outbox, job mail_outbox). Con outbox los reintentos no duermen en el
+  worker: la fila vuelve a pending con next_attempt_at = now() + backoff y la
+  recoge el drenador (granularidad MAIL_OUTBOX_DRAIN_MIN). Sin outbox el
+  backoff se espera en el hilo del worker.
+- /metrics: mail_queue_depth, mail_queue_wait_seconds,
+  mail_send_duration_seconds{mode,result}, mail_messages_total{result}.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from flask import Flask
+from sqlalchemy import text
+
+from app.observability.metrics import (
+    MAIL_MESSAGES_TOTAL,
+    MAIL_QUEUE_DEPTH,
+    MAIL_QUEUE_WAIT_SECONDS,
+    MAIL_SEND_SECONDS,
+)
+
+_RETRY_CAP_SEC = 30.0
+
+
+@dataclass
+class MailJob:
+    to_email: str
+    subject: str
+    html: str
+    outbox_id: Optional[int] = None
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+# -------------------------------------------------------------------
+#  Reintentos
+# -------------------------------------------------------------------
+def is_transient(exc: BaseException) -> bool:
+    """¿Vale la pena reintentar? Configuración faltante o 4xx → no."""
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return False
+    # requests.ConnectionError / Timeout, socket, SMTPServerDisconnected: todos OSError
+    return isinstance(exc, OSError)
+
+
+def backoff_delay(attempt: int, base: float) -> float:
+    """base · 2^(intento-1), con tope, ×[0.5, 1.5) para que una ráfaga no reintente en bloque."""
+    return min(_RETRY_CAP_SEC, base * (2 ** max(attempt - 1, 0))) * random.uniform(0.5, 1.5)
+
+
+# -------------------------------------------------------------------
+#  Outbox (conexión propia: no se mezcla con la transacción del request)
+# -------------------------------------------------------------------
+def _outbox_enabled(app: Flask) -> bool:
+    return bool(app.config.get("MAIL_OUTBOX"))
+
+
+def _outbox_insert(job: MailJob) -> int:
+    from app.db.database import db
+
+    with db.engine.begin() as conn:
+        return int(conn.execute(text("""
+            INSERT INTO public.mail_outbox (to_email, subject, html, claimed_at)
+            VALUES (:to, :subject, :html, now())
+            RETURNING id
+        """), {"to": job.to_email, "subject": job.subject, "html": job.html}).scalar())
+
+
+def _outbox_update(sql: str, params: dict) -> None:
+    from app.db.database import db
+
+    with db.engine.begin() as conn:
+        conn.execute(text(sql), params)
+
+
+def _outbox_sent(job: MailJob) -> None:
+    _outbox_update("""
+        UPDATE public.mail_outbox
+           SET status = 'sent', attempts = :attempts, sent_at = now(), last_error = NULL
+         WHERE id = :id
+    """, {"id": job.outbox_id, "attempts": job.attempts})
+
+
+def _outbox_failed(job: MailJob, err: str) -> None:
+    _outbox_update("""
+        UPDATE public.mail_outbox
+           SET status = 'failed', attempts = :attempts, last_error = :err
+         WHERE id = :id
+    """, {"id": job.outbox_id, "attempts": job.attempts, "err": err[:1000]})
+
+
+def _outbox_retry(job: MailJob, delay: float, err: str) -> None:
+    """Devuelve la fila al drenador para dentro de `delay` segundos."""
+    _outbox_update("""
+        UPDATE public.mail_outbox
+           SET attempts = :attempts, last_error = :err, claimed_at = NULL,
+               next_attempt_at = now() + make_interval(secs => :delay)
+         WHERE id = :id
+    """, {"id": job.outbox_id, "attempts": job.attempts, "err": err[:1000], "delay": delay})
+
+
+def _outbox_release(outbox_ids: List[int]) -> None:
+    """Vuelve a dejar filas para el drenador (la cola estaba llena)."""
+    if outbox_ids:
+        _outbox_update(
+            "UPDATE public.mail_outbox SET claimed_at = NULL WHERE id = ANY(:ids)",
+            {"ids": outbox_ids},
+        )
+
+
+# -------------------------------------------------------------------
+#  Entrega
+# -------------------------------------------------------------------
+def deliver(app: Flask, job: MailJob, *, max_attempts: Optional[int] = None,
+            raise_errors: bool = False) -> bool:
+    """
+    Envía `job` con reintentos. Requiere app context. True si salió.
+    Con outbox_id un fallo transitorio no duerme: se reprograma en la fila.
+    """
+    from app.services.notify.mailer import send_now
+
+    cfg = app.config
+    mode = (cfg.get("MAIL_MODE") or os.getenv("MAIL_MODE") or "resend").lower()
+    max_attempts = max_attempts or int(cfg.get("MAIL_MAX_ATTEMPTS") or 4)
+    base = float(cfg.get("MAIL_RETRY_BASE_SEC") or 1)
+
+    while True:
+        job.attempts += 1
+        t0 = time.perf_counter()
+        try:
+            send_now(app, job.to_email, job.subject, job.html)
+        except Exception as e:
+            MAIL_SEND_SECONDS.labels(mode, "error").observe(time.perf_counter() - t0)
+            if job.attempts < max_attempts and is_transient(e):
+                MAIL_MESSAGES_TOTAL.labels("retry").inc()
+                delay = backoff_delay(job.attempts, base)
+                if job.outbox_id:
+                    # El worker queda libre; el drenador lo reencola cuando venza
+                    _outbox_retry(job, delay, str(e))
+                    app.logger.warning("✉️ reintento %d/%d a %s vía outbox en %.1fs: %s",
+                                       job.attempts + 1, max_attempts, job.to_email, delay, e)
+                    return False
+                app.logger.warning("✉️ reintento %d/%d a %s en %.1fs: %s",
+                                   job.attempts + 1, max_attempts, job.to_email, delay, e)
+                time.sleep(delay)
+                continue
+            MAIL_MESSAGES_TOTAL.labels("failed").inc()
+            app.logger.error("❌ correo a %s descartado tras %d intento(s): %s", job.to_email, job.attempts, e)
+            if job.outbox_id:
+                _outbox_failed(job, str(e))
+            if raise_errors:
+                raise
+            return False
+
+        MAIL_SEND_SECONDS.labels(mode, "ok").observe(time.perf_counter() - t0)
+        MAIL_MESSAGES_TOTAL.labels("sent").inc()
+        if job.outbox_id:
+            _outbox_sent(job)
+        return True
+
+
+class MailExecutor:
+    """Pool fijo de hilos sobre una cola acotada."""
+
+    def __init__(self, app: Flask, workers: int, maxsize: int):
+        self.app = app
+        self.queue: "queue.Queue[MailJob]" = queue.Queue(maxsize=max(1, maxsize))
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"mail-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self.threads:
+            t.start()
+
+    def submit(self, job: MailJob, timeout: float) -> bool:
+        """False si la cola siguió llena durante `timeout` segundos."""
+        job.enqueued_at = time.monotonic()
+        try:
+            if timeout > 0:
+                self.queue.put(job, timeout=timeout)
+            else:
+                self.queue.put_nowait(job)
+        except queue.Full:
+            return False
+        MAIL_QUEUE_DEPTH.inc()
+        MAIL_MESSAGES_TOTAL.labels("queued").inc()
+        return True
+
+    def _worker(self) -> None:
+        while True:
+            job = self.queue.get()
+            MAIL_QUEUE_DEPTH.dec()
+            MAIL_QUEUE_WAIT_SECONDS.observe(time.monotonic() - job.enqueued_at)
+            try:
+                with self.app.app_context():
+                    deliver(self.app, job)
+            except Exception:
+                # deliver ya registra; esto cubre fallos del outbox (BD caída)
+                self.app.logger.exception("mail worker: error inesperado con correo a %s", job.to_email)
+            finally:
+                self.queue.task_done()
+
+
+_EXECUTOR: Optional[MailExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_executor(app: Flask) -> MailExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = MailExecutor(
+                app,
+                workers=int(app.config.get("MAIL_WORKERS") or 4),
+                maxsize=int(app.config.get("MAIL_QUEUE_MAX") or 200),
+            )
+        return _EXECUTOR
+
+
+def _reset_after_fork() -> None:
+    # Los hilos del padre no existen en el hijo: cada worker arma su propio pool
+    global _EXECUTOR, _EXECUTOR_LOCK
+    _EXECUTOR = None
+    _EXECUTOR_LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# -------------------------------------------------------------------
+#  API
+# -------------------------------------------------------------------
+def enqueue(app: Flask, to_email: str, subject: str, html: str) -> None:
+    """Encola un correo (con outbox si está activo). No lanza por fallos de envío."""
+    job = MailJob(to_email=to_email, subject=subject, html=html)
+    if _outbox_enabled(app):
+        try:
+            job.outbox_id = _outbox_insert(job)
+        except Exception as e:
+            # Sin outbox este correo no es durable, pero sale igual por la cola en memoria
+            MAIL_MESSAGES_TOTAL.labels("outbox_error").inc()
+            app.logger.error("✉️ outbox no disponible; %s va solo por la cola en memoria: %s", to_email, e)
+
+    timeout = float(app.config.get("MAIL_QUEUE_PUT_TIMEOUT_SEC") or 0)
+    if get_executor(app).submit(job, timeout):
+        return
+
+    if job.outbox_id:
+        # Ya está persistido: lo envía el drenador en la próxima vuelta
+        MAIL_MESSAGES_TOTAL.labels("deferred").inc()
+        _outbox_release([job.outbox_id])
+        app.logger.warning("✉️ cola de correo llena; %s queda en outbox", to_email)
+        return
+
+    MAIL_MESSAGES_TOTAL.labels("inline").inc()
+    app.logger.warning("✉️ cola de correo llena; enviando a %s en el request", to_email)
+    deliver(app, job, max_attempts=1)
+
+
+def drain_outbox(app: Flask, batch: int = 100) -> dict:
+    """
+    Reencola pendientes vencidos: nunca reclamados (cola llena) o reclamados
+    hace más de MAIL_OUTBOX_STALE_SEC (el worker murió). Purga enviados viejos.
+    """
+    from app.db.database import db
+
+    stale = int(app.config.get("MAIL_OUTBOX_STALE_SEC") or 300)
+    with db.engine.begin() as conn:
+        rows = conn.execute(text("""
+            UPDATE public.mail_outbox o
+               SET claimed_at = now()
+              FROM (
+                    SELECT id
+                      FROM public.mail_outbox
+                     WHERE status = 'pending'
+                       AND next_attempt_at <= now()
+                       AND (claimed_at IS NULL OR claimed_at < now() - make_interval(secs => :stale))
+                     ORDER BY id
+                     LIMIT :batch
+                     FOR UPDATE SKIP LOCKED
+                   ) p
+             WHERE o.id = p.id
+            RETURNING o.id, o.to_email, o.subject, o.html, o.attempts
+        """), {"stale": stale, "batch": batch}).mappings().all()
+        purged = conn.execute(text("""
+            DELETE FROM public.mail_outbox
+             WHERE status = 'sent' AND sent_at < now() - make_interval(days => :days)
+        """), {"days": int(app.config.get("MAIL_OUTBOX_KEEP_DAYS") or 7)}).rowcount
+
+    executor = get_executor(app)
+    timeout = float(app.config.get("MAIL_QUEUE_PUT_TIMEOUT_SEC") or 0)
+    requeued, left = 0, []
+    for r in rows:
+        job = MailJob(to_email=r["to_email"], subject=r["subject"], html=r["html"],
+                      outbox_id=int(r["id"]), attempts=int(r["attempts"] or 0))
+        if left or not executor.submit(job, timeout):
+            left.append(job.outbox_id)
+        else:
+            requeued += 1
+    _outbox_release(left)
+    return {"requeued": requeued, "left": len(left), "purged": int(purged or 0)}
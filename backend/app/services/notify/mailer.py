@@ -19,9 +19,7 @@ from typing import Optional
 import os
 import ssl
 import smtplib
-import threading
 import traceback
-import requests
 from flask import current_app
 
 # =========================
@@ -74,8 +72,10 @@ def _send_resend(app, cfg, to_email: str, subject: str, html: str) -> None:
     sender = cfg.get("MAIL_FROM") or cfg.get("MAIL_DEFAULT_SENDER_EMAIL")
     _require(sender, "MAIL_FROM/MAIL_DEFAULT_SENDER_EMAIL")
 
+    from app.services.http_session import get_session
+
     try:
-        r = requests.post(
+        r = get_session("resend").post(
             "https://api.resend.com/emails",
             headers={"Authorization": f"Bearer {api_key}"},
             json={"from": sender, "to": [to_email], "subject": subject, "html": html},
@@ -131,45 +131,42 @@ def _send_smtp(app, cfg, to_email: str, subject: str, html: str) -> None:
 # =========================
 # API pública
 # =========================
-def send_html(to_email: str, subject: str, html: str, *, async_: bool = True) -> None:
+def send_now(app, to_email: str, subject: str, html: str) -> None:
     """
-    Envía un correo con el modo seleccionado:
+    Un intento de envío en el hilo actual con el modo seleccionado:
       - resend  (HTTP; recomendado) -> usa _send_resend
       - console (logs)              -> usa _send_console
       - smtp    (opcional)          -> usa _send_smtp
-
-    async_ = True -> dispara en background para no bloquear la request.
     """
-    app = current_app._get_current_object()
     cfg = app.config
 
     # Prioridad: config > env > default(resend)
     mode = (cfg.get("MAIL_MODE") or os.getenv("MAIL_MODE") or "resend").lower()
 
-    def _dispatch():
-        try:
-            if mode == "resend":
-                _send_resend(app, cfg, to_email, subject, html)
-            elif mode == "smtp":
-                _log_cfg(app, cfg)
-                _send_smtp(app, cfg, to_email, subject, html)
-            else:
-                _send_console(app, to_email, subject, html)
-        except Exception:
-            # En async registramos y NO propagamos; en sync sí levantamos excepción.
-            if async_:
-                app.logger.exception("Fallo envío email (async) a %s", to_email)
-            else:
-                raise
+    if mode == "resend":
+        _send_resend(app, cfg, to_email, subject, html)
+    elif mode == "smtp":
+        _log_cfg(app, cfg)
+        _send_smtp(app, cfg, to_email, subject, html)
+    else:
+        _send_console(app, to_email, subject, html)
+
+def send_html(to_email: str, subject: str, html: str, *, async_: bool = True) -> None:
+    """
+    Envía un correo (ver send_now para los modos).
+
+    async_ = True -> se encola en el pool de envío del proceso (mail_queue):
+                     no bloquea la request y reintenta fallos transitorios.
+    async_ = False -> un intento en el hilo actual; si falla, levanta excepción.
+    """
+    from app.services.notify.mail_queue import MailJob, deliver, enqueue
+
+    app = current_app._get_current_object()
 
     if async_:
-        # Asegura contexto dentro del hilo
-        def _runner():
-            with app.app_context():
-                _dispatch()
-        threading.Thread(target=_runner, daemon=True).start()
+        enqueue(app, to_email, subject, html)
     else:
-        _dispatch()
+        deliver(app, MailJob(to_email, subject, html), max_attempts=1, raise_errors=True)
 
 # =========================
 # Alias legacy (si tu código lo llama)
@@ -0,0 +1,129 @@
+# app/services/notify/notifications_retention.py
+"""
+Retención de public.notifications (particionada por mes, ver sql/002_notifications_partitioning.sql).
+
+- ensure_partitions(): crea por adelantado las particiones de los próximos meses.
+- apply_retention(): separa (DETACH) las particiones más viejas que `keep_months`.
+  Antes de soltarlas re-inserta las `you_won` sin leer (caen en notifications_default),
+  luego archiva (SET SCHEMA notifications_archive) o borra la partición y
+  resincroniza notification_counters para los usuarios afectados.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from datetime import date
+from typing import Any, Dict, List
+
+log = logging.getLogger("notifications")
+
+_PARTITION_RE = re.compile(r"^notifications_(\d{4})(\d{2})$")
+ARCHIVE_SCHEMA = "notifications_archive"
+ALLOWED_MODES = {"archive", "drop"}
+
+
+def _month_add(d: date, months: int) -> date:
+    y, m = divmod(d.month - 1 + months, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def ensure_partitions(conn, months_ahead: int = 2) -> List[str]:
+    """Crea (si faltan) las particiones del mes actual y los `months_ahead` siguientes."""
+    first = date.today().replace(day=1)
+    names: List[str] = []
+    with conn.cursor() as cur:
+        for i in range(max(months_ahead, 0) + 1):
+            cur.execute(
+                "SELECT public.fn_notifications_ensure_partition(%(m)s::date)",
+                {"m": _month_add(first, i)},
+            )
+            names.append(cur.fetchone()[0])
+    conn.commit()
+    return names
+
+
+def _list_month_partitions(cur) -> List[Dict[str, Any]]:
+    cur.execute("""
+        SELECT c.relname
+          FROM pg_inherits i
+          JOIN pg_class c      ON c.oid = i.inhrelid
+          JOIN pg_namespace ns ON ns.oid = c.relnamespace
+         WHERE i.inhparent = 'public.notifications'::regclass
+           AND ns.nspname = 'public'
+    """)
+    out: List[Dict[str, Any]] = []
+    for (name,) in cur.fetchall():
+        m = _PARTITION_RE.match(name)
+        if m:
+            out.append({"name": name, "month": date(int(m.group(1)), int(m.group(2)), 1)})
+    return sorted(out, key=lambda p: p["month"])
+
+
+def apply_retention(conn, keep_months: int = 6, mode: str = "archive") -> Dict[str, Any]:
+    """
+    Separa las particiones cuyo mes terminó antes de hoy - keep_months.
+    Una transacción por partición: si una falla, las demás siguen.
+    """
+    mode = (mode or "archive").strip().lower()
+    if mode not in ALLOWED_MODES:
+        raise ValueError("mode inválido (archive|drop)")
+    keep_months = max(int(keep_months), 1)
+
+    cutoff = _month_add(date.today().replace(day=1), -keep_months)
+    out: Dict[str, Any] = {"cutoff": cutoff.isoformat(), "mode": mode, "partitions": [], "retained": 0}
+
+    with conn.cursor() as cur:
+        expired = [p for p in _list_month_partitions(cur) if p["month"] < cutoff]
+    conn.rollback()
+
+    for part in expired:
+        name = part["name"]
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"ALTER TABLE public.notifications DETACH PARTITION public.{name}")
+
+                # 1) Las you_won sin leer se conservan en la partición default
+                cur.execute(f"""
+                    INSERT INTO public.notifications
+                    SELECT * FROM public.{name}
+                     WHERE read_at IS NULL
+                       AND data->>'type' = 'you_won'
+                """)
+                retained = cur.rowcount
+
+                # 2) Resincronizar contadores de los usuarios que tenían filas ahí
+                cur.execute(f"""
+                    UPDATE public.notification_counters c
+                       SET unread_count = (
+                               SELECT COUNT(*)
+                                 FROM public.notifications n
+                                WHERE n.user_id = c.user_id
+                                  AND n.read_at IS NULL
+                           ),
+                           updated_at = now()
+                     WHERE c.user_id IN (SELECT DISTINCT user_id FROM public.{name})
+                """)
+
+                # 3) Archivar o borrar
+                if mode == "archive":
+                    cur.execute(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+                    cur.execute(f"ALTER TABLE public.{name} SET SCHEMA {ARCHIVE_SCHEMA}")
+                else:
+                    cur.execute(f"DROP TABLE public.{name}")
+            conn.commit()
+            out["partitions"].append(name)
+            out["retained"] += retained
+            log.warning("[NOTIFS] retention %s %s retained=%s", mode, name, retained)
+        except Exception as e:
+            conn.rollback()
+            log.error("[NOTIFS] retention falló en %s: %s", name, e)
+
+    return out
+
+
+def run_retention(conn, keep_months: int = 6, mode: str = "archive", months_ahead: int = 2) -> Dict[str, Any]:
+    """Crea particiones futuras y aplica la retención en una sola pasada (cron / CLI)."""
+    created = ensure_partitions(conn, months_ahead)
+    out = apply_retention(conn, keep_months, mode)
+    out["ensured"] = created
+    return out
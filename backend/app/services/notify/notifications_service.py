@@ -33,10 +33,70 @@ def list_notifications(conn, user_id: int, unread_only: bool, page: int, per_pag
         """, {"uid": user_id, "limit": per_page, "offset": offset})
         items = _fetch_all_dicts(cur)
 
-        cur.execute(f"SELECT COUNT(*) FROM public.notifications {where}", {"uid": user_id})
-        total = int(cur.fetchone()[0] or 0)
+    unread = get_unread_count(conn, user_id)
+    if unread_only:
+        # El total de no leídas ya lo mantiene el contador
+        total = unread
+    else:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM public.notifications {where}", {"uid": user_id})
+            total = int(cur.fetchone()[0] or 0)
+
+    return {"items": items, "page": page, "per_page": per_page, "total": total, "unread": unread}
+
+def get_unread_count(conn, user_id: int) -> int:
+    """
+    Lee el contador de no leídas (badge) desde notification_counters.
+    Es una lectura por PK; los triggers de public.notifications lo mantienen.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT unread_count
+              FROM public.notification_counters
+             WHERE user_id = %(uid)s
+        """, {"uid": user_id})
+        row = cur.fetchone()
+    return int(row[0] or 0) if row else 0
+
+def list_notifications_since(conn, user_id: int, since_id: int, limit: int = 50) -> Dict[str, Any]:
+    """
+    Cursor incremental: solo las notificaciones con id > since_id (más viejas primero).
+    El cliente guarda `next_since_id` y lo reenvía en la siguiente consulta.
+    """
+    since_id = max(int(since_id or 0), 0)
+    limit = min(max(limit, 1), 200)
+
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT
+                id,
+                title,
+                body,
+                data,
+                data->>'type'                  AS type,
+                (data->>'game_id')::int        AS game_id,
+                NULLIF(REPLACE(data->>'winning_number','-',''),'')::int AS winning_number,
+
+                to_char(created_at,'YYYY-MM-DD HH24:MI:SS') AS created_at,
+                read_at IS NOT NULL            AS read
+            FROM public.notifications
+            WHERE user_id = %(uid)s
+              AND id > %(since_id)s
+            ORDER BY id ASC
+            LIMIT %(limit)s
+        """, {"uid": user_id, "since_id": since_id, "limit": limit + 1})
+        items = _fetch_all_dicts(cur)
+
+    has_more = len(items) > limit
+    items = items[:limit]
+    next_since_id = int(items[-1]["id"]) if items else since_id
 
-    return {"items": items, "page": page, "per_page": per_page, "total": total}
+    return {
+        "items": items,
+        "next_since_id": next_since_id,
+        "has_more": has_more,
+        "unread": get_unread_count(conn, user_id),
+    }
 
 def mark_as_read(conn, user_id: int, ids: List[int]) -> int:
     if not ids:
@@ -1,5 +1,11 @@
 # backend/app/services/notify/providers/colombiared_provider.py
+from typing import Iterable, Tuple
+
+
 class ColombiaRedProvider:
+    # Sin endpoint masivo confirmado: el dispatcher manda los SMS uno a uno, en paralelo
+    max_batch = 1
+
     def __init__(self, base_url: str, user: str, password: str, sender: str | None = None) -> None:
         self.base_url = base_url
         self.user = user
@@ -8,4 +14,9 @@ class ColombiaRedProvider:
 
     def send_sms(self, to: str, body: str) -> None:
         # Aquí implementarás la llamada HTTP real cuando tengas el proveedor listo
+        # (usar get_session("colombiared") de app.services.http_session: keep-alive)
         print(f"[ColombiaRED] Enviando a {to} desde {self.sender or '(sin sender)'}: {body}")
+
+    def send_bulk(self, messages: Iterable[Tuple[str, str]]) -> None:
+        for to, body in messages:
+            self.send_sms(to, body)
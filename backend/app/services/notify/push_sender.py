@@ -1,22 +1,34 @@
 # app/services/notify/push_sender.py
 import json
-import requests
+import threading
 from flask import current_app
-from google.oauth2 import service_account
-from google.auth.transport.requests import Request
+from app.services.http_session import get_session
+# google.auth se importa al enviar: no hace falta para arrancar la app
 
 # Scope requerido por FCM HTTP v1
 _FCM_SCOPE = "https://www.googleapis.com/auth/firebase.messaging"
 
+# Credenciales por archivo: el token dura ~1 h, no se pide uno nuevo por envío
+_credentials = {}
+_credentials_lock = threading.Lock()
+
 def _get_access_token(creds_path: str) -> str:
     """
     Obtiene un access token OAuth2 usando un Service Account JSON.
+    Reutiliza el token mientras siga vigente (refresh solo al vencer).
     """
-    credentials = service_account.Credentials.from_service_account_file(
-        creds_path, scopes=[_FCM_SCOPE]
-    )
-    credentials.refresh(Request())
-    return credentials.token
+    from google.oauth2 import service_account
+    from google.auth.transport.requests import Request
+
+    with _credentials_lock:
+        credentials = _credentials.get(creds_path)
+        if credentials is None:
+            credentials = _credentials[creds_path] = service_account.Credentials.from_service_account_file(
+                creds_path, scopes=[_FCM_SCOPE]
+            )
+        if not credentials.valid:
+            credentials.refresh(Request(session=get_session("google-oauth")))
+        return credentials.token
 
 def _v1_endpoint(project_id: str) -> str:
     return f"https://fcm.googleapis.com/v1/projects/{project_id}/messages:send"
@@ -39,6 +51,7 @@ def send_bulk_push(tokens, title, body, data=None, timeout=7):
     if not creds_path:
         return {"ok": False, "error": "GOOGLE_APPLICATION_CREDENTIALS not configured"}
 
+    session = get_session("fcm")
     access_token = _get_access_token(creds_path)
     url = _v1_endpoint(project_id)
     headers = {
@@ -61,7 +74,7 @@ def send_bulk_push(tokens, title, body, data=None, timeout=7):
                 },
             }
         }
-        r = requests.post(url, headers=headers, data=json.dumps(payload), timeout=timeout)
+        r = session.post(url, headers=headers, data=json.dumps(payload), timeout=timeout)
         try:
             results.append(r.json())
         except Exception:
@@ -1,35 +1,114 @@
 # backend/app/services/notify/sms_sender.py
+"""
+Envío de SMS.
+
+- get_sms_provider(): UNA instancia por proceso (antes se armaba una por
+  llamada). ColombiaRED sigue siendo un stub hasta confirmar su API.
+- get_sms_dispatcher(): capa de despacho sobre el proveedor:
+    * send(to, body)     -> un SMS en el hilo actual (levanta si falla)
+    * send_many([...])   -> lotes de max_batch por el endpoint masivo si el
+                            proveedor lo tiene; si no, en paralelo (SMS_WORKERS)
+    * submit(to, body)   -> asíncrono: una cola acotada junta lo que llega en
+                            SMS_BATCH_WINDOW_MS y lo manda en lote, así una
+                            ráfaga de códigos de reset no espera en fila la
+                            latencia del proveedor
+  Todo pasa por un limitador de tasa (token bucket) con la cuota del proveedor:
+  SMS_RATE_PER_SEC repartido entre los WEB_CONCURRENCY workers.
+- SMS_PROVIDER=local: proveedor de mentira con latencia fija (SMS_LOCAL_LATENCY_MS)
+  para pruebas de carga, sin red y sin costo.
+"""
 from __future__ import annotations
 
+import logging
 import os
+import queue
+import threading
+import time
 import typing
-from dataclasses import dataclass
-from typing import Protocol, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Protocol, Tuple
+
+from app.observability.metrics import (
+    SMS_MESSAGES_TOTAL,
+    SMS_QUEUE_DEPTH,
+    SMS_RATE_WAIT_SECONDS,
+    SMS_SEND_SECONDS,
+)
 
 if typing.TYPE_CHECKING:
     # Solo para type-checkers; NO se ejecuta en runtime
     from app.services.notify.providers.colombiared_provider import ColombiaRedProvider
 
+log = logging.getLogger("sms")
+
+Message = Tuple[str, str]  # (to, body)
+
 
 class SmsProvider(Protocol):
+    name: str
+    max_batch: int
+
     def send_sms(self, to: str, body: str) -> None: ...
 
+    def send_bulk(self, messages: Iterable[Message]) -> None: ...
+
 
 @dataclass
 class ConsoleSmsProvider:
     """Proveedor para desarrollo: imprime en consola."""
+    name: str = "console"
+    max_batch: int = 1
+
     def send_sms(self, to: str, body: str) -> None:
         print(f"[SMS:DEV] to={to} | body={body}")
 
+    def send_bulk(self, messages: Iterable[Message]) -> None:
+        for to, body in messages:
+            self.send_sms(to, body)
+
+
+@dataclass
+class LocalSmsProvider:
+    """Stand-in para pruebas de carga: simula la latencia del gateway sin red."""
+    latency: float = 0.2
+    max_batch: int = 100
+    name: str = "local"
+    sent: int = 0
+    calls: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def send_sms(self, to: str, body: str) -> None:
+        time.sleep(self.latency)
+        with self._lock:
+            self.sent += 1
+            self.calls += 1
+
+    def send_bulk(self, messages: Iterable[Message]) -> None:
+        messages = list(messages)
+        for i in range(0, len(messages), self.max_batch):
+            time.sleep(self.latency)  # una llamada por lote
+            with self._lock:
+                self.sent += len(messages[i:i + self.max_batch])
+                self.calls += 1
+
 
 @dataclass
 class ColombiaRedAdapter:
     """Adaptador para cumplir la interfaz SmsProvider."""
     provider: "ColombiaRedProvider"
+    name: str = "colombiared"
+
+    @property
+    def max_batch(self) -> int:
+        return self.provider.max_batch
 
     def send_sms(self, to: str, body: str) -> None:
         self.provider.send_sms(to=to, body=body)
 
+    def send_bulk(self, messages: Iterable[Message]) -> None:
+        self.provider.send_bulk(messages)
+
 
 def _build_colombiared_provider() -> Optional[SmsProvider]:
     """
@@ -60,12 +139,7 @@ def _build_colombiared_provider() -> Optional[SmsProvider]:
     return ColombiaRedAdapter(provider=provider)
 
 
-def get_sms_provider() -> SmsProvider:
-    """
-    Control por variable de entorno SMS_PROVIDER:
-      - 'colombiared' => intenta proveedor real; si falla, cae a consola.
-      - 'console' (default) => imprime en consola.
-    """
+def _build_provider() -> SmsProvider:
     chosen = (os.getenv("SMS_PROVIDER") or "console").lower()
     if chosen == "colombiared":
         p = _build_colombiared_provider()
@@ -73,5 +147,204 @@ def get_sms_provider() -> SmsProvider:
             return p
         print("[SMS] Fallback a ConsoleSmsProvider.")
         return ConsoleSmsProvider()
-
+    if chosen == "local":
+        return LocalSmsProvider(
+            latency=float(os.getenv("SMS_LOCAL_LATENCY_MS", "200")) / 1000.0,
+            max_batch=int(os.getenv("SMS_LOCAL_MAX_BATCH", "100")),
+        )
     return ConsoleSmsProvider()
+
+
+_provider: Optional[SmsProvider] = None
+_dispatcher: Optional["SmsDispatcher"] = None
+_lock = threading.Lock()
+
+
+def get_sms_provider() -> SmsProvider:
+    """
+    Control por variable de entorno SMS_PROVIDER (se lee una vez por proceso):
+      - 'colombiared' => intenta proveedor real; si falla, cae a consola.
+      - 'local'       => stand-in con latencia simulada (pruebas de carga).
+      - 'console' (default) => imprime en consola.
+    """
+    global _provider
+    if _provider is None:
+        with _lock:
+            if _provider is None:
+                _provider = _build_provider()
+    return _provider
+
+
+# -------------------------------------------------------------------
+#  Limitador de tasa
+# -------------------------------------------------------------------
+class RateLimiter:
+    """
+    Token bucket thread-safe. acquire(n) reserva n tokens y duerme lo que
+    falte: un lote de 100 con cuota 10/s espera ~10 s, sin adelantarse a
+    los que ya reservaron.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate or 1)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: int = 1) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= n
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        SMS_RATE_WAIT_SECONDS.observe(wait)
+        return wait
+
+
+def _limiter_from_env() -> RateLimiter:
+    # La cuota es del proveedor (cuenta entera): cada worker toma su parte
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    rate = float(os.getenv("SMS_RATE_PER_SEC", "10")) / workers
+    burst = float(os.getenv("SMS_RATE_BURST", "0")) / workers or None
+    return RateLimiter(rate, burst)
+
+
+# -------------------------------------------------------------------
+#  Despacho
+# -------------------------------------------------------------------
+class SmsDispatcher:
+    def __init__(self, provider: SmsProvider, limiter: RateLimiter, *,
+                 workers: int = 8, queue_max: int = 1000, batch_window: float = 0.05):
+        self.provider = provider
+        self.limiter = limiter
+        self.batch_window = max(0.0, batch_window)
+        self.queue: "queue.Queue[Message]" = queue.Queue(maxsize=max(1, queue_max))
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="sms")
+        # Lotes en vuelo acotados: el batcher no acumula trabajo sin límite en el pool
+        self._inflight = threading.BoundedSemaphore(max(1, workers) * 2)
+        self._batcher: Optional[threading.Thread] = None
+        self._batcher_lock = threading.Lock()
+
+    @property
+    def _label(self) -> str:
+        return getattr(self.provider, "name", type(self.provider).__name__)
+
+    def _call(self, messages: List[Message]) -> None:
+        kind = "bulk" if len(messages) > 1 else "single"
+        self.limiter.acquire(len(messages))
+        t0 = time.perf_counter()
+        try:
+            if kind == "bulk":
+                self.provider.send_bulk(messages)
+            else:
+                self.provider.send_sms(*messages[0])
+        except Exception:
+            SMS_SEND_SECONDS.labels(self._label, kind, "error").observe(time.perf_counter() - t0)
+            SMS_MESSAGES_TOTAL.labels(self._label, "failed").inc(len(messages))
+            raise
+        SMS_SEND_SECONDS.labels(self._label, kind, "ok").observe(time.perf_counter() - t0)
+        SMS_MESSAGES_TOTAL.labels(self._label, "sent").inc(len(messages))
+
+    def _chunks(self, messages: List[Message]) -> List[List[Message]]:
+        size = max(1, int(getattr(self.provider, "max_batch", 1) or 1))
+        return [messages[i:i + size] for i in range(0, len(messages), size)]
+
+    # ---------------- síncrono ----------------
+    def send(self, to: str, body: str) -> None:
+        self._call([(to, body)])
+
+    def send_many(self, messages: Iterable[Message]) -> dict:
+        """Lotes en paralelo; devuelve {sent, failed}. No levanta por fallos parciales."""
+        chunks = self._chunks(list(messages))
+        futures = [(c, self._pool.submit(self._call, c)) for c in chunks]
+        sent = failed = 0
+        for chunk, fut in futures:
+            try:
+                fut.result()
+                sent += len(chunk)
+            except Exception as e:
+                failed += len(chunk)
+                log.error("SMS: lote de %d falló: %s", len(chunk), e)
+        return {"sent": sent, "failed": failed}
+
+    # ---------------- asíncrono ----------------
+    def submit(self, to: str, body: str) -> bool:
+        """Encola; True si quedó en cola, False si se envió en el hilo actual (cola llena)."""
+        self._ensure_batcher()
+        try:
+            self.queue.put_nowait((to, body))
+        except queue.Full:
+            SMS_MESSAGES_TOTAL.labels(self._label, "inline").inc()
+            log.warning("SMS: cola llena; enviando a %s en el request", to)
+            self.send(to, body)
+            return False
+        SMS_QUEUE_DEPTH.inc()
+        return True
+
+    def _ensure_batcher(self) -> None:
+        if self._batcher is not None:
+            return
+        with self._batcher_lock:
+            if self._batcher is None:
+                self._batcher = threading.Thread(target=self._batch_loop, name="sms-batcher", daemon=True)
+                self._batcher.start()
+
+    def _run_chunk(self, chunk: List[Message]) -> None:
+        try:
+            self._call(chunk)
+        except Exception as e:
+            log.error("SMS: envío de %d mensaje(s) falló: %s", len(chunk), e)
+        finally:
+            self._inflight.release()
+
+    def _batch_loop(self) -> None:
+        max_batch = max(1, int(getattr(self.provider, "max_batch", 1) or 1))
+        while True:
+            batch = [self.queue.get()]
+            # Sin endpoint masivo no hay nada que juntar: cada SMS sale ya, en paralelo
+            deadline = time.monotonic() + (self.batch_window if max_batch > 1 else 0.0)
+            while len(batch) < max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            SMS_QUEUE_DEPTH.dec(len(batch))
+            for chunk in (self._chunks(batch) if max_batch > 1 else [[m] for m in batch]):
+                self._inflight.acquire()
+                self._pool.submit(self._run_chunk, chunk)
+
+
+def get_sms_dispatcher() -> SmsDispatcher:
+    global _dispatcher
+    provider = get_sms_provider()
+    if _dispatcher is None:
+        with _lock:
+            if _dispatcher is None:
+                _dispatcher = SmsDispatcher(
+                    provider,
+                    _limiter_from_env(),
+                    workers=int(os.getenv("SMS_WORKERS", "8")),
+                    queue_max=int(os.getenv("SMS_QUEUE_MAX", "1000")),
+                    batch_window=float(os.getenv("SMS_BATCH_WINDOW_MS", "50")) / 1000.0,
+                )
+    return _dispatcher
+
+
+def reset_sms_provider() -> None:
+    """Olvida proveedor y dispatcher (tras cambiar SMS_PROVIDER / credenciales)."""
+    global _provider, _dispatcher, _lock
+    _provider = None
+    _dispatcher = None
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    # Los hilos del dispatcher no existen en el hijo
+    os.register_at_fork(after_in_child=reset_sms_provider)
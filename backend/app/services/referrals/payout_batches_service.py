@@ -9,6 +9,7 @@ from typing import Any, Dict, List, Optional
 from flask import current_app
 from sqlalchemy import text
 from app.db.database import db
+from app.services.auth.profile_cache import get_user_role_id
 
 
 # ---------------------------
@@ -27,10 +28,7 @@ def _resolve_abs_path(storage_path: str) -> Path:
 
 
 def _is_admin(uid: int) -> bool:
-    role_id = db.session.execute(
-        text("SELECT role_id FROM public.users WHERE id = :uid"),
-        {"uid": uid},
-    ).scalar()
+    role_id = get_user_role_id(uid)
     try:
         return int(role_id or 0) == 1
     except Exception:
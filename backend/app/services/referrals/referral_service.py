@@ -3,9 +3,10 @@ from sqlalchemy import text
 from app.db.database import db  # tu SQLAlchemy()
 from datetime import datetime, timezone, timedelta
 from app.services.constants import ACTIVE_PAYOUT_REQUEST_STATUSES, HELD_COMMISSION_STATUSES
+from app.services.admin.referrals_service import invalidate_top_referrers_cache
 from sqlalchemy import text, bindparam 
 
-# PRO si tiene alguna suscripción PRO con fecha de vencimiento futura
+# PRO si su suscripción vigente (user_current_subscription, sql/007) es PRO y no ha vencido
 PRO_CONDITION = "s.entitlement = 'pro' AND s.expires_at > NOW()"
 
 # app/services/referrals/referral_service.py  (o donde esté)
@@ -23,15 +24,9 @@ def get_summary_for_user(user_id: int, hold_days: int = 3) -> dict:
         WITH base AS (
           SELECT r.id,
                  r.referred_user_id,
-                 EXISTS (
-  SELECT 1
-  FROM user_subscriptions s
-  WHERE s.user_id = r.referred_user_id
-    AND s.entitlement = 'pro'
-    AND s.expires_at > NOW()
-) AS pro_active
-
+                 COALESCE(ucs.entitlement = 'pro' AND ucs.expires_at > NOW(), FALSE) AS pro_active
           FROM referrals r
+          LEFT JOIN user_current_subscription ucs ON ucs.user_id = r.referred_user_id
           WHERE r.referrer_user_id = :uid
         ),
         counts AS (
@@ -129,14 +124,10 @@ def get_referrals_for_user(user_id: int, limit: int = 50, offset: int = 0) -> Li
           u.email  AS referred_email,
           r.status::text AS status,        -- enum -> text
           r.created_at,
-          EXISTS (
-            SELECT 1
-            FROM user_subscriptions s
-            WHERE s.user_id = r.referred_user_id
-              AND ({PRO_CONDITION})
-          ) AS pro_active
+          COALESCE({PRO_CONDITION}, FALSE) AS pro_active
         FROM referrals r
         LEFT JOIN users u ON u.id = r.referred_user_id
+        LEFT JOIN user_current_subscription s ON s.user_id = r.referred_user_id
         WHERE r.referrer_user_id = :uid
         ORDER BY r.created_at DESC NULLS LAST, r.id DESC
         LIMIT :limit OFFSET :offset;
@@ -183,6 +174,7 @@ def link_referral_on_signup(referral_code: str | None, new_user_id: int) -> None
     """)
     db.session.execute(sql, {"code": referral_code, "new_uid": new_user_id})
     db.session.commit()
+    invalidate_top_referrers_cache()
 
 # =======================
 #  COMISIONES (LEDGER)
@@ -6,6 +6,8 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy import text
 from datetime import datetime
 from sqlalchemy import text, func
+from app.services.admin.kpi_snapshot import request_refresh as request_kpi_refresh
+from app.services.admin.referrals_service import invalidate_top_referrers_cache
 
 def register_user(data):
     required = [
@@ -130,6 +132,9 @@ def register_user(data):
         # 6) Confirmar
         db.session.commit()
         db.session.refresh(user)
+        request_kpi_refresh()  # 📊 dashboard admin (usuarios / últimos registros)
+        if referral_code:
+            invalidate_top_referrers_cache()
 
         return {
             'ok': True,
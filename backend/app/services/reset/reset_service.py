@@ -7,6 +7,7 @@ from app.models.user import User
 from werkzeug.security import generate_password_hash
 from sqlalchemy import text
 from app.services.notify.mailer import send_html
+from app.services.notify.sms_sender import get_sms_dispatcher
 # Asumimos una tabla reset_tokens (ver SQL más abajo).
 # Campos: id, user_id, code, token, expires_at, used, created_at
 from flask import current_app  # 👈 lo usaremos para leer TTL desde config
@@ -36,6 +37,27 @@ def _send_email(to_email: str, subject: str, html_body: str):
     # TODO: integra con tu mailer real
     pass
 
+def _sms_number(phone: str | None) -> str | None:
+    """users.phone guarda solo dígitos; celulares viejos sin indicativo → DEFAULT_COUNTRY_CODE (57)."""
+    digits = ''.join(ch for ch in str(phone or '') if ch.isdigit())
+    if not digits:
+        return None
+    cc = (current_app.config.get('DEFAULT_COUNTRY_CODE') or '57').strip()
+    if len(digits) == 10:
+        digits = f"{cc}{digits}"
+    return f"+{digits}"
+
+def _send_sms(phone: str | None, body: str) -> None:
+    """Encola el SMS: el request no espera al proveedor y una ráfaga de resets sale en paralelo."""
+    to = _sms_number(phone)
+    if not to:
+        return
+    try:
+        get_sms_dispatcher().submit(to, body)
+    except Exception:
+        # El correo ya salió; un fallo del SMS no tumba la solicitud
+        current_app.logger.exception("No se pudo encolar el SMS de reset a %s", to)
+
 def request_password_reset_by_email(email: str) -> None:
     user: User | None = db.session.query(User).filter(User.email == email).first()
     if not user:
@@ -66,6 +88,9 @@ def request_password_reset_by_email(email: str) -> None:
     """
     _send_email(user.email, subject, html)
 
+    if current_app.config.get('RESET_SMS'):
+        _send_sms(user.phone, f"LuckyApp: tu código de restablecimiento es {code}. Expira en {ttl_code} min.")
+
 
 def verify_reset_code_by_email(email: str, code: str) -> str:
     user: User | None = db.session.query(User).filter(User.email == email).first()
@@ -1,10 +1,17 @@
 # app/subscriptions/google_play_client.py
-import os, json
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import os, json, threading
+# google.oauth2 / googleapiclient se importan dentro de build_android_publisher:
+# googleapiclient.discovery tarda ~75 ms y solo hace falta al hablar con Google Play
 
 SCOPES = ['https://www.googleapis.com/auth/androidpublisher']
 
+# Un solo cliente por proceso (construirlo desde el discovery cuesta decenas de ms).
+# httplib2.Http NO es thread-safe: cada hilo (o greenlet con gevent) usa su propio
+# Http con keep-alive, vía requestBuilder, como recomienda googleapiclient.
+_service = None
+_service_lock = threading.Lock()
+_local = threading.local()
+
 def _safe_log(event: str, **fields):
     """Log seguro: usa Flask logger si existe; si no, print."""
     payload = {"event": event, **fields}
@@ -15,12 +22,40 @@ def _safe_log(event: str, **fields):
         print(json.dumps(payload))
 
 def build_android_publisher():
+    """
+    Cliente de Google Play Android Publisher compartido por el proceso.
+    Seguro entre hilos: cada request HTTP sale por el Http del hilo actual.
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = _build_android_publisher()
+    return _service
+
+
+def _thread_http(creds):
+    import google_auth_httplib2
+    import httplib2
+
+    http = getattr(_local, "http", None)
+    if http is None:
+        timeout = float(os.environ.get('GOOGLE_HTTP_TIMEOUT', '20'))
+        http = _local.http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=timeout))
+    return http
+
+
+def _build_android_publisher():
     """
     Inicializa el cliente de Google Play Android Publisher.
     Lee credenciales desde:
       - GOOGLE_CREDENTIALS_JSON (contenido del JSON), o
       - GOOGLE_APPLICATION_CREDENTIALS (ruta a archivo .json)
     """
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+    from googleapiclient.http import HttpRequest
+
     info = None
     raw = os.environ.get('GOOGLE_CREDENTIALS_JSON')
 
@@ -56,5 +91,24 @@ def build_android_publisher():
     )
     # ------------------------------------
 
+    def _request_builder(_http, *args, **kwargs):
+        return HttpRequest(_thread_http(creds), *args, **kwargs)
+
     # cache_discovery=False evita warnings en algunos entornos
-    return build('androidpublisher', 'v3', credentials=creds, cache_discovery=False)
+    return build(
+        'androidpublisher', 'v3',
+        http=_thread_http(creds),
+        requestBuilder=_request_builder,
+        cache_discovery=False,
+    )
+
+
+def _reset_after_fork():
+    global _service, _service_lock, _local
+    _service = None
+    _service_lock = threading.Lock()
+    _local = threading.local()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
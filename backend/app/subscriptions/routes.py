@@ -4,9 +4,6 @@ from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_jwt_extended import get_jwt
 from app.subscriptions.service import reconcile_subscriptions
-# Verificación del token OIDC que envía Pub/Sub en push
-from google.oauth2 import id_token
-from google.auth.transport import requests as g_requests
 
 from app.subscriptions.service import (
     get_status,
@@ -122,21 +119,9 @@ def subscription_manual_grant():
     """
     Activación/renovación manual de PRO por un administrador (ej: pago por WhatsApp).
     """
-    from flask_jwt_extended import get_jwt
-    claims = get_jwt() or {}
-
-    # Lee rid / role_id del JWT
-    raw_role = claims.get("rid") or claims.get("role_id")
-
-    # 🔎 DEBUG opcional (puedes dejarlo un tiempo):
-    print("JWT claims en /manual-grant:", claims)
-    print("raw_role =", raw_role, "type =", type(raw_role))
-
-    # Normaliza a int (por si viene como string "1")
-    try:
-        role_id = int(raw_role) if raw_role is not None else None
-    except (TypeError, ValueError):
-        role_id = None
+    # Rol desde users.role_id (profile_cache), no del claim rid del token
+    from app.security.identity import current_role_id
+    role_id = current_role_id()
 
     # En TU app, el admin es role_id == 1
     if role_id != 1:
@@ -178,17 +163,12 @@ def subscription_manual_grant():
 def subscription_reconcile_one():
     """
     Reconciliar un purchaseToken específico (útil para soporte o pruebas).
-    Requiere JWT admin (rid / role_id == 1).
+    Requiere JWT de un admin (users.role_id == 1).
     """
     from app.observability.metrics import RECONCILE_UPD, RECONCILE_ERR
-    from flask_jwt_extended import get_jwt
+    from app.security.identity import current_role_id
 
-    claims = get_jwt() or {}
-    raw_role = claims.get("rid") or claims.get("role_id")
-    try:
-        role_id_int = int(raw_role) if raw_role is not None else None
-    except (TypeError, ValueError):
-        role_id_int = None
+    role_id_int = current_role_id()
 
     if role_id_int != 1:
         return jsonify({"ok": False, "code": "UNAUTHORIZED"}), 401
@@ -225,6 +205,9 @@ def rtdn_push():
     auth_hdr = request.headers.get("Authorization", "")
     if expected_aud and auth_hdr.startswith("Bearer "):
         _token = auth_hdr.split(" ", 1)[1]
+        # Verificación del token OIDC que envía Pub/Sub en push (import diferido)
+        from google.oauth2 import id_token
+        from google.auth.transport import requests as g_requests
         try:
             claims = id_token.verify_oauth2_token(
                 _token,
@@ -1,18 +1,21 @@
 # app/subscriptions/service.py
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional, Dict, Any
+import time
 
 from app.db.database import db
 from app.subscriptions.models import UserSubscription
 from app.subscriptions.google_play_client import build_android_publisher
 import os
-from googleapiclient.errors import HttpError
 from sqlalchemy import or_
 from datetime import datetime, timezone, timedelta
 from app.services.referrals.referral_service import register_referral_commission
 import json
 from flask import current_app
 from sqlalchemy import text
+from app.services.admin.kpi_snapshot import request_refresh as request_kpi_refresh
+from app.services.admin.referrals_service import invalidate_top_referrers_cache
 from app.observability.metrics import (
     SUBS_SYNC_OK, SUBS_SYNC_ERR,
     RTDN_RCVD, RTDN_ERR,
@@ -20,16 +23,14 @@ from app.observability.metrics import (
 )
 
 _STATUS_CACHE = {}
-_STATUS_CACHE_LOADED_AT = None
+_STATUS_CACHE_EXPIRES = 0.0  # time.monotonic() en que vence la caché
 _STATUS_CACHE_TTL_MIN = 10
 
 def _load_status_catalog(force: bool = False):
     """Carga subscription_status_catalog en caché (clave -> dict con label_es y grant_access)."""
-    from datetime import timedelta
-    global _STATUS_CACHE, _STATUS_CACHE_LOADED_AT
+    global _STATUS_CACHE, _STATUS_CACHE_EXPIRES
 
-    now = _now_utc()
-    if not force and _STATUS_CACHE_LOADED_AT and (now - _STATUS_CACHE_LOADED_AT) < timedelta(minutes=_STATUS_CACHE_TTL_MIN):
+    if not force and time.monotonic() < _STATUS_CACHE_EXPIRES:
         return
 
     rows = db.session.execute(text("""
@@ -43,13 +44,19 @@ def _load_status_catalog(force: bool = False):
         if key:
             cache[key] = {"label_es": label_es, "grant_access": bool(grant_access)}
 
+    # Reemplazo atómico: los lectores ven el snapshot viejo o el nuevo, nunca a medias
     _STATUS_CACHE = cache
-    _STATUS_CACHE_LOADED_AT = now
+    _STATUS_CACHE_EXPIRES = time.monotonic() + _STATUS_CACHE_TTL_MIN * 60
 
 def _catalog_get(key: str) -> dict:
     _load_status_catalog()
     return _STATUS_CACHE.get((key or "").strip().lower(), {"label_es": key or "none", "grant_access": False})
 
+def _status_label(key: str) -> str:
+    """Etiqueta desde el último snapshot del catálogo (get_status lo carga), sin tocar la BD (usado por to_json)."""
+    entry = _STATUS_CACHE.get((key or "").strip().lower())
+    return entry["label_es"] if entry else (key or "none")
+
 def _map_gp_state_to_key(subscription_state: str, auto_renewing: Optional[bool]) -> str:
     """Normaliza estado de Google → clave interna del catálogo."""
     s = (subscription_state or "").upper()
@@ -142,7 +149,7 @@ class SubscriptionStatus:
             "reason": self.reason,
             "since": self.since,
             "autoRenewing": self.auto_renewing,
-            "statusLabel": _catalog_get(self.status)["label_es"],
+            "statusLabel": _status_label(self.status),
             "plan": self.plan,
             "maxDigits": self.max_digits,
             "isTrial": self.is_trial,
@@ -191,13 +198,21 @@ def _parse_gp_time(v) -> Optional[datetime]:
             # Heurística: > 1e12 => milisegundos
             return datetime.fromtimestamp(iv / 1000.0 if iv > 1_000_000_000_000 else iv, tz=timezone.utc)
         if isinstance(v, str):
-            s = v.strip()
-            if s.isdigit():
-                iv = int(s)
-                return datetime.fromtimestamp(iv / 1000.0 if iv > 1_000_000_000_000 else iv, tz=timezone.utc)
-            # RFC3339 -> ISO compatible
-            s = s.replace('Z', '+00:00')
-            return datetime.fromisoformat(s).astimezone(timezone.utc)
+            return _parse_gp_str(v)
+    except Exception:
+        return None
+
+@lru_cache(maxsize=1024)
+def _parse_gp_str(v: str) -> Optional[datetime]:
+    # Los mismos startTime / expiryTime llegan en cada sync / RTDN / reconcile
+    try:
+        s = v.strip()
+        if s.isdigit():
+            iv = int(s)
+            return datetime.fromtimestamp(iv / 1000.0 if iv > 1_000_000_000_000 else iv, tz=timezone.utc)
+        # RFC3339 -> ISO compatible
+        s = s.replace('Z', '+00:00')
+        return datetime.fromisoformat(s).astimezone(timezone.utc)
     except Exception:
         return None
 
@@ -262,60 +277,66 @@ def _pick_line_item(line_items: list[dict]) -> dict:
     # Fallback extremo
     return items[0]
 
+# Precios por defecto (COP en micros: 1 COP = 1_000_000 micros).
+# También lo usa el dashboard admin para estimar ventas por mes (kpi_snapshot).
+_PRICE_CATALOG = {
+    # Pruebas gratuitas por cifras (precio 0, sin comisión)
+    "cm_prueba_2":     (0, "COP"),
+    "cm_prueba_3":     (0, "COP"),
+    "cm_prueba_4":     (0, "COP"),
+    "cm_prueba_5":     (0, "COP"),
+    "cm_prueba":       (0, "COP"),  # legacy
+    # Planes de pago
+    "cms_suscripcion": (10_000_000_000,  "COP"),
+    "cml_suscripcion": (20_000_000_000,  "COP"),
+    "cm_suscripcion":  (60_000_000_000,  "COP"),
+    "cmu_suscripcion": (100_000_000_000, "COP"),
+}
+
+# Plan / cifras por prefijo de product_id (espejo: fn_plan_from_product en SQL)
+_PLAN_BY_PREFIX = {
+    # Pruebas gratuitas por cifra específica
+    "cm_prueba_5":     ("ultra",   5),
+    "cm_prueba_4":     ("full",    4),
+    "cm_prueba_3":     ("basic",   3),
+    "cm_prueba_2":     ("starter", 2),
+    "cm_prueba":       ("ultra",   5),  # legacy
+    # Planes de pago
+    "cmu_suscripcion": ("ultra",   5),
+    "cm_suscripcion":  ("full",    4),
+    "cml_suscripcion": ("basic",   3),
+    "cms_suscripcion": ("starter", 2),
+}
+
+# Tablas precompiladas, prefijo más largo primero (cm_prueba_5 antes que cm_prueba)
+_PLAN_PREFIXES = tuple(sorted(_PLAN_BY_PREFIX.items(), key=lambda kv: -len(kv[0])))
+_PRICE_PREFIXES = tuple(sorted(_PRICE_CATALOG.items(), key=lambda kv: -len(kv[0])))
+_TRIAL_PREFIX = "cm_prueba"
+
+@lru_cache(maxsize=512)
+def _product_info(pid: str) -> tuple:
+    """(plan, max_digits, (micros, moneda) | None, is_trial) para un product_id ya normalizado."""
+    plan, max_digits = next((v for k, v in _PLAN_PREFIXES if pid.startswith(k)), ("none", None))
+    price = _PRICE_CATALOG.get(pid) or next((v for k, v in _PRICE_PREFIXES if pid.startswith(k)), None)
+    return plan, max_digits, price, pid.startswith(_TRIAL_PREFIX)
+
 def _price_from_catalog(product_id: str, default_currency: str = "COP") -> tuple[int, str]:
     """
     Precios por defecto para cuando NO tenemos info real de Google.
     (COP en micros: 1 COP = 1_000_000 micros)
+    Match exacto o por prefijo (por si llega algo como "cmu_suscripcion:ultra-mensual").
     """
-    CATALOG = {
-        # Pruebas gratuitas por cifras (precio 0, sin comisión)
-        "cm_prueba_2":     (0, "COP"),
-        "cm_prueba_3":     (0, "COP"),
-        "cm_prueba_4":     (0, "COP"),
-        "cm_prueba_5":     (0, "COP"),
-        "cm_prueba":       (0, "COP"),  # legacy
-        # Planes de pago
-        "cms_suscripcion": (10_000_000_000,  "COP"),
-        "cml_suscripcion": (20_000_000_000,  "COP"),
-        "cm_suscripcion":  (60_000_000_000,  "COP"),
-        "cmu_suscripcion": (100_000_000_000, "COP"),
-    }
-
-    pid = (product_id or "").strip()
-
-    # match exacto
-    if pid in CATALOG:
-        return CATALOG[pid]
-
-    # match por prefijo (por si llega algo como "cmu_suscripcion:ultra-mensual")
-    for k, v in CATALOG.items():
-        if pid.startswith(k):
-            return v
-
-    return (0, default_currency)
+    price = _product_info((product_id or "").strip())[2]
+    return price if price is not None else (0, default_currency)
 
 
 def _is_trial_product(product_id: str) -> bool:
-    return (product_id or "").strip().startswith("cm_prueba")
+    return _product_info((product_id or "").strip())[3]
 
 def _infer_plan_from_product_id(product_id: str) -> tuple[str, Optional[int]]:
     """Devuelve (plan, max_digits) según el product_id."""
-    pid = (product_id or "").strip()
-
-    # Pruebas gratuitas por cifra específica
-    if pid.startswith("cm_prueba_5"): return "ultra",   5
-    if pid.startswith("cm_prueba_4"): return "full",    4
-    if pid.startswith("cm_prueba_3"): return "basic",   3
-    if pid.startswith("cm_prueba_2"): return "starter", 2
-    if pid.startswith("cm_prueba"):   return "ultra",   5  # legacy
-
-    # Planes de pago
-    if pid.startswith("cmu_suscripcion"): return "ultra",   5
-    if pid.startswith("cm_suscripcion"):  return "full",    4
-    if pid.startswith("cml_suscripcion"): return "basic",   3
-    if pid.startswith("cms_suscripcion"): return "starter", 2
-
-    return "none", None
+    plan, max_digits, _price, _trial = _product_info((product_id or "").strip())
+    return plan, max_digits
 
 def expire_all_stale() -> int:
     """
@@ -339,6 +360,10 @@ def expire_all_stale() -> int:
 
 
 def get_status(user_id: Optional[int]) -> SubscriptionStatus:
+    # Snapshot del catálogo al día antes de armar el estado: to_json() lee las
+    # etiquetas de ahí sin tocar la BD, también en los retornos tempranos
+    _load_status_catalog()
+
     if not user_id:
         return SubscriptionStatus(
             user_id=None,
@@ -560,6 +585,8 @@ def manual_grant_pro(
 
     db.session.add(sub)
     db.session.commit()
+    request_kpi_refresh()  # 📊 ventas del dashboard admin
+    invalidate_top_referrers_cache()  # PRO/FREE y referidos activos del top
 
     # Opcional: maturar comisiones después de un pago manual (igual que en sync_purchase)
     try:
@@ -615,6 +642,7 @@ def sync_purchase(
     _log_event("subs_sync_start", user_id=user_id, product_id=product_id)
     # cliente Android Publisher con el service account (lee GOOGLE_CREDENTIALS_JSON)
     service = build_android_publisher()
+    from googleapiclient.errors import HttpError  # ya cargado por build_android_publisher
 
     # Suscripciones modernas: SubscriptionsV2
     try:
@@ -722,6 +750,8 @@ def sync_purchase(
     db.session.add(sub)
     db.session.commit()
     _log_event("subs_sync_ok", user_id=user_id, product_id=product_id, status=status_str, expires_at=expiry_dt.isoformat())
+    request_kpi_refresh()  # 📊 ventas / ingresos del dashboard admin
+    invalidate_top_referrers_cache()  # PRO/FREE y referidos activos del top
 
     try:
         from app.services.referrals.payouts_service import mature_commissions
@@ -5,6 +5,8 @@ from decimal import Decimal
 from sqlalchemy import text
 from app.db.database import db
 from app.subscriptions.models import UserSubscription
+from app.services.admin.kpi_snapshot import request_refresh as request_kpi_refresh
+from app.services.admin.referrals_service import invalidate_top_referrers_cache
 import os, re, json, hmac, hashlib
 
 webhooks_bp = Blueprint(
@@ -282,6 +284,8 @@ def revenuecat_webhook():
     _maybe_award_referral_bonus(user_id, event, event_type)
 
     db.session.commit()
+    request_kpi_refresh()  # 📊 ventas / ingresos del dashboard admin
+    invalidate_top_referrers_cache()  # PRO/FREE y referidos activos del top
 
     return jsonify({
         "ok": True,
@@ -1,7 +1,62 @@
 # backend/gunicorn.conf.py
 import os
+import shutil
 
 bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"  # Railway inyecta PORT
 workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
-timeout = 120
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
 loglevel = "debug"
+
+# =========================
+# Modelo de concurrencia (GUNICORN_WORKER_CLASS)
+# =========================
+# - gthread (default): GUNICORN_THREADS hilos por worker. Un request esperando a
+#   Google / Resend / FCM ocupa un hilo, no el worker entero. Sin dependencias extra.
+# - gevent: miles de requests por worker con greenlets (GUNICORN_WORKER_CONNECTIONS).
+#   requests / httplib2 ceden al esperar red; psycopg2 también gracias a psycogreen
+#   (ver post_fork). La concurrencia contra la BD sigue acotada por el pool
+#   (DB_POOL_SIZE + DB_MAX_OVERFLOW): los greenlets que sobran esperan turno.
+# - sync: un request a la vez por worker (comportamiento anterior).
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread').strip().lower()
+# Solo gthread: con threads > 1 gunicorn convierte "sync" en gthread por su cuenta
+threads = int(os.environ.get('GUNICORN_THREADS', '8')) if worker_class == "gthread" else 1
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '200'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+
+# Pool de las sesiones HTTP salientes (app/services/http_session.py): tantas
+# conexiones como requests simultáneos pueda tener el worker, con tope en gevent.
+_concurrency = {"gthread": threads, "gevent": min(worker_connections, 50)}.get(worker_class, 1)
+os.environ.setdefault("HTTP_POOL_MAXSIZE", str(max(_concurrency, 2)))
+
+# Métricas Prometheus multiproceso: cada worker escribe en este directorio y
+# /metrics agrega todos (app/observability/metrics.py).
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc"
+)
+
+
+def on_starting(server):
+    # Limpia archivos de un arranque anterior (contadores viejos)
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    server.log.info("workers=%s worker_class=%s threads=%s worker_connections=%s http_pool=%s",
+                    workers, worker_class, threads, worker_connections, os.environ["HTTP_POOL_MAXSIZE"])
+
+
+def post_fork(server, worker):
+    if worker_class != "gevent":
+        return
+    # psycopg2 bloquea el hilo en cada query; psycogreen le pone un wait callback
+    # que espera el socket con gevent. Antes de cualquier conexión (create_app no
+    # toca la BD).
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        server.log.warning("gevent sin psycogreen: cada query a Postgres bloquea el worker entero")
+        return
+    patch_psycopg()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,122 @@
+-- backend/sql/001_notification_counters.sql
+-- 🔔 Contador de no leídas por usuario (badge) mantenido por triggers.
+--    Evita el COUNT(*) sobre todo el historial de notificaciones del usuario.
+--    Se usan triggers de sentencia con transition tables porque los inserts
+--    masivos (INSERT ... SELECT al cerrar un juego / pagar un lote) meten
+--    muchas filas de una vez: se agrega por user_id una sola vez por sentencia.
+
+CREATE TABLE IF NOT EXISTS public.notification_counters (
+    user_id      INTEGER     PRIMARY KEY,
+    unread_count INTEGER     NOT NULL DEFAULT 0 CHECK (unread_count >= 0),
+    last_id      BIGINT      NOT NULL DEFAULT 0,
+    updated_at   TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- ---------- INSERT: suma las nuevas no leídas y avanza last_id ----------
+CREATE OR REPLACE FUNCTION public.fn_notification_counters_ins()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO public.notification_counters AS c (user_id, unread_count, last_id, updated_at)
+    SELECT n.user_id,
+           COUNT(*) FILTER (WHERE n.read_at IS NULL),
+           MAX(n.id),
+           now()
+      FROM new_rows n
+     WHERE n.user_id IS NOT NULL
+     GROUP BY n.user_id
+    ON CONFLICT (user_id) DO UPDATE
+       SET unread_count = c.unread_count + EXCLUDED.unread_count,
+           last_id      = GREATEST(c.last_id, EXCLUDED.last_id),
+           updated_at   = now();
+    RETURN NULL;
+END $$;
+
+-- ---------- UPDATE: delta por cambio de read_at (leída / no leída) ----------
+CREATE OR REPLACE FUNCTION public.fn_notification_counters_upd()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    WITH delta AS (
+        SELECT n.user_id,
+               SUM(
+                   CASE
+                       WHEN o.read_at IS NULL AND n.read_at IS NOT NULL THEN -1
+                       WHEN o.read_at IS NOT NULL AND n.read_at IS NULL THEN 1
+                       ELSE 0
+                   END
+               ) AS d
+          FROM new_rows n
+          JOIN old_rows o ON o.id = n.id
+         WHERE n.user_id IS NOT NULL
+         GROUP BY n.user_id
+    )
+    UPDATE public.notification_counters c
+       SET unread_count = GREATEST(c.unread_count + delta.d, 0),
+           updated_at   = now()
+      FROM delta
+     WHERE c.user_id = delta.user_id
+       AND delta.d <> 0;
+    RETURN NULL;
+END $$;
+
+-- ---------- DELETE: descuenta las no leídas borradas ----------
+CREATE OR REPLACE FUNCTION public.fn_notification_counters_del()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    WITH delta AS (
+        SELECT o.user_id, COUNT(*) AS d
+          FROM old_rows o
+         WHERE o.user_id IS NOT NULL
+           AND o.read_at IS NULL
+         GROUP BY o.user_id
+    )
+    UPDATE public.notification_counters c
+       SET unread_count = GREATEST(c.unread_count - delta.d, 0),
+           updated_at   = now()
+      FROM delta
+     WHERE c.user_id = delta.user_id;
+    RETURN NULL;
+END $$;
+
+-- Postgres no permite transition tables con varios eventos ni con lista de
+-- columnas, por eso son tres triggers separados.
+DROP TRIGGER IF EXISTS trg_notification_counters_ins ON public.notifications;
+CREATE TRIGGER trg_notification_counters_ins
+    AFTER INSERT ON public.notifications
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.fn_notification_counters_ins();
+
+DROP TRIGGER IF EXISTS trg_notification_counters_upd ON public.notifications;
+CREATE TRIGGER trg_notification_counters_upd
+    AFTER UPDATE ON public.notifications
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.fn_notification_counters_upd();
+
+DROP TRIGGER IF EXISTS trg_notification_counters_del ON public.notifications;
+CREATE TRIGGER trg_notification_counters_del
+    AFTER DELETE ON public.notifications
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.fn_notification_counters_del();
+
+-- ---------- Backfill inicial (idempotente) ----------
+INSERT INTO public.notification_counters (user_id, unread_count, last_id, updated_at)
+SELECT user_id,
+       COUNT(*) FILTER (WHERE read_at IS NULL),
+       MAX(id),
+       now()
+  FROM public.notifications
+ WHERE user_id IS NOT NULL
+ GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE
+   SET unread_count = EXCLUDED.unread_count,
+       last_id      = EXCLUDED.last_id,
+       updated_at   = now();
+
+-- Índice para el cursor since_id (id > :since_id por usuario)
+CREATE INDEX IF NOT EXISTS ix_notifications_user_id_id
+    ON public.notifications (user_id, id);
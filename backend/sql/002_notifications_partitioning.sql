@@ -0,0 +1,124 @@
+-- backend/sql/002_notifications_partitioning.sql
+-- 🗂️ public.notifications particionada por mes (RANGE sobre created_at).
+--    Requiere 001_notification_counters.sql aplicado antes.
+--
+--    - Una partición por mes: public.notifications_YYYYMM
+--    - public.notifications_default: recibe filas fuera de rango y las
+--      notificaciones retenidas (you_won sin leer) de meses ya archivados.
+--    - La retención (detach + archivo) la hace el job de
+--      app/services/notify/notifications_retention.py
+--
+--    La tabla original queda como public.notifications_legacy; bórrala a mano
+--    cuando verifiques la migración.
+
+BEGIN;
+
+-- ---------- Helper: crea (si falta) la partición del mes dado ----------
+CREATE OR REPLACE FUNCTION public.fn_notifications_ensure_partition(p_month DATE)
+RETURNS TEXT
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_from DATE := date_trunc('month', p_month)::date;
+    v_to   DATE := (date_trunc('month', p_month) + interval '1 month')::date;
+    v_name TEXT := 'notifications_' || to_char(v_from, 'YYYYMM');
+BEGIN
+    IF to_regclass('public.' || v_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE public.%I PARTITION OF public.notifications
+                 FOR VALUES FROM (%L) TO (%L)',
+            v_name, v_from, v_to
+        );
+    END IF;
+    RETURN v_name;
+END $$;
+
+-- ---------- 1) Renombrar la tabla actual ----------
+ALTER TABLE public.notifications RENAME TO notifications_legacy;
+
+-- Los índices conservan su nombre al renombrar la tabla: liberar los que se
+-- recrean en el paso 5 (si no, CREATE INDEX IF NOT EXISTS los salta en silencio)
+ALTER INDEX IF EXISTS public.ix_notifications_user_id_id    RENAME TO ix_notifications_legacy_user_id_id;
+ALTER INDEX IF EXISTS public.ix_notifications_user_created  RENAME TO ix_notifications_legacy_user_created;
+ALTER INDEX IF EXISTS public.ix_notifications_user_unread   RENAME TO ix_notifications_legacy_user_unread;
+
+DROP TRIGGER IF EXISTS trg_notification_counters_ins ON public.notifications_legacy;
+DROP TRIGGER IF EXISTS trg_notification_counters_upd ON public.notifications_legacy;
+DROP TRIGGER IF EXISTS trg_notification_counters_del ON public.notifications_legacy;
+
+-- ---------- 2) Nueva tabla particionada con las mismas columnas ----------
+CREATE TABLE public.notifications (
+    LIKE public.notifications_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+) PARTITION BY RANGE (created_at);
+
+UPDATE public.notifications_legacy SET created_at = now() WHERE created_at IS NULL;
+ALTER TABLE public.notifications ALTER COLUMN created_at SET DEFAULT now();
+ALTER TABLE public.notifications ALTER COLUMN created_at SET NOT NULL;
+
+-- La PK de una tabla particionada debe incluir la llave de partición
+ALTER TABLE public.notifications ADD PRIMARY KEY (id, created_at);
+
+-- La secuencia del id (serial) pasa a pertenecer a la nueva tabla
+DO $$
+DECLARE
+    v_seq TEXT := pg_get_serial_sequence('public.notifications_legacy', 'id');
+BEGIN
+    IF v_seq IS NOT NULL THEN
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY public.notifications.id', v_seq);
+    END IF;
+END $$;
+
+CREATE TABLE public.notifications_default
+    PARTITION OF public.notifications DEFAULT;
+
+-- ---------- 3) Particiones desde el mes más viejo hasta 2 meses adelante ----------
+DO $$
+DECLARE
+    v_month DATE;
+    v_last  DATE := (date_trunc('month', now()) + interval '2 months')::date;
+BEGIN
+    SELECT date_trunc('month', COALESCE(MIN(created_at), now()))::date
+      INTO v_month
+      FROM public.notifications_legacy;
+
+    WHILE v_month <= v_last LOOP
+        PERFORM public.fn_notifications_ensure_partition(v_month);
+        v_month := (v_month + interval '1 month')::date;
+    END LOOP;
+END $$;
+
+-- ---------- 4) Copiar datos (sin triggers de contador todavía) ----------
+INSERT INTO public.notifications
+SELECT * FROM public.notifications_legacy;
+
+-- ---------- 5) Índices (se propagan a cada partición) ----------
+-- Sin IF NOT EXISTS: si el nombre sigue ocupado debe fallar, no saltarse
+CREATE INDEX ix_notifications_user_id_id
+    ON public.notifications (user_id, id);
+CREATE INDEX ix_notifications_user_created
+    ON public.notifications (user_id, created_at DESC);
+CREATE INDEX ix_notifications_user_unread
+    ON public.notifications (user_id) WHERE read_at IS NULL;
+
+-- ---------- 6) Triggers del contador sobre la tabla particionada ----------
+CREATE TRIGGER trg_notification_counters_ins
+    AFTER INSERT ON public.notifications
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.fn_notification_counters_ins();
+
+CREATE TRIGGER trg_notification_counters_upd
+    AFTER UPDATE ON public.notifications
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.fn_notification_counters_upd();
+
+CREATE TRIGGER trg_notification_counters_del
+    AFTER DELETE ON public.notifications
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.fn_notification_counters_del();
+
+-- Esquema donde quedan las particiones archivadas (modo 'archive')
+CREATE SCHEMA IF NOT EXISTS notifications_archive;
+
+COMMIT;
@@ -0,0 +1,27 @@
+-- backend/sql/003_admin_search.sql
+-- 🔎 Búsqueda del panel admin (juegos / jugadores).
+--    - Texto  → índices trigram (pg_trgm) para ILIKE '%q%'
+--    - Número → búsquedas exactas por id / número (btree)
+--    Ver app/services/admin/search.py
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Texto
+CREATE INDEX IF NOT EXISTS ix_lotteries_name_trgm
+    ON public.lotteries USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_games_lottery_name_trgm
+    ON public.games USING gin (lottery_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_users_name_trgm
+    ON public.users USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_users_public_code_trgm
+    ON public.users USING gin (public_code gin_trgm_ops);
+
+-- Numérico / joins de la búsqueda
+CREATE INDEX IF NOT EXISTS ix_games_lottery_id
+    ON public.games (lottery_id);
+CREATE INDEX IF NOT EXISTS ix_game_numbers_number
+    ON public.game_numbers (number) WHERE taken_by IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_game_numbers_taken_by_game
+    ON public.game_numbers (taken_by, game_id);
+CREATE INDEX IF NOT EXISTS ix_game_numbers_game_taken_by
+    ON public.game_numbers (game_id, taken_by);
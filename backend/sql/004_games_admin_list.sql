@@ -0,0 +1,201 @@
+-- backend/sql/004_games_admin_list.sql
+-- 🎲 Listado admin de juegos en tiempo constante:
+--    - game_players mantenido por triggers sobre game_numbers: una fila por
+--      (juego, jugador) con cuántos números tiene. El listado cuenta jugadores
+--      ahí solo para los juegos de la página (LATERAL, acotado por per_page).
+--      Los triggers NO tocan la fila de games: un commit de números no bloquea
+--      el juego abierto para los demás commits concurrentes.
+--    - índice de expresión sobre la hora efectiva del juego + id (keyset)
+--    - total de juegos desde table_counters (sin COUNT(*) sobre games)
+--    Ver app/services/admin/games_service.py (list_games)
+
+-- ---------- Columnas / tablas ----------
+-- Versión anterior: contador en games (bloqueaba la fila del juego en cada commit)
+ALTER TABLE public.games
+    DROP COLUMN IF EXISTS players_count;
+
+CREATE TABLE IF NOT EXISTS public.game_players (
+    game_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    numbers INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (game_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS public.table_counters (
+    name       TEXT        PRIMARY KEY,
+    value      BIGINT      NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- ---------- game_numbers → game_players ----------
+-- Suma números por (juego, jugador); solo toca las filas de esos jugadores.
+CREATE OR REPLACE FUNCTION public.fn_game_players_add(p_rows JSONB)
+RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO public.game_players AS gp (game_id, user_id, numbers)
+    SELECT (r->>'game_id')::int,
+           (r->>'user_id')::int,
+           (r->>'n')::int
+      FROM jsonb_array_elements(p_rows) r
+    ON CONFLICT (game_id, user_id) DO UPDATE
+       SET numbers = gp.numbers + EXCLUDED.numbers;
+END $$;
+
+-- Resta números; si el jugador queda en 0, se borra (deja de contar como jugador).
+-- (Dos sentencias: el DELETE debe ver el UPDATE ya aplicado.)
+CREATE OR REPLACE FUNCTION public.fn_game_players_sub(p_rows JSONB)
+RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE public.game_players gp
+       SET numbers = gp.numbers - agg.n
+      FROM (
+            SELECT (r->>'game_id')::int AS game_id,
+                   (r->>'user_id')::int AS user_id,
+                   (r->>'n')::int       AS n
+              FROM jsonb_array_elements(p_rows) r
+           ) agg
+     WHERE gp.game_id = agg.game_id
+       AND gp.user_id = agg.user_id;
+
+    DELETE FROM public.game_players gp
+     USING (
+            SELECT (r->>'game_id')::int AS game_id,
+                   (r->>'user_id')::int AS user_id
+              FROM jsonb_array_elements(p_rows) r
+           ) agg
+     WHERE gp.game_id = agg.game_id
+       AND gp.user_id = agg.user_id
+       AND gp.numbers <= 0;
+END $$;
+
+CREATE OR REPLACE FUNCTION public.fn_game_numbers_players_ins()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.fn_game_players_add(COALESCE((
+        SELECT jsonb_agg(jsonb_build_object('game_id', game_id, 'user_id', taken_by, 'n', n))
+          FROM (SELECT game_id, taken_by, COUNT(*) AS n
+                  FROM new_rows WHERE taken_by IS NOT NULL
+                 GROUP BY game_id, taken_by) t
+    ), '[]'::jsonb));
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION public.fn_game_numbers_players_del()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.fn_game_players_sub(COALESCE((
+        SELECT jsonb_agg(jsonb_build_object('game_id', game_id, 'user_id', taken_by, 'n', n))
+          FROM (SELECT game_id, taken_by, COUNT(*) AS n
+                  FROM old_rows WHERE taken_by IS NOT NULL
+                 GROUP BY game_id, taken_by) t
+    ), '[]'::jsonb));
+    RETURN NULL;
+END $$;
+
+-- UPDATE: solo cuentan las filas que cambian de jugador o de juego
+CREATE OR REPLACE FUNCTION public.fn_game_numbers_players_upd()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM public.fn_game_players_sub(COALESCE((
+        SELECT jsonb_agg(jsonb_build_object('game_id', game_id, 'user_id', taken_by, 'n', n))
+          FROM (SELECT o.game_id, o.taken_by, COUNT(*) AS n
+                  FROM old_rows o JOIN new_rows n ON n.id = o.id
+                 WHERE o.taken_by IS NOT NULL
+                   AND (o.taken_by IS DISTINCT FROM n.taken_by OR o.game_id <> n.game_id)
+                 GROUP BY o.game_id, o.taken_by) t
+    ), '[]'::jsonb));
+    PERFORM public.fn_game_players_add(COALESCE((
+        SELECT jsonb_agg(jsonb_build_object('game_id', game_id, 'user_id', taken_by, 'n', n))
+          FROM (SELECT n.game_id, n.taken_by, COUNT(*) AS n
+                  FROM new_rows n JOIN old_rows o ON o.id = n.id
+                 WHERE n.taken_by IS NOT NULL
+                   AND (o.taken_by IS DISTINCT FROM n.taken_by OR o.game_id <> n.game_id)
+                 GROUP BY n.game_id, n.taken_by) t
+    ), '[]'::jsonb));
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_game_numbers_players_ins ON public.game_numbers;
+CREATE TRIGGER trg_game_numbers_players_ins
+    AFTER INSERT ON public.game_numbers
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.fn_game_numbers_players_ins();
+
+DROP TRIGGER IF EXISTS trg_game_numbers_players_upd ON public.game_numbers;
+CREATE TRIGGER trg_game_numbers_players_upd
+    AFTER UPDATE ON public.game_numbers
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.fn_game_numbers_players_upd();
+
+DROP TRIGGER IF EXISTS trg_game_numbers_players_del ON public.game_numbers;
+CREATE TRIGGER trg_game_numbers_players_del
+    AFTER DELETE ON public.game_numbers
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.fn_game_numbers_players_del();
+
+-- ---------- games → table_counters('games') ----------
+CREATE OR REPLACE FUNCTION public.fn_games_counter()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_delta BIGINT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT COUNT(*) INTO v_delta FROM new_rows;
+    ELSE
+        SELECT -COUNT(*) INTO v_delta FROM old_rows;
+    END IF;
+
+    INSERT INTO public.table_counters AS c (name, value, updated_at)
+    VALUES ('games', v_delta, now())
+    ON CONFLICT (name) DO UPDATE
+       SET value = c.value + EXCLUDED.value,
+           updated_at = now();
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_games_counter_ins ON public.games;
+CREATE TRIGGER trg_games_counter_ins
+    AFTER INSERT ON public.games
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.fn_games_counter();
+
+DROP TRIGGER IF EXISTS trg_games_counter_del ON public.games;
+CREATE TRIGGER trg_games_counter_del
+    AFTER DELETE ON public.games
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.fn_games_counter();
+
+-- ---------- Índice de la hora efectiva (keyset) ----------
+CREATE INDEX IF NOT EXISTS ix_games_effective_at_id
+    ON public.games ((
+        COALESCE(
+            scheduled_date::timestamp + COALESCE(scheduled_time, '00:00'::time),
+            played_at,
+            '-infinity'::timestamp
+        )
+    ) DESC, id DESC);
+
+-- ---------- Backfill (idempotente) ----------
+TRUNCATE public.game_players;
+INSERT INTO public.game_players (game_id, user_id, numbers)
+SELECT game_id, taken_by, COUNT(*)
+  FROM public.game_numbers
+ WHERE taken_by IS NOT NULL
+ GROUP BY game_id, taken_by;
+
+INSERT INTO public.table_counters (name, value, updated_at)
+SELECT 'games', COUNT(*), now() FROM public.games
+ON CONFLICT (name) DO UPDATE
+   SET value = EXCLUDED.value,
+       updated_at = now();
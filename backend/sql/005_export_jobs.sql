@@ -0,0 +1,31 @@
+-- backend/sql/005_export_jobs.sql
+-- 📦 Exportaciones asíncronas del panel admin.
+--    - Un job por (dataset, formato, filtros, versión del snapshot)
+--    - El archivo queda en storage/exports y se reutiliza mientras la
+--      versión del snapshot no cambie (ver app/services/admin/export_jobs.py)
+
+CREATE TABLE IF NOT EXISTS public.export_jobs (
+    id               BIGSERIAL    PRIMARY KEY,
+    dataset          TEXT         NOT NULL,
+    format           TEXT         NOT NULL,
+    args_hash        TEXT         NOT NULL DEFAULT '',
+    args             JSONB        NOT NULL DEFAULT '{}'::jsonb,
+    snapshot_version TEXT         NOT NULL,
+    status           TEXT         NOT NULL DEFAULT 'pending',   -- pending | running | done | failed
+    file_path        TEXT,
+    size_bytes       BIGINT,
+    error            TEXT,
+    requested_by     INTEGER,
+    created_at       TIMESTAMPTZ  NOT NULL DEFAULT now(),
+    started_at       TIMESTAMPTZ,
+    finished_at      TIMESTAMPTZ,
+    CONSTRAINT ck_export_jobs_status
+        CHECK (status IN ('pending', 'running', 'done', 'failed'))
+);
+
+-- Búsqueda del artefacto reutilizable / job en curso
+CREATE INDEX IF NOT EXISTS ix_export_jobs_key
+    ON public.export_jobs (dataset, format, args_hash, snapshot_version, id DESC);
+
+CREATE INDEX IF NOT EXISTS ix_export_jobs_created_at
+    ON public.export_jobs (created_at);
@@ -0,0 +1,70 @@
+-- backend/sql/006_admin_kpis.sql
+-- 📊 KPIs del dashboard admin precalculados.
+--    - admin_kpi_snapshot: payload JSON del dashboard + versión (ETag)
+--    - admin_kpi_monthly : series mensuales (ventas / ingresos), se recalculan
+--      solo los meses recientes en cada refresh
+--    - table_counters('users') mantenido por trigger (sin COUNT(*) sobre users)
+--    Ver app/services/admin/kpi_snapshot.py
+
+CREATE TABLE IF NOT EXISTS public.admin_kpi_snapshot (
+    name       TEXT        PRIMARY KEY,
+    payload    JSONB       NOT NULL,
+    version    BIGINT      NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS public.admin_kpi_monthly (
+    month      DATE        NOT NULL,
+    metric     TEXT        NOT NULL,   -- sales_count | sales_cop | revenue_cop | commission_cop
+    value      BIGINT      NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (month, metric)
+);
+
+-- ---------- Contador genérico por tabla (TG_ARGV[0] = nombre) ----------
+CREATE OR REPLACE FUNCTION public.fn_table_counter()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_delta BIGINT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT COUNT(*) INTO v_delta FROM new_rows;
+    ELSE
+        SELECT -COUNT(*) INTO v_delta FROM old_rows;
+    END IF;
+
+    INSERT INTO public.table_counters AS c (name, value, updated_at)
+    VALUES (TG_ARGV[0], v_delta, now())
+    ON CONFLICT (name) DO UPDATE
+       SET value = c.value + EXCLUDED.value,
+           updated_at = now();
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_users_counter_ins ON public.users;
+CREATE TRIGGER trg_users_counter_ins
+    AFTER INSERT ON public.users
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.fn_table_counter('users');
+
+DROP TRIGGER IF EXISTS trg_users_counter_del ON public.users;
+CREATE TRIGGER trg_users_counter_del
+    AFTER DELETE ON public.users
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.fn_table_counter('users');
+
+-- ---------- Índices para las series mensuales ----------
+CREATE INDEX IF NOT EXISTS ix_user_subscriptions_period_start
+    ON public.user_subscriptions ((COALESCE(current_period_start, created_at)));
+CREATE INDEX IF NOT EXISTS ix_referral_commissions_event_time
+    ON public.referral_commissions (event_time);
+
+-- ---------- Backfill (idempotente) ----------
+INSERT INTO public.table_counters (name, value, updated_at)
+SELECT 'users', COUNT(*), now() FROM public.users
+ON CONFLICT (name) DO UPDATE
+   SET value = EXCLUDED.value,
+       updated_at = now();
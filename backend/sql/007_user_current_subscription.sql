@@ -0,0 +1,120 @@
+-- backend/sql/007_user_current_subscription.sql
+-- ⭐ Proyección de la suscripción vigente por usuario.
+--    Una fila por usuario con la última suscripción (mismo criterio que antes:
+--    ORDER BY COALESCE(expires_at, updated_at, created_at) DESC NULLS LAST).
+--    La mantiene un trigger sobre user_subscriptions; las consultas de
+--    usuarios / referidos hacen JOIN directo en vez de LATERAL / ROW_NUMBER().
+--    "PRO activo" = is_premium AND expires_at > now() (o entitlement='pro' AND
+--    expires_at > now(), según la consulta) → índices parciales sobre expires_at.
+
+CREATE TABLE IF NOT EXISTS public.user_current_subscription (
+    user_id        INTEGER      PRIMARY KEY REFERENCES public.users(id) ON DELETE CASCADE,
+    entitlement    TEXT,
+    status         TEXT,
+    product_id     TEXT,
+    plan           TEXT         NOT NULL DEFAULT 'none',
+    max_digits     SMALLINT,
+    is_premium     BOOLEAN      NOT NULL DEFAULT FALSE,
+    expires_at     TIMESTAMPTZ,
+    sub_created_at TIMESTAMPTZ,
+    updated_at     TIMESTAMPTZ  NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_ucs_premium_expires
+    ON public.user_current_subscription (expires_at)
+    WHERE is_premium;
+CREATE INDEX IF NOT EXISTS ix_ucs_pro_expires
+    ON public.user_current_subscription (expires_at)
+    WHERE entitlement = 'pro';
+
+-- Plan / cifras según product_id (espejo de _infer_plan_from_product_id)
+CREATE OR REPLACE FUNCTION public.fn_plan_from_product(p_product_id TEXT,
+                                                       OUT plan TEXT, OUT max_digits SMALLINT)
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE
+             WHEN pid LIKE 'cm\_prueba\_5%'     THEN 'ultra'
+             WHEN pid LIKE 'cm\_prueba\_4%'     THEN 'full'
+             WHEN pid LIKE 'cm\_prueba\_3%'     THEN 'basic'
+             WHEN pid LIKE 'cm\_prueba\_2%'     THEN 'starter'
+             WHEN pid LIKE 'cm\_prueba%'        THEN 'ultra'
+             WHEN pid LIKE 'cmu\_suscripcion%'  THEN 'ultra'
+             WHEN pid LIKE 'cm\_suscripcion%'   THEN 'full'
+             WHEN pid LIKE 'cml\_suscripcion%'  THEN 'basic'
+             WHEN pid LIKE 'cms\_suscripcion%'  THEN 'starter'
+             ELSE 'none'
+           END,
+           CASE
+             WHEN pid LIKE 'cm\_prueba\_5%'     THEN 5
+             WHEN pid LIKE 'cm\_prueba\_4%'     THEN 4
+             WHEN pid LIKE 'cm\_prueba\_3%'     THEN 3
+             WHEN pid LIKE 'cm\_prueba\_2%'     THEN 2
+             WHEN pid LIKE 'cm\_prueba%'        THEN 5
+             WHEN pid LIKE 'cmu\_suscripcion%'  THEN 5
+             WHEN pid LIKE 'cm\_suscripcion%'   THEN 4
+             WHEN pid LIKE 'cml\_suscripcion%'  THEN 3
+             WHEN pid LIKE 'cms\_suscripcion%'  THEN 2
+           END::smallint
+      FROM (SELECT btrim(COALESCE(p_product_id, '')) AS pid) x
+$$;
+
+-- Recalcula la fila de un usuario
+CREATE OR REPLACE FUNCTION public.fn_user_current_subscription_refresh(p_user_id INTEGER)
+RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO public.user_current_subscription AS c
+        (user_id, entitlement, status, product_id, plan, max_digits,
+         is_premium, expires_at, sub_created_at, updated_at)
+    SELECT s.user_id, s.entitlement, s.status, s.last_product_id, p.plan, p.max_digits,
+           COALESCE(s.is_premium, FALSE), s.expires_at, s.created_at, now()
+      FROM public.user_subscriptions s
+      CROSS JOIN LATERAL public.fn_plan_from_product(s.last_product_id) p
+     WHERE s.user_id = p_user_id
+     ORDER BY COALESCE(s.expires_at, s.updated_at, s.created_at) DESC NULLS LAST
+     LIMIT 1
+    ON CONFLICT (user_id) DO UPDATE
+       SET entitlement    = EXCLUDED.entitlement,
+           status         = EXCLUDED.status,
+           product_id     = EXCLUDED.product_id,
+           plan           = EXCLUDED.plan,
+           max_digits     = EXCLUDED.max_digits,
+           is_premium     = EXCLUDED.is_premium,
+           expires_at     = EXCLUDED.expires_at,
+           sub_created_at = EXCLUDED.sub_created_at,
+           updated_at     = now();
+
+    IF NOT FOUND THEN
+        DELETE FROM public.user_current_subscription WHERE user_id = p_user_id;
+    END IF;
+END $$;
+
+CREATE OR REPLACE FUNCTION public.fn_user_subscriptions_current()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.fn_user_current_subscription_refresh(OLD.user_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND (TG_OP = 'INSERT' OR NEW.user_id IS DISTINCT FROM OLD.user_id) THEN
+        PERFORM public.fn_user_current_subscription_refresh(NEW.user_id);
+    END IF;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_user_subscriptions_current ON public.user_subscriptions;
+CREATE TRIGGER trg_user_subscriptions_current
+    AFTER INSERT OR UPDATE OR DELETE ON public.user_subscriptions
+    FOR EACH ROW
+    EXECUTE FUNCTION public.fn_user_subscriptions_current();
+
+-- ---------- Backfill (idempotente) ----------
+TRUNCATE public.user_current_subscription;
+INSERT INTO public.user_current_subscription
+    (user_id, entitlement, status, product_id, plan, max_digits,
+     is_premium, expires_at, sub_created_at, updated_at)
+SELECT DISTINCT ON (s.user_id)
+       s.user_id, s.entitlement, s.status, s.last_product_id, p.plan, p.max_digits,
+       COALESCE(s.is_premium, FALSE), s.expires_at, s.created_at, now()
+  FROM public.user_subscriptions s
+  CROSS JOIN LATERAL public.fn_plan_from_product(s.last_product_id) p
+ ORDER BY s.user_id, COALESCE(s.expires_at, s.updated_at, s.created_at) DESC NULLS LAST;
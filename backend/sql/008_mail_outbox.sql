@@ -0,0 +1,35 @@
+-- backend/sql/008_mail_outbox.sql
+-- ✉️ Outbox de correos salientes (opcional, MAIL_OUTBOX=1).
+--    - send_html(async_) guarda el correo aquí antes de encolarlo en memoria;
+--      el worker lo marca sent / failed al terminar.
+--    - Fallo transitorio: vuelve a pending con claimed_at = NULL y
+--      next_attempt_at = now() + backoff; el worker no duerme esperando.
+--    - Si el worker muere con el correo en cola, claimed_at queda viejo y el
+--      líder del scheduler (job mail_outbox) lo reenvía.
+--    Ver app/services/notify/mail_queue.py
+
+CREATE TABLE IF NOT EXISTS public.mail_outbox (
+    id               BIGSERIAL    PRIMARY KEY,
+    to_email         TEXT         NOT NULL,
+    subject          TEXT         NOT NULL,
+    html             TEXT         NOT NULL,
+    status           TEXT         NOT NULL DEFAULT 'pending',   -- pending | sent | failed
+    attempts         INTEGER      NOT NULL DEFAULT 0,
+    last_error       TEXT,
+    next_attempt_at  TIMESTAMPTZ  NOT NULL DEFAULT now(),           -- backoff del próximo reintento
+    claimed_at       TIMESTAMPTZ,                               -- encolado en algún worker
+    created_at       TIMESTAMPTZ  NOT NULL DEFAULT now(),
+    sent_at          TIMESTAMPTZ,
+    CONSTRAINT ck_mail_outbox_status
+        CHECK (status IN ('pending', 'sent', 'failed'))
+);
+
+-- Lo que el drenador busca: pendientes ya vencidos
+CREATE INDEX IF NOT EXISTS ix_mail_outbox_pending
+    ON public.mail_outbox (next_attempt_at, id)
+    WHERE status = 'pending';
+
+-- Purga de enviados viejos (MAIL_OUTBOX_KEEP_DAYS)
+CREATE INDEX IF NOT EXISTS ix_mail_outbox_sent_at
+    ON public.mail_outbox (sent_at)
+    WHERE status = 'sent';
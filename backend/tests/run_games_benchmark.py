@@ -0,0 +1,350 @@
+# backend/tests/run_games_benchmark.py
+#
+# Benchmark / prueba de carga del camino caliente de juegos:
+#   generate → commit → my-selection → history → release
+#
+# 1) Sembrar una base LOCAL desechable (usuarios PRO + juegos 2/3/4/5 cifras
+#    parcialmente llenos):
+#      python tests/run_games_benchmark.py --seed --users 500 --fill 0.3
+# 2) Correr (en proceso con test_client, o contra un servidor con --base-url;
+#    el servidor debe usar el mismo JWT_SECRET_KEY):
+#      python tests/run_games_benchmark.py --vus 32 --duration 60 --out bench.json
+#      python tests/run_games_benchmark.py --vus 32 --duration 60 --base-url http://localhost:8000
+# 3) Limpiar: python tests/run_games_benchmark.py --cleanup
+#
+# Salida: JSON (stdout y --out) con throughput, p50/p95/p99 y tasa de conflictos
+# por endpoint, para comparar ramas.
+
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+# añade "backend/" al sys.path para que "from app ..." funcione
+HERE = os.path.dirname(__file__)                         # .../backend/tests
+BACKEND_DIR = os.path.abspath(os.path.join(HERE, ".."))  # .../backend
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault("FLASK_RUN_FROM_CLI", "1")  # sin APScheduler ni LISTEN en el proceso de carga
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+
+from app import create_app
+from app.db.database import db
+
+PREFIX = "bench"
+PRODUCT_ID = "cmu_suscripcion_bench"  # plan ultra → hasta 5 cifras
+
+
+# -------------------------------------------------------------------
+#  Semilla
+# -------------------------------------------------------------------
+def seed(app, users: int, fill: float, max_prefill: int, digits_list) -> dict:
+    with app.app_context():
+        id_type = db.session.execute(text("SELECT MIN(id) FROM identification_types")).scalar()
+        if id_type is None:
+            raise SystemExit("identification_types está vacía: corre las migraciones primero")
+
+        db.session.execute(text("""
+            INSERT INTO users (name, identification_type_id, identification_number, birthdate,
+                               password_hash, phone, email, role_id, public_code)
+            SELECT 'Bench ' || i, :idt, 'BENCH' || lpad(i::text, 8, '0'), DATE '1990-01-01',
+                   'x', :p || '-' || lpad(i::text, 8, '0'), :p || i || '@bench.local', 2,
+                   'BN' || lpad(i::text, 8, '0')
+              FROM generate_series(1, :n) AS i
+            ON CONFLICT DO NOTHING
+        """), {"idt": id_type, "p": PREFIX, "n": users})
+
+        db.session.execute(text("""
+            INSERT INTO user_subscriptions (user_id, entitlement, is_premium, status,
+                                            last_product_id, current_period_start, expires_at)
+            SELECT u.id, 'pro', TRUE, 'active', :pid, now(), now() + interval '30 days'
+              FROM users u
+             WHERE u.phone LIKE :like
+            ON CONFLICT (user_id, entitlement) DO UPDATE
+               SET is_premium = TRUE, status = 'active', last_product_id = EXCLUDED.last_product_id,
+                   expires_at = EXCLUDED.expires_at
+        """), {"pid": PRODUCT_ID, "like": f"{PREFIX}-%"})
+        db.session.commit()
+
+        from app.services.games.games_service import get_or_create_active_unscheduled_game_id
+
+        games = {}
+        for d in digits_list:
+            gid = get_or_create_active_unscheduled_game_id(d, None)
+            capacity = 10 ** d
+            target = min(int(capacity * fill), max_prefill)
+            target -= target % 5
+            # bloques de 5 números por usuario sembrado (round-robin)
+            inserted = db.session.execute(text("""
+                WITH u AS (
+                    SELECT id, row_number() OVER (ORDER BY id) - 1 AS rn, COUNT(*) OVER () AS total
+                      FROM users WHERE phone LIKE :like
+                ),
+                free AS (
+                    SELECT n, row_number() OVER (ORDER BY random()) - 1 AS k
+                      FROM generate_series(0, :cap - 1) AS n
+                     WHERE NOT EXISTS (SELECT 1 FROM game_numbers gn WHERE gn.game_id = :gid AND gn.number = n)
+                     LIMIT :target
+                )
+                INSERT INTO game_numbers (game_id, number, position, taken_by)
+                SELECT :gid, f.n, (f.k % 5) + 1, u.id
+                  FROM free f
+                  JOIN u ON u.rn = (f.k / 5) % u.total
+                ON CONFLICT DO NOTHING
+                RETURNING id
+            """), {"like": f"{PREFIX}-%", "cap": capacity, "gid": gid, "target": target}).fetchall()
+            db.session.commit()
+            games[d] = {"game_id": gid, "prefilled": len(inserted), "capacity": capacity}
+
+        n_users = db.session.execute(
+            text("SELECT COUNT(*) FROM users WHERE phone LIKE :like"), {"like": f"{PREFIX}-%"}
+        ).scalar()
+        return {"users": int(n_users), "games": games}
+
+
+def cleanup(app) -> dict:
+    with app.app_context():
+        params = {"like": f"{PREFIX}-%"}
+        nums = db.session.execute(text("""
+            DELETE FROM game_numbers WHERE taken_by IN (SELECT id FROM users WHERE phone LIKE :like)
+        """), params).rowcount
+        db.session.execute(text("""
+            DELETE FROM user_subscriptions WHERE user_id IN (SELECT id FROM users WHERE phone LIKE :like)
+        """), params)
+        users = db.session.execute(text("DELETE FROM users WHERE phone LIKE :like"), params).rowcount
+        db.session.commit()
+        return {"game_numbers": nums, "users": users}
+
+
+def _tokens(app, limit: int):
+    with app.app_context():
+        ids = db.session.execute(
+            text("SELECT id FROM users WHERE phone LIKE :like ORDER BY id LIMIT :n"),
+            {"like": f"{PREFIX}-%", "n": limit},
+        ).scalars().all()
+        return [
+            (uid, create_access_token(identity=str(uid), additional_claims={"rid": 2},
+                                      expires_delta=timedelta(hours=12)))
+            for uid in ids
+        ]
+
+
+# -------------------------------------------------------------------
+#  Clientes (en proceso / HTTP)
+# -------------------------------------------------------------------
+class _TestClient:
+    def __init__(self, app, token):
+        self.c = app.test_client()
+        self.h = {"Authorization": f"Bearer {token}"}
+
+    def call(self, method, path, body=None):
+        r = self.c.open(path, method=method, json=body, headers=self.h)
+        return r.status_code, r.get_json(silent=True)
+
+
+class _HttpClient:
+    def __init__(self, base_url, token):
+        import requests
+        self.s = requests.Session()
+        self.s.headers["Authorization"] = f"Bearer {token}"
+        self.base = base_url.rstrip("/")
+
+    def call(self, method, path, body=None):
+        r = self.s.request(method, self.base + path, json=body, timeout=60)
+        try:
+            return r.status_code, r.json()
+        except ValueError:
+            return r.status_code, None
+
+
+# -------------------------------------------------------------------
+#  Usuarios virtuales
+# -------------------------------------------------------------------
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lat = defaultdict(list)
+        self.status = defaultdict(lambda: defaultdict(int))
+
+    def add(self, name, seconds, status):
+        with self.lock:
+            self.lat[name].append(seconds)
+            self.status[name][status] += 1
+
+
+def _timed(stats, client, name, method, path, body=None):
+    t0 = time.perf_counter()
+    try:
+        status, data = client.call(method, path, body)
+    except Exception:
+        status, data = 599, None
+    stats.add(name, time.perf_counter() - t0, status)
+    return status, data
+
+
+def _vu_loop(client, stats, stop_at, digits_list, release_ratio, rnd):
+    while time.monotonic() < stop_at:
+        d = rnd.choice(digits_list)
+        status, data = _timed(stats, client, "generate", "POST", f"/api/games/generate?digits={d}")
+        if status != 200 or not data or not data.get("ok"):
+            continue
+        gid = data["data"]["game_id"]
+        numbers = data["data"]["numbers"]
+
+        status, data = _timed(stats, client, "commit", "POST", "/api/games/commit",
+                              {"game_id": gid, "numbers": numbers, "digits": d})
+        if status == 200 and data and data.get("data", {}).get("game_id"):
+            gid = data["data"]["game_id"]
+
+        _timed(stats, client, "my_selection", "GET", f"/api/games/my-selection?digits={d}")
+        _timed(stats, client, "history", "GET", "/api/games/history?page=1&per_page=20")
+
+        if status == 200 and rnd.random() < release_ratio:
+            _timed(stats, client, "release", "DELETE", f"/api/games/{gid}/selection")
+
+
+def _pct(sorted_vals, p):
+    if not sorted_vals:
+        return None
+    k = max(0, min(len(sorted_vals) - 1, math.ceil(p / 100.0 * len(sorted_vals)) - 1))  # nearest-rank
+    return round(sorted_vals[k] * 1000.0, 2)
+
+
+def _summarize(stats, elapsed):
+    out, total = {}, 0
+    for name, vals in stats.lat.items():
+        vals = sorted(vals)
+        st = {str(k): v for k, v in sorted(stats.status[name].items())}
+        n = len(vals)
+        total += n
+        errors = sum(v for k, v in stats.status[name].items() if k >= 500)
+        out[name] = {
+            "count": n,
+            "rps": round(n / elapsed, 2),
+            "p50_ms": _pct(vals, 50),
+            "p95_ms": _pct(vals, 95),
+            "p99_ms": _pct(vals, 99),
+            "max_ms": round(vals[-1] * 1000.0, 2) if vals else None,
+            "mean_ms": round(sum(vals) / n * 1000.0, 2) if n else None,
+            "status": st,
+            "error_rate": round(errors / n, 4) if n else 0.0,
+        }
+    commit = stats.status.get("commit", {})
+    commits = sum(commit.values())
+    conflict_rate = round(commit.get(409, 0) / commits, 4) if commits else 0.0
+    return out, {"requests": total, "rps": round(total / elapsed, 2), "commit_conflict_rate": conflict_rate}
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def run(app, args) -> dict:
+    digits_list = [int(d) for d in args.digits.split(",")]
+    tokens = _tokens(app, args.vus)
+    if not tokens:
+        raise SystemExit("No hay usuarios sembrados: corre primero con --seed")
+
+    stats = Stats()
+    clients = [
+        _HttpClient(args.base_url, tok) if args.base_url else _TestClient(app, tok)
+        for _uid, tok in tokens
+    ]
+    clients = [clients[i % len(clients)] for i in range(args.vus)]
+
+    # calentamiento (no cuenta)
+    if args.warmup > 0:
+        warm = Stats()
+        stop_at = time.monotonic() + args.warmup
+        ts = [threading.Thread(target=_vu_loop, args=(c, warm, stop_at, digits_list, args.release_ratio,
+                                                      random.Random(args.seed_rng + i)))
+              for i, c in enumerate(clients)]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+
+    started = time.monotonic()
+    stop_at = started + args.duration
+    ts = [threading.Thread(target=_vu_loop, args=(c, stats, stop_at, digits_list, args.release_ratio,
+                                                  random.Random(args.seed_rng + 1000 + i)))
+          for i, c in enumerate(clients)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    endpoints, totals = _summarize(stats, elapsed)
+    return {
+        "meta": {
+            "git_rev": _git_rev(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "mode": "http" if args.base_url else "in-process",
+            "base_url": args.base_url,
+            "vus": args.vus,
+            "duration_s": round(elapsed, 2),
+            "warmup_s": args.warmup,
+            "digits": digits_list,
+            "release_ratio": args.release_ratio,
+        },
+        "totals": totals,
+        "endpoints": endpoints,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark del camino caliente de juegos")
+    ap.add_argument("--seed", action="store_true", help="siembra usuarios PRO y juegos parcialmente llenos")
+    ap.add_argument("--cleanup", action="store_true", help="borra lo sembrado (usuarios bench-*)")
+    ap.add_argument("--users", type=int, default=500)
+    ap.add_argument("--fill", type=float, default=0.3, help="fracción del juego ya ocupada al sembrar")
+    ap.add_argument("--max-prefill", type=int, default=20000, help="tope de números sembrados por juego")
+    ap.add_argument("--vus", type=int, default=16, help="usuarios virtuales concurrentes")
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("--warmup", type=float, default=5.0)
+    ap.add_argument("--digits", default="2,3,4,5")
+    ap.add_argument("--release-ratio", type=float, default=1.0,
+                    help="fracción de commits que se liberan al final de la iteración")
+    ap.add_argument("--base-url", default=None, help="servidor HTTP; sin esto usa test_client en proceso")
+    ap.add_argument("--seed-rng", type=int, default=42)
+    ap.add_argument("--out", default=None, help="archivo JSON de resultados")
+    args = ap.parse_args()
+
+    app = create_app()
+
+    if args.cleanup:
+        print(json.dumps({"cleanup": cleanup(app)}, indent=2))
+        return
+
+    if args.seed:
+        digits_list = [int(d) for d in args.digits.split(",")]
+        print(json.dumps({"seed": seed(app, args.users, args.fill, args.max_prefill, digits_list)},
+                         indent=2, default=str))
+        return
+
+    result = run(app, args)
+    out = json.dumps(result, indent=2, default=str)
+    print(out)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(out)
+
+
+if __name__ == "__main__":
+    main()
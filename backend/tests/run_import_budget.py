@@ -0,0 +1,115 @@
+# backend/tests/run_import_budget.py
+#
+# Presupuesto de arranque en frío: mide `import app` + create_app() en un
+# proceso NUEVO (sin caché de módulos) y falla si:
+#   - después de create_app() ya están cargados módulos pesados que solo deben
+#     importarse dentro de los handlers que los usan (openpyxl, googleapiclient,
+#     requests, google.auth). Este es el guardián determinista, o
+#   - el mejor de N arranques supera IMPORT_BUDGET_MS (por defecto 1500 ms).
+#     El tiempo varía con la máquina (aquí, 480–830 ms entre corridas): el
+#     default solo atrapa regresiones gruesas; en CI fijarlo según el runner.
+#
+# No toca la base de datos: usa sqlite:// y FLASK_RUN_FROM_CLI=1 (sin scheduler).
+#
+#   python tests/run_import_budget.py [--runs 5] [--budget-ms 1500] [--importtime]
+#
+# Sale con código 1 si hay regresión (apto para CI).
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# el proceso hijo corre en "backend/" con PYTHONPATH apuntando ahí
+HERE = os.path.dirname(__file__)                         # .../backend/tests
+BACKEND_DIR = os.path.abspath(os.path.join(HERE, ".."))  # .../backend
+
+LAZY_MODULES = ("openpyxl", "googleapiclient", "requests", "google.auth", "google.oauth2")
+
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+app = create_app()
+ms = (time.perf_counter() - t0) * 1000.0
+lazy = %r
+loaded = sorted(m for m in lazy if m in sys.modules)
+print(json.dumps({"ms": ms, "loaded": loaded, "routes": len(list(app.url_map.iter_rules()))}))
+"""
+
+
+def _child_env():
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    env["FLASK_RUN_FROM_CLI"] = "1"
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def _run_once(extra_args=()):
+    proc = subprocess.run(
+        [sys.executable, *extra_args, "-c", _CHILD % (LAZY_MODULES,)],
+        cwd=BACKEND_DIR, env=_child_env(), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"create_app() falló:\n{proc.stderr}")
+    return proc, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _top_imports(stderr, limit=15):
+    # Líneas de -X importtime: "import time: self | cumulative | módulo"
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cum_us, name = [p.strip() for p in line.replace("import time:", "|", 1).split("|")]
+        rows.append((int(cum_us), int(self_us), name.strip()))
+    rows.sort(reverse=True)
+    return [{"module": n, "cumulative_ms": round(c / 1000, 1), "self_ms": round(s / 1000, 1)}
+            for c, s, n in rows[:limit]]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1500")))
+    ap.add_argument("--importtime", action="store_true", help="incluye los imports más caros")
+    a = ap.parse_args()
+
+    samples = []
+    loaded = []
+    routes = 0
+    for _ in range(max(1, a.runs)):
+        _, out = _run_once()
+        samples.append(out["ms"])
+        loaded, routes = out["loaded"], out["routes"]
+
+    # mejor de N: lo que cuesta el arranque sin ruido del sistema
+    best = min(samples)
+    report = {
+        "budget_ms": a.budget_ms,
+        "best_ms": round(best, 1),
+        "runs_ms": [round(s, 1) for s in samples],
+        "routes": routes,
+        "eager_heavy_modules": loaded,
+    }
+    if a.importtime:
+        proc, _ = _run_once(("-X", "importtime"))
+        report["top_imports"] = _top_imports(proc.stderr)
+
+    failures = []
+    if best > a.budget_ms:
+        failures.append(f"arranque {best:.0f} ms > presupuesto {a.budget_ms:.0f} ms")
+    if loaded:
+        failures.append(f"módulos pesados importados al arrancar: {', '.join(loaded)}")
+    report["ok"] = not failures
+    report["failures"] = failures
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# backend/tests/run_sms_benchmark.py
+#
+# Ráfaga de SMS (códigos de reset / notificaciones) contra el proveedor local
+# (SMS_PROVIDER=local: latencia fija, sin red). Compara:
+#   - legacy: un proveedor nuevo por SMS y un envío tras otro (lo que hacía
+#     get_sms_provider() + send_sms por request en un worker sync)
+#   - submit: dispatcher asíncrono (cola + lotes + pool)
+#   - send_many: envío masivo síncrono
+#
+#   python tests/run_sms_benchmark.py [--messages 200] [--latency-ms 200]
+#          [--max-batch 50] [--rates 0,10] [--out bench.json]
+#
+# --max-batch 1 simula un gateway sin endpoint masivo (solo paralelismo).
+# --rates: cuotas del proveedor a medir (SMS/s), una corrida por valor.
+#   0 = sin límite (techo del dispatcher); 10 = default de SMS_RATE_PER_SEC,
+#   lo que de verdad se ve en producción con un solo worker.
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# añade "backend/" al sys.path para que "from app ..." funcione
+HERE = os.path.dirname(__file__)                         # .../backend/tests
+BACKEND_DIR = os.path.abspath(os.path.join(HERE, ".."))  # .../backend
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def _configure(a, rate):
+    os.environ["SMS_PROVIDER"] = "local"
+    os.environ["SMS_LOCAL_LATENCY_MS"] = str(a.latency_ms)
+    os.environ["SMS_LOCAL_MAX_BATCH"] = str(a.max_batch)
+    os.environ["SMS_RATE_PER_SEC"] = str(rate)
+    os.environ["WEB_CONCURRENCY"] = "1"
+
+
+def _messages(n):
+    return [(f"+5730000{i:05d}", f"Tu código es {i:06d}") for i in range(n)]
+
+
+def bench_legacy(msgs):
+    from app.services.notify.sms_sender import LocalSmsProvider
+    latency = float(os.environ["SMS_LOCAL_LATENCY_MS"]) / 1000.0
+    t0 = time.perf_counter()
+    calls = 0
+    for to, body in msgs:
+        LocalSmsProvider(latency=latency).send_sms(to, body)  # proveedor nuevo por llamada
+        calls += 1
+    return {"elapsed_s": round(time.perf_counter() - t0, 3), "provider_calls": calls}
+
+
+def bench_submit(msgs):
+    from app.services.notify import sms_sender
+    sms_sender.reset_sms_provider()
+    d = sms_sender.get_sms_dispatcher()
+    provider = d.provider
+
+    t0 = time.perf_counter()
+    for to, body in msgs:
+        d.submit(to, body)
+    enqueue_s = time.perf_counter() - t0
+    while provider.sent < len(msgs):
+        time.sleep(0.005)
+    return {
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+        "request_side_ms_per_sms": round(enqueue_s / len(msgs) * 1000.0, 3),
+        "provider_calls": provider.calls,
+    }
+
+
+def bench_send_many(msgs):
+    from app.services.notify import sms_sender
+    sms_sender.reset_sms_provider()
+    d = sms_sender.get_sms_dispatcher()
+    t0 = time.perf_counter()
+    out = d.send_many(msgs)
+    return {"elapsed_s": round(time.perf_counter() - t0, 3), "provider_calls": d.provider.calls, **out}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=200)
+    ap.add_argument("--latency-ms", type=float, default=200)
+    ap.add_argument("--max-batch", type=int, default=50)
+    ap.add_argument("--rates", default="0,10")
+    ap.add_argument("--skip-legacy", action="store_true", help="legacy tarda mensajes × latencia")
+    ap.add_argument("--out", default=None)
+    a = ap.parse_args()
+    rates = [float(r) for r in a.rates.split(",") if r.strip()]
+
+    msgs = _messages(a.messages)
+    results = {}
+    if not a.skip_legacy:
+        # Sin limitador: la cuota no cambia el camino viejo
+        _configure(a, 0)
+        results["legacy"] = bench_legacy(msgs)
+    for rate in rates:
+        _configure(a, rate)
+        tag = f"rate_{rate:g}"
+        results[f"submit@{tag}"] = bench_submit(msgs)
+        results[f"send_many@{tag}"] = bench_send_many(msgs)
+
+    for r in results.values():
+        r["sms_per_sec"] = round(a.messages / r["elapsed_s"], 1) if r["elapsed_s"] else None
+
+    out = json.dumps({
+        "messages": a.messages, "latency_ms": a.latency_ms, "max_batch": a.max_batch,
+        "rates_per_sec": rates, "results": results,
+    }, indent=2)
+    print(out)
+    if a.out:
+        with open(a.out, "w", encoding="utf-8") as fh:
+            fh.write(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# backend/tests/run_subscription_benchmarks.py
+#
+# Micro-benchmarks del parseo de suscripciones (camino de /status y /sync):
+#   _parse_gp_time, _pick_line_item, _infer_plan_from_product_id,
+#   _price_from_catalog, SubscriptionStatus.to_json
+#
+# Compara contra la implementación anterior (copiada abajo como "legacy") y
+# verifica que den el mismo resultado. No necesita base de datos: to_json se
+# mide SIN app context, así que si tocara la BD fallaría.
+#
+#   python tests/run_subscription_benchmarks.py [--number 200000] [--out bench.json]
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+# añade "backend/" al sys.path para que "from app ..." funcione
+HERE = os.path.dirname(__file__)                         # .../backend/tests
+BACKEND_DIR = os.path.abspath(os.path.join(HERE, ".."))  # .../backend
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.subscriptions import service as svc
+
+PRODUCT_IDS = [
+    "cm_prueba_2", "cm_prueba_5", "cm_prueba", "cm_prueba_legacy",
+    "cms_suscripcion", "cml_suscripcion", "cm_suscripcion", "cmu_suscripcion",
+    "cmu_suscripcion:ultra-mensual", " cm_suscripcion:full ", "otro_producto", "", None,
+]
+TIMES = [
+    "2025-09-01T16:38:06.465Z", "2025-10-01T16:38:06Z", "1756744686465", "1756744686",
+    1756744686465, 1756744686, "no-es-fecha", None,
+]
+
+
+# -------------------------------------------------------------------
+#  Implementación anterior (referencia)
+# -------------------------------------------------------------------
+def legacy_parse_gp_time(v):
+    if v is None:
+        return None
+    try:
+        if isinstance(v, (int, float)):
+            iv = int(v)
+            return datetime.fromtimestamp(iv / 1000.0 if iv > 1_000_000_000_000 else iv, tz=timezone.utc)
+        if isinstance(v, str):
+            s = v.strip()
+            if s.isdigit():
+                iv = int(s)
+                return datetime.fromtimestamp(iv / 1000.0 if iv > 1_000_000_000_000 else iv, tz=timezone.utc)
+            s = s.replace('Z', '+00:00')
+            return datetime.fromisoformat(s).astimezone(timezone.utc)
+    except Exception:
+        return None
+
+
+def legacy_price_from_catalog(product_id, default_currency="COP"):
+    pid = (product_id or "").strip()
+    if pid in svc._PRICE_CATALOG:
+        return svc._PRICE_CATALOG[pid]
+    for k, v in svc._PRICE_CATALOG.items():
+        if pid.startswith(k):
+            return v
+    return (0, default_currency)
+
+
+def legacy_infer_plan(product_id):
+    pid = (product_id or "").strip()
+    if pid.startswith("cm_prueba_5"): return "ultra",   5
+    if pid.startswith("cm_prueba_4"): return "full",    4
+    if pid.startswith("cm_prueba_3"): return "basic",   3
+    if pid.startswith("cm_prueba_2"): return "starter", 2
+    if pid.startswith("cm_prueba"):   return "ultra",   5
+    if pid.startswith("cmu_suscripcion"): return "ultra",   5
+    if pid.startswith("cm_suscripcion"):  return "full",    4
+    if pid.startswith("cml_suscripcion"): return "basic",   3
+    if pid.startswith("cms_suscripcion"): return "starter", 2
+    return "none", None
+
+
+# -------------------------------------------------------------------
+def check_equivalence():
+    for pid in PRODUCT_IDS:
+        assert svc._infer_plan_from_product_id(pid) == legacy_infer_plan(pid), pid
+        assert svc._price_from_catalog(pid) == legacy_price_from_catalog(pid), pid
+        assert svc._is_trial_product(pid) == (pid or "").strip().startswith("cm_prueba"), pid
+    for t in TIMES:
+        assert svc._parse_gp_time(t) == legacy_parse_gp_time(t), t
+
+
+def _line_items():
+    now = datetime.now(timezone.utc)
+    ms = lambda d: str(int(d.timestamp() * 1000))
+    return [
+        {"startTime": (now - timedelta(days=60)).isoformat().replace("+00:00", "Z"),
+         "expiryTime": (now - timedelta(days=30)).isoformat().replace("+00:00", "Z")},
+        {"startTimeMillis": ms(now - timedelta(days=30)), "expiryTimeMillis": ms(now + timedelta(days=1))},
+        {"startTime": (now + timedelta(days=1)).isoformat().replace("+00:00", "Z"),
+         "expiryTime": (now + timedelta(days=31)).isoformat().replace("+00:00", "Z")},
+    ]
+
+
+def _bench(fn, number):
+    # mejor de 3 repeticiones → ns por llamada
+    best = min(timeit.repeat(fn, number=number, repeat=3))
+    return round(best / number * 1e9, 1)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--number", type=int, default=100_000)
+    ap.add_argument("--out", default=None)
+    a = ap.parse_args()
+    n = a.number
+
+    check_equivalence()
+
+    items = _line_items()
+    status = svc.SubscriptionStatus(
+        user_id=1, entitlement="pro", is_premium=True, expires_at="2030-01-01T00:00:00+00:00",
+        status="active", plan="ultra", max_digits=5,
+    )
+
+    results = {
+        "parse_gp_time_rfc3339": {
+            "legacy_ns": _bench(lambda: legacy_parse_gp_time("2025-09-01T16:38:06.465Z"), n),
+            "current_ns": _bench(lambda: svc._parse_gp_time("2025-09-01T16:38:06.465Z"), n),
+        },
+        "parse_gp_time_millis_str": {
+            "legacy_ns": _bench(lambda: legacy_parse_gp_time("1756744686465"), n),
+            "current_ns": _bench(lambda: svc._parse_gp_time("1756744686465"), n),
+        },
+        "infer_plan_from_product_id": {
+            "legacy_ns": _bench(lambda: [legacy_infer_plan(p) for p in PRODUCT_IDS], n // 10),
+            "current_ns": _bench(lambda: [svc._infer_plan_from_product_id(p) for p in PRODUCT_IDS], n // 10),
+        },
+        "price_from_catalog": {
+            "legacy_ns": _bench(lambda: [legacy_price_from_catalog(p) for p in PRODUCT_IDS], n // 10),
+            "current_ns": _bench(lambda: [svc._price_from_catalog(p) for p in PRODUCT_IDS], n // 10),
+        },
+        "pick_line_item": {
+            "current_ns": _bench(lambda: svc._pick_line_item(items), n // 10),
+        },
+        "status_to_json": {
+            # sin app context: si to_json consultara la BD, esto lanzaría
+            "current_ns": _bench(status.to_json, n),
+        },
+    }
+    for r in results.values():
+        if "legacy_ns" in r and r["current_ns"]:
+            r["speedup"] = round(r["legacy_ns"] / r["current_ns"], 2)
+
+    out = json.dumps({"number": n, "equivalent": True, "results": results}, indent=2)
+    print(out)
+    if a.out:
+        with open(a.out, "w", encoding="utf-8") as fh:
+            fh.write(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# backend/tests/run_worker_benchmark.py
+#
+# Throughput de endpoints atados a I/O saliente (sync de Google Play, reset por
+# Resend / SMS, fan-out FCM) con cada modelo de worker de gunicorn.
+#
+# Modo local (por defecto): levanta un upstream falso que tarda --upstream-ms en
+# responder y, por cada --modes, un gunicorn con el gunicorn.conf.py real sirviendo
+# create_app() + una ruta /__bench/outbound que llama al upstream con la sesión
+# HTTP compartida (app/services/http_session.py), igual que los envíos reales.
+# Sin Postgres: DATABASE_URL=sqlite:// y scheduler apagado.
+#
+#   python tests/run_worker_benchmark.py [--modes sync,gthread,gevent] [--workers 2]
+#          [--concurrency 32] [--requests 400] [--upstream-ms 200] [--out bench.json]
+#
+# Contra un servidor ya levantado (p. ej. staging, /api/subscriptions/sync):
+#
+#   python tests/run_worker_benchmark.py --base-url https://staging... \
+#          --path /api/subscriptions/sync --method POST --token <JWT> --body '{"purchaseToken": "..."}'
+
+import argparse
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))        # .../backend/tests
+BACKEND_DIR = os.path.abspath(os.path.join(HERE, ".."))  # .../backend
+
+
+# -------------------------------------------------------------------
+#  App servida por gunicorn (factory: "run_worker_benchmark:bench_app()")
+# -------------------------------------------------------------------
+def bench_app():
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    from flask import jsonify
+    from app import create_app
+    from app.services.http_session import get_session
+
+    app = create_app()
+    upstream = os.environ["BENCH_UPSTREAM_URL"]
+
+    @app.get("/__bench/outbound")
+    def bench_outbound():
+        r = get_session("bench").post(upstream, json={"ping": 1}, timeout=10)
+        return jsonify({"ok": r.ok}), 200
+
+    return app
+
+
+# -------------------------------------------------------------------
+#  Upstream falso (latencia fija)
+# -------------------------------------------------------------------
+def _start_upstream(delay_s):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(delay_s)
+            body = b'{"ok": true}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, name="bench-upstream", daemon=True).start()
+    return srv
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_gunicorn(mode, workers, upstream_url):
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "GUNICORN_WORKER_CLASS": mode,
+        "WEB_CONCURRENCY": str(workers),
+        "BENCH_UPSTREAM_URL": upstream_url,
+        "DATABASE_URL": "sqlite://",
+        "SCHEDULER_ENABLED": "0",
+        "PROMETHEUS_MULTIPROC_DIR": tempfile.mkdtemp(prefix="bench_prom_"),
+        "PYTHONPATH": BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+    })
+    env.pop("HTTP_POOL_MAXSIZE", None)  # que lo fije gunicorn.conf.py según el modo
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn",
+         "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"),
+         "-b", f"127.0.0.1:{port}", "--log-level", "warning",
+         "--chdir", HERE, "run_worker_benchmark:bench_app()"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"gunicorn ({mode}) no arrancó:\n{proc.stderr.read().decode(errors='replace')}")
+        try:
+            urllib.request.urlopen(base + "/healthz", timeout=1).read()
+            return proc, base
+        except Exception:
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit(f"gunicorn ({mode}) no respondió /healthz en 30 s")
+
+
+# -------------------------------------------------------------------
+#  Carga
+# -------------------------------------------------------------------
+def _pct(sorted_vals, p):
+    if not sorted_vals:
+        return None
+    k = max(0, min(len(sorted_vals) - 1, math.ceil(p / 100.0 * len(sorted_vals)) - 1))  # nearest-rank
+    return round(sorted_vals[k] * 1000.0, 2)
+
+
+def _load(url, method, headers, body, total, concurrency, timeout):
+    data = body.encode("utf-8") if body else None
+
+    def one(_):
+        req = urllib.request.Request(url, data=data, method=method, headers=headers)
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as r:
+                r.read()
+                status = r.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception:
+            status = "error"
+        return time.perf_counter() - t0, status
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        results = list(ex.map(one, range(total)))
+    elapsed = time.perf_counter() - t0
+
+    lat = sorted(r[0] for r in results)
+    statuses = {}
+    for _, st in results:
+        statuses[str(st)] = statuses.get(str(st), 0) + 1
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "rps": round(total / elapsed, 1) if elapsed else None,
+        "p50_ms": _pct(lat, 50),
+        "p95_ms": _pct(lat, 95),
+        "p99_ms": _pct(lat, 99),
+        "status": statuses,
+    }
+
+
+def _mode_available(mode):
+    if mode != "gevent":
+        return True
+    try:
+        import gevent  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modes", default="sync,gthread,gevent")
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--upstream-ms", type=float, default=200)
+    ap.add_argument("--timeout", type=float, default=60)
+    ap.add_argument("--base-url", default=None, help="mide un servidor ya levantado en vez de gunicorn local")
+    ap.add_argument("--path", default="/api/subscriptions/sync")
+    ap.add_argument("--method", default="POST")
+    ap.add_argument("--token", default=None)
+    ap.add_argument("--body", default=None)
+    ap.add_argument("--out", default=None)
+    a = ap.parse_args()
+
+    headers = {"Content-Type": "application/json"}
+    if a.token:
+        headers["Authorization"] = f"Bearer {a.token}"
+
+    if a.base_url:
+        report = {"target": a.base_url + a.path,
+                  "result": _load(a.base_url.rstrip("/") + a.path, a.method, headers, a.body,
+                                  a.requests, a.concurrency, a.timeout)}
+    else:
+        upstream = _start_upstream(a.upstream_ms / 1000.0)
+        upstream_url = f"http://127.0.0.1:{upstream.server_address[1]}/send"
+        report = {"workers": a.workers, "upstream_ms": a.upstream_ms, "modes": {}}
+        for mode in [m.strip() for m in a.modes.split(",") if m.strip()]:
+            if not _mode_available(mode):
+                report["modes"][mode] = {"skipped": "gevent no instalado (pip install gevent psycogreen)"}
+                continue
+            proc, base = _start_gunicorn(mode, a.workers, upstream_url)
+            try:
+                _load(base + "/__bench/outbound", "GET", {}, None, a.concurrency, a.concurrency, a.timeout)  # calentar
+                report["modes"][mode] = _load(base + "/__bench/outbound", "GET", {}, None,
+                                              a.requests, a.concurrency, a.timeout)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+        upstream.shutdown()
+
+        base_rps = (report["modes"].get("sync") or {}).get("rps")
+        for r in report["modes"].values():
+            if base_rps and r.get("rps"):
+                r["speedup_vs_sync"] = round(r["rps"] / base_rps, 2)
+
+    out = json.dumps(report, indent=2, ensure_ascii=False)
+    print(out)
+    if a.out:
+        with open(a.out, "w", encoding="utf-8") as fh:
+            fh.write(out)
+
+
+if __name__ == "__main__":
+    main()